@@ -0,0 +1,37 @@
+"""Helpers shared by the benchmark scripts."""
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "myapp")
+
+
+def import_app_module(name):
+    """Import ``apps.<name>`` without running the package ``__init__``.
+
+    The package ``__init__`` builds the Flask app and starts the dispatcher,
+    job queue and leader election; the modules benchmarked here only need
+    their own code.
+    """
+    if "apps" not in sys.modules:
+        package = types.ModuleType("apps")
+        package.__path__ = [APP_DIR]
+        sys.modules["apps"] = package
+    return importlib.import_module(f"apps.{name}")
+
+
+def import_app():
+    """Import the full ``apps`` package, running its ``__init__``.
+
+    The environment (tokens, ``LOCAL_STATE_DB`` and so on) must be set
+    before calling this. Sheets and Slack are only contacted on first use,
+    so callers can swap in fakes afterwards.
+    """
+    spec = importlib.util.spec_from_file_location("apps", os.path.join(APP_DIR, "__init__.py"),
+                                                  submodule_search_locations=[APP_DIR])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["apps"] = package
+    spec.loader.exec_module(package)
+    return package
@@ -0,0 +1,123 @@
+"""Weekly analytics and history export over a synthetic ticket history.
+
+Times to resolution per (campaign, issue type, priority) are computed twice:
+with a loop over the rows that parses dates and sorts each group's
+durations, and with ``apps.analytics`` on a columnar frame. The
+export part compares the peak memory of building the whole CSV at once
+with streaming it a chunk at a time from the SQLite store.
+
+    python benchmarks/bench_analytics.py --rows 100000
+
+Needs numpy and pandas installed.
+"""
+import argparse
+import csv
+import gc
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from _support import import_app_module
+from fakes import FakeWorksheet, synthetic_rows
+
+analytics = import_app_module("analytics")
+ticket_store = import_app_module("ticket_store")
+TICKET_FIELDS = import_app_module("tickets").TICKET_FIELDS
+
+
+def resolution_events(rows, seed=0):
+    rng = random.Random(seed)
+    events = []
+    for ticket_id, _, _, _, status, created_date in rows:
+        if status in analytics.RESOLVED_STATUSES:
+            created = datetime.strptime(created_date, analytics.TICKET_DATE_FORMAT)
+            resolved = created + timedelta(hours=rng.expovariate(1 / 30))
+            events.append((ticket_id, resolved.strftime(analytics.EVENT_TIME_FORMAT)))
+    return events
+
+
+def loop_percentiles(row_chunks, events):
+    resolved_at = {ticket_id: datetime.strptime(at, analytics.EVENT_TIME_FORMAT) for ticket_id, at in events}
+    groups = {}
+    for rows in row_chunks:
+        for ticket_id, campaign, issue_type, priority, status, created_date in rows:
+            if ticket_id in resolved_at and status in analytics.RESOLVED_STATUSES:
+                hours = (resolved_at[ticket_id] - datetime.strptime(created_date, analytics.TICKET_DATE_FORMAT)).total_seconds() / 3600
+                groups.setdefault((campaign, issue_type, priority), []).append(hours)
+    table = {}
+    for key, hours in groups.items():
+        hours.sort()
+        table[key] = [len(hours)] + [hours[min(len(hours) - 1, int(p / 100 * len(hours)))] for p in analytics.PERCENTILES]
+    return table
+
+
+def vectorized_percentiles(row_chunks, events):
+    frame = analytics.load_ticket_frame(row_chunks, events)
+    return analytics.resolution_percentiles(frame, ("campaign", "issue_type", "priority"))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def csv_all_at_once(store):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TICKET_FIELDS)
+    writer.writerows([row for rows in store.iter_rows(10 ** 9) for row in rows])
+    return len(buffer.getvalue())
+
+
+def csv_streamed(store, chunk_size):
+    return sum(len(part) for part in analytics.csv_chunks(TICKET_FIELDS, store.iter_rows(chunk_size)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-analytics-")
+    sheet = ticket_store.SheetsTicketStore(FakeWorksheet("TicketLog", [list(TICKET_FIELDS)] + synthetic_rows(args.rows)))
+    store = ticket_store.SqliteTicketStore(os.path.join(directory, "state.db"), seed=sheet.all_tickets)
+    rows = lambda: store.iter_rows(args.chunk_size, analytics.ANALYTICS_FIELDS)
+    events = resolution_events(row for chunk in rows() for row in chunk)
+    print(f"{args.rows} tickets, {len(events)} resolved")
+
+    # Paid once per process, on the first weekly summary or export
+    _, import_ms = timed(lambda: __import__("pandas"))
+    print(f"importing pandas: {import_ms:.0f} ms")
+
+    # Both read the same rows from the store; the time includes reading them
+    _, loop_ms = timed(lambda: loop_percentiles(rows(), events))
+    table, vector_ms = timed(lambda: vectorized_percentiles(rows(), events))
+    print(f"percentiles per campaign/issue/priority ({len(table)} groups)")
+    print(f"  {'python loop':<24}{loop_ms:>10.1f} ms")
+    print(f"  {'columnar (pandas)':<24}{vector_ms:>10.1f} ms")
+    frame = analytics.load_ticket_frame(rows(), events)
+    _, query_ms = timed(lambda: analytics.resolution_percentiles(frame, ("campaign", "issue_type", "priority")))
+    print(f"  {'columnar, frame loaded':<24}{query_ms:>10.1f} ms  (frame {frame.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB)")
+
+    print("CSV export of TicketLog, peak traced memory")
+    print(f"  {'all at once':<24}{peak_memory(lambda: csv_all_at_once(store)) / 2 ** 20:>10.1f} MiB")
+    print(f"  {'streamed in chunks':<24}{peak_memory(lambda: csv_streamed(store, args.chunk_size)) / 2 ** 20:>10.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
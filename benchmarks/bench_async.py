@@ -0,0 +1,209 @@
+"""Compare the threaded Flask server with the asyncio server (SERVER_MODE=async) when Slack is slow.
+
+Each mode runs in a fresh process that imports the full app with an
+in-memory TicketLog (see fakes.py) and fires bursts of requests at the
+Slack-bound routes:
+
+    new_ticket_modal   POST /new-ticket (views.open)
+    agent_tickets      POST /agent-tickets (store read + views.open)
+    create_ticket      POST /slack/events (new_ticket view_submission)
+
+sync drives the Flask app from --threads threads, as gunicorn's gthread
+worker would; async drives the aiohttp app over a local socket with up to
+--inflight requests outstanding. Every Slack call takes --slack-latency
+seconds, so the threaded server tops out near threads / latency requests
+per second while the asyncio one keeps going:
+
+    PYTHONPATH=<dir with aiohttp> python benchmarks/bench_async.py --requests 400 \\
+        --slack-latency 0.2 --threads 32 --inflight 200 --output async.json
+
+The asyncio mode needs aiohttp installed; the dispatcher's rate limits are
+lifted so the numbers show the server, not Slack's tiers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_load import new_ticket_payload, summarise
+from fakes import HEADER, FakeAsyncWebClient, FakeWebClient, FakeWorksheet, synthetic_rows
+
+MODES = ("sync", "async")
+
+
+def requests_for(args, rng, requesters):
+    """(scenario, path, form data or None, JSON body or None) for each request of each scenario."""
+    return [
+        ("new_ticket_modal", [("/new-ticket", {"trigger_id": f"t{i}"}, None) for i in range(args.requests)]),
+        ("agent_tickets", [("/agent-tickets", {"trigger_id": f"t{i}", "user_id": rng.choice(requesters)}, None)
+                           for i in range(args.requests)]),
+        ("create_ticket", [("/slack/events", None, new_ticket_payload(rng, rng.choice(requesters)))
+                           for i in range(args.requests)]),
+    ]
+
+
+def run_sync(args, apps, scenarios, slack):
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = apps.app.test_client()
+        return local.client
+
+    def one(request):
+        path, form, body = request
+        started = time.perf_counter()
+        response = client().post(path, data=form) if body is None else client().post(path, json=body)
+        return time.perf_counter() - started, response.status_code == 200
+
+    results = []
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for name, batch in scenarios:
+            slack_before = dict(slack.calls)
+            started = time.perf_counter()
+            outcomes = list(pool.map(one, batch))
+            elapsed = time.perf_counter() - started
+            results.append(_result(name, outcomes, elapsed, slack, slack_before))
+    return results
+
+
+def run_async(args, scenarios, slack):
+    import aiohttp
+    from aiohttp.test_utils import TestServer
+    async_server = sys.modules["apps.async_server"]
+
+    async def main():
+        server = TestServer(await async_server.create_app())
+        await server.start_server()
+        limit = asyncio.Semaphore(args.inflight)
+        results = []
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=args.inflight)) as session:
+            async def one(request):
+                path, form, body = request
+                async with limit:
+                    started = time.perf_counter()
+                    async with session.post(server.make_url(path), data=form, json=body) as response:
+                        await response.read()
+                    return time.perf_counter() - started, response.status == 200
+
+            for name, batch in scenarios:
+                slack_before = dict(slack.calls)
+                started = time.perf_counter()
+                outcomes = await asyncio.gather(*(one(request) for request in batch))
+                elapsed = time.perf_counter() - started
+                results.append(_result(name, outcomes, elapsed, slack, slack_before))
+        await server.close()
+        return results
+
+    return asyncio.run(main())
+
+
+def _result(name, outcomes, elapsed, slack, slack_before):
+    calls = {method: count - slack_before.get(method, 0) for method, count in slack.calls.items()
+             if count != slack_before.get(method, 0)}
+    return summarise(name, [latency for latency, _ in outcomes], sum(1 for _, ok in outcomes if not ok), elapsed, {}, calls)
+
+
+def run_child(args):
+    workdir = tempfile.mkdtemp(prefix="bench-async-")
+    os.environ.update({
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "GOOGLE_SHEETS_CREDENTIALS": json.dumps({"type": "service_account"}),
+        "GOOGLE_SHEET_ID": "benchmark",
+        "SYSTEM_USERS": "U0000",
+        "LOCAL_STATE_DB": os.path.join(workdir, "state.sqlite3"),
+        "SCHEDULER_LOCK_FILE": os.path.join(workdir, "scheduler.lock"),
+        "SERVER_MODE": args.mode,
+    })
+    # The app writes logs/ relative to the working directory
+    os.chdir(workdir)
+
+    from _support import import_app
+    apps = import_app()
+    slack_dispatcher = sys.modules["apps.slack_dispatcher"]
+    InstrumentedClient = sys.modules["apps.metrics"].InstrumentedClient
+
+    worksheets = {
+        "TicketLog": FakeWorksheet("TicketLog", [HEADER] + synthetic_rows(args.rows)),
+        "WeeklyCounts": FakeWorksheet("WeeklyCounts", [["Week"]]),
+        "TicketEvents": FakeWorksheet("TicketEvents", [list(sys.modules["apps.ticket_events"].EVENT_HEADER)]),
+    }
+    apps.config.sheets.worksheet = lambda title, header=None: worksheets[title]
+    if args.mode == "async":
+        slack = FakeAsyncWebClient(args.slack_latency)
+        apps.dispatcher.client_factory = lambda session: InstrumentedClient(slack, "slack")
+    else:
+        slack = FakeWebClient(args.slack_latency)
+        apps.dispatcher.client = InstrumentedClient(slack, "slack")
+    apps.dispatcher.rates = {method: 1e9 for method in slack_dispatcher.METHOD_RATES}
+
+    # Load the ticket store before timing anything
+    sys.modules["apps.helpers"].build_agent_tickets_view("R00000")
+
+    rng = random.Random(args.seed)
+    requesters = [f"R{i:05d}" for i in range(max(1, args.rows // 50))]
+    scenarios = requests_for(args, rng, requesters)
+    if args.mode == "async":
+        import importlib
+        importlib.import_module("apps.async_server")
+        results = run_async(args, scenarios, slack)
+    else:
+        results = run_sync(args, apps, scenarios, slack)
+    return {"mode": args.mode, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated server modes to run")
+    parser.add_argument("--rows", type=int, default=1000, help="TicketLog size")
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--threads", type=int, default=32, help="request threads for the sync server")
+    parser.add_argument("--inflight", type=int, default=200, help="requests outstanding at once against the async server")
+    parser.add_argument("--slack-latency", type=float, default=0.2, help="seconds per Slack API call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_child(args)))
+        return
+
+    runs = []
+    for mode in args.modes.split(","):
+        child_args = [sys.executable, os.path.abspath(__file__), "--mode", mode, "--rows", str(args.rows),
+                      "--requests", str(args.requests), "--threads", str(args.threads), "--inflight", str(args.inflight),
+                      "--slack-latency", str(args.slack_latency), "--seed", str(args.seed)]
+        path = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")]))
+        out = subprocess.run(child_args, capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=path))
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"\nmode={mode} ({args.threads if mode == 'sync' else args.inflight} concurrent requests)")
+        print(f"{'scenario':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for result in run["results"]:
+            print(f"{result['scenario']:<18}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+
+    if args.output:
+        report = {
+            "benchmark": "async",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("mode", "output")},
+            "runs": runs,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
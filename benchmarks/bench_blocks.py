@@ -0,0 +1,132 @@
+"""Micro-benchmark: Block Kit renderer with shared static blocks vs. the old per-call dict building.
+
+    python benchmarks/bench_blocks.py --number 20000
+"""
+import argparse
+import json
+import timeit
+
+from _support import import_app_module
+
+blocks = import_app_module("blocks")
+Ticket = import_app_module("tickets").Ticket
+
+TICKET = ["T1234", "U0123", "Camp Lejeune", "Account Lockout", "High", "In Progress",
+          "Cannot log in to Salesforce after password reset", "https://example.my.salesforce.com/abc", "N/A",
+          "03/14/2025", "U0456", "03/14/2025", "U0123: looking into it"]
+TICKET_RECORD = Ticket.from_row(TICKET)
+
+
+# The builders below are the pre-renderer code, kept verbatim as the baseline
+
+def legacy_build_new_ticket_modal():
+    campaign_options = [
+        {"text": {"type": "plain_text", "text": "Camp Lejeune"}, "value": "Camp Lejeune"},
+        {"text": {"type": "plain_text", "text": "Maui Wildfires"}, "value": "Maui Wildfires"},
+        {"text": {"type": "plain_text", "text": "LA Wildfire"}, "value": "LA Wildfire"},
+        {"text": {"type": "plain_text", "text": "Depo-Provera"}, "value": "Depo-Provera"},
+        {"text": {"type": "plain_text", "text": "CPP Sick and Family Leave"}, "value": "CPP Sick and Family Leave"}
+    ]
+    issue_type_options = [
+        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Salesforce Performance Issues (Freezing or Crashing)"}, "value": "Salesforce Performance Issues"},
+        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Vonage Dialer Functionality Issues"}, "value": "Vonage Dialer Functionality Issues"},
+        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Broken or Unresponsive Links (ARA, Co-Counsel, Claim Stage, File Upload, etc.)"}, "value": "Broken or Unresponsive Links"},
+        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Laptop Fails to Power On"}, "value": "Laptop Fails to Power On"},
+        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Slow Performance or Freezing Laptop"}, "value": "Slow Performance or Freezing Laptop"},
+        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Unresponsive Keyboard or Mouse"}, "value": "Unresponsive Keyboard or Mouse"},
+        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Headset/Mic Malfunction (No Sound, Static, etc.)"}, "value": "Headset/Microphone Malfunction"},
+        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Charger or Battery Failure"}, "value": "Charger or Battery Failure"},
+        {"text": {"type": "plain_text", "text": "🔐 Security & Account - Multi-Factor Authentication (MFA) Failure (Security Key)"}, "value": "MFA Failure"},
+        {"text": {"type": "plain_text", "text": "🔐 Security & Account - Account Lockout (Gmail or Salesforce)"}, "value": "Account Lockout"},
+        {"text": {"type": "plain_text", "text": "📑 Client & Document - Paper Packet Contains Errors or Missing Information"}, "value": "Paper Packet Errors"},
+        {"text": {"type": "plain_text", "text": "📑 Client & Document - Paper Packet Mailing Status"}, "value": "Paper Packet Mailing Status"},
+        {"text": {"type": "plain_text", "text": "📑 Client & Document - Client Information Update Request"}, "value": "Client Information Update Request"},
+        {"text": {"type": "plain_text", "text": "📑 Client & Document - Client System Error (Missing Document Request, Form Submission Failure, Broken or Unresponsive Link)"}, "value": "Client System Error"},
+        {"text": {"type": "plain_text", "text": "📊 Management Systems - Reports or Dashboards Failing to Load"}, "value": "Reports or Dashboards Failing to Load"},
+        {"text": {"type": "plain_text", "text": "📊 Management Systems - Automated Voicemail System Malfunction"}, "value": "Automated Voicemail System Malfunction"},
+        {"text": {"type": "plain_text", "text": "📊 Management Systems - Missing or Inaccessible Call Recordings"}, "value": "Missing or Inaccessible Call Recordings"},
+        {"text": {"type": "plain_text", "text": "❓ Other (Not Listed Above)"}, "value": "Other"}
+    ]
+    priority_options = [
+        {"text": {"type": "plain_text", "text": "🔵 Low"}, "value": "Low"},
+        {"text": {"type": "plain_text", "text": "🟡 Medium"}, "value": "Medium"},
+        {"text": {"type": "plain_text", "text": "🔴 High"}, "value": "High"}
+    ]
+    return {
+        "type": "modal",
+        "callback_id": "new_ticket",
+        "title": {"type": "plain_text", "text": "Submit a New Ticket"},
+        "submit": {"type": "plain_text", "text": "Submit"},
+        "close": {"type": "plain_text", "text": "Cancel"},
+        "blocks": [
+            {"type": "input", "block_id": "campaign_block", "label": {"type": "plain_text", "text": "📂 Campaign"},
+             "element": {"type": "static_select", "action_id": "campaign_select", "placeholder": {"type": "plain_text", "text": "Select a campaign"}, "options": campaign_options},
+             "optional": False},
+            {"type": "input", "block_id": "issue_type_block", "label": {"type": "plain_text", "text": "📌 Issue Type"},
+             "element": {"type": "static_select", "action_id": "issue_type_select", "placeholder": {"type": "plain_text", "text": "Select an issue type"}, "options": issue_type_options},
+             "optional": False},
+            {"type": "input", "block_id": "priority_block", "label": {"type": "plain_text", "text": "⚡ Priority"},
+             "element": {"type": "static_select", "action_id": "priority_select", "placeholder": {"type": "plain_text", "text": "Select priority"}, "options": priority_options},
+             "optional": False},
+            {"type": "input", "block_id": "details_block", "label": {"type": "plain_text", "text": "🗂 Details"},
+             "element": {"type": "plain_text_input", "action_id": "details_input", "multiline": True, "placeholder": {"type": "plain_text", "text": "Describe the issue in detail"}},
+             "optional": False},
+            {"type": "input", "block_id": "salesforce_link_block", "label": {"type": "plain_text", "text": "📎 Salesforce Link (Optional)"},
+             "element": {"type": "plain_text_input", "action_id": "salesforce_link_input", "placeholder": {"type": "plain_text", "text": "Paste Salesforce URL"}},
+             "optional": True},
+            {"type": "section", "text": {"type": "mrkdwn", "text": "📂 *File Upload:* (Optional) Upload the file to Slack and include the file URL in the details field."}}
+        ]
+    }
+
+
+def legacy_ticket_message(ticket, system_user=True):
+    ticket_id = ticket[0]
+    message_blocks = [
+        {"type": "header", "text": {"type": "plain_text", "text": "🎫 Ticket Details", "emoji": True}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"✅ *Ticket ID:* {ticket[0]}\n\n"}},
+        {"type": "section", "text": {"type": "mrkdwn",
+                                     "text": f"📂 *Campaign:* {ticket[2]}\n\n"
+                                             f"📌 *Issue:* {ticket[3]}\n\n"
+                                             f"⚡ *Priority:* {ticket[4]} {'🔴' if ticket[4] == 'High' else '🟡' if ticket[4] == 'Medium' else '🔵'}\n\n"
+                                             f"👤 *Assigned To:* {ticket[1] if ticket[1] != 'Unassigned' else '❌ Unassigned'}\n\n"
+                                             f"🔄 *Status:* {ticket[5]} {'🟢' if ticket[5] == 'Open' else '🔵' if ticket[5] == 'In Progress' else '🟡' if ticket[5] == 'Resolved' else '🔴'}\n\n"}},
+        {"type": "divider"},
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"🖋️ *Details:* {ticket[6]}\n\n🔗 *Salesforce Link:* {ticket[7] or 'N/A'}\n\n"}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"📂 *File Attachment:* {ticket[8]}\n\n"}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"📅 *Created Date:* {ticket[9]}\n\n"}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": f"💬 *Comments:* {ticket[12] if len(ticket) > 12 and ticket[12] else 'N/A'}\n\n"}},
+        {"type": "divider"},
+        {"type": "actions", "elements": [
+            {"type": "button", "text": {"type": "plain_text", "text": "🖐 Assign to Me"}, "action_id": f"assign_to_me_{ticket_id}", "value": ticket_id, "style": "primary"} if system_user and ticket[5] == "Open" and ticket[1] == "Unassigned" else None,
+            {"type": "button", "text": {"type": "plain_text", "text": "🔁 Reassign"}, "action_id": f"reassign_{ticket_id}", "value": ticket_id, "style": "primary"} if system_user and ticket[5] in ["Open", "In Progress"] else None,
+            {"type": "button", "text": {"type": "plain_text", "text": "❌ Close"}, "action_id": f"close_{ticket_id}", "value": ticket_id, "style": "danger"} if system_user and ticket[5] in ["Open", "In Progress"] else None,
+            {"type": "button", "text": {"type": "plain_text", "text": "🟢 Resolve"}, "action_id": f"resolve_{ticket_id}", "value": ticket_id, "style": "primary"} if system_user and ticket[5] in ["Open", "In Progress"] else None,
+            {"type": "button", "text": {"type": "plain_text", "text": "🔄 Reopen"}, "action_id": f"reopen_{ticket_id}", "value": ticket_id} if system_user and ticket[5] in ["Closed", "Resolved"] else None
+        ]}
+    ]
+    message_blocks[-1]["elements"] = [elem for elem in message_blocks[-1]["elements"] if elem is not None]
+    return message_blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Same output, so the comparison is like for like
+    assert json.dumps(legacy_build_new_ticket_modal()) == json.dumps(blocks.render_new_ticket_modal())
+    assert json.dumps(legacy_ticket_message(TICKET)) == json.dumps(blocks.render_ticket_message(TICKET_RECORD, True))
+
+    cases = [
+        ("new ticket modal", legacy_build_new_ticket_modal, blocks.render_new_ticket_modal),
+        ("ticket message", lambda: legacy_ticket_message(TICKET), lambda: blocks.render_ticket_message(TICKET_RECORD, True)),
+    ]
+    print(f"{'view':<20}{'legacy us':>12}{'renderer us':>14}{'speedup':>10}")
+    for name, legacy, renderer in cases:
+        legacy_time = min(timeit.repeat(legacy, number=args.number, repeat=5)) / args.number
+        renderer_time = min(timeit.repeat(renderer, number=args.number, repeat=5)) / args.number
+        print(f"{name:<20}{legacy_time * 1e6:>12.2f}{renderer_time * 1e6:>14.2f}{legacy_time / renderer_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""End-to-end load benchmark for the Flask routes against simulated Sheets and Slack.
+
+For each table size a fresh process imports the full app with an in-memory
+TicketLog of synthetic rows (see fakes.py), swaps in the fake worksheet and
+WebClient, and drives the routes through Flask's test client:
+
+    new_ticket_modal   POST /new-ticket
+    create_ticket      POST /slack/events (new_ticket view_submission)
+    agent_tickets      POST /agent-tickets
+    assign/resolve/close
+                       POST /slack/events (block_actions button clicks)
+    weekly_summary     scheduler.generate_weekly_summary()
+
+Throughput and p50/p95/p99 latency are printed and, with --output, written
+as JSON so runs can be compared over time:
+
+    python benchmarks/bench_load.py --rows 1000,10000,200000 --requests 200 \\
+        --concurrency 8 --sheets-latency 0.2 --slack-latency 0.1 --output load.json
+
+By default the fakes and the dispatcher are unlimited so the numbers show
+the app's own overhead; --rate-limits applies Slack's published tiers and
+the Sheets per-minute quota instead. Other app settings (ASYNC_EVENTS,
+TICKET_STORE_BACKEND, ...) are taken from the environment.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes import HEADER, CAMPAIGNS, ISSUE_TYPES, PRIORITIES, FakeWebClient, FakeWorksheet, Quota, synthetic_rows
+
+SHEETS_REQUESTS_PER_MINUTE = 300
+ACTIONS = ("assign_to_me", "resolve", "close")
+# Slack gives every interaction its own trigger_id; deliveries are deduplicated on it
+_interaction = itertools.count(1)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarise(name, latencies, errors, elapsed, sheets_calls, slack_calls):
+    latencies = sorted(latencies)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "sheets_calls": sheets_calls,
+        "slack_calls": slack_calls,
+    }
+
+
+def _delta(after, before):
+    return {name: count - before.get(name, 0) for name, count in after.items() if count != before.get(name, 0)}
+
+
+def new_ticket_payload(rng, user_id):
+    def option(value):
+        return {"selected_option": {"value": value}}
+    n = next(_interaction)
+    return {
+        "type": "view_submission",
+        "user": {"id": user_id},
+        "trigger_id": f"trigger-{n}",
+        "view": {"id": f"V{n:08d}", "hash": "1", "callback_id": "new_ticket", "state": {"values": {
+            "campaign_block": {"campaign_select": option(rng.choice(CAMPAIGNS))},
+            "issue_type_block": {"issue_type_select": option(rng.choice(ISSUE_TYPES))},
+            "priority_block": {"priority_select": option(rng.choice(PRIORITIES))},
+            "details_block": {"details_input": {"value": "Load test ticket"}},
+            "salesforce_link_block": {"salesforce_link_input": {"value": "N/A"}},
+        }}},
+    }
+
+
+def action_payload(action, ticket_id, user_id):
+    n = next(_interaction)
+    return {
+        "type": "block_actions",
+        "user": {"id": user_id},
+        "trigger_id": f"trigger-{n}",
+        "actions": [{"action_id": f"{action}_{ticket_id}", "value": ticket_id, "action_ts": f"1700000000.{n:06d}"}],
+        "message": {"ts": "1700000000.000100"},
+    }
+
+
+def run_child(args):
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    os.environ.update({
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "GOOGLE_SHEETS_CREDENTIALS": json.dumps({"type": "service_account"}),
+        "GOOGLE_SHEET_ID": "benchmark",
+        "SYSTEM_USERS": "U0000",
+        "LOCAL_STATE_DB": os.path.join(workdir, "state.sqlite3"),
+        "SCHEDULER_LOCK_FILE": os.path.join(workdir, "scheduler.lock"),
+    })
+    # The app writes logs/ relative to the working directory
+    os.chdir(workdir)
+
+    from _support import import_app
+    apps = import_app()
+    slack_dispatcher = sys.modules["apps.slack_dispatcher"]
+    scheduler = sys.modules["apps.scheduler"]
+
+    quota = Quota(SHEETS_REQUESTS_PER_MINUTE if args.rate_limits else None)
+    ticket_log = FakeWorksheet("TicketLog", [HEADER] + synthetic_rows(args.rows), args.sheets_latency, quota)
+    weekly_counts = FakeWorksheet("WeeklyCounts", [["Week", "Total", "Open", "In Progress", "Resolved", "Closed",
+                                                   "Median Hours to Resolve", "P90 Hours to Resolve"]],
+                                  args.sheets_latency, quota)
+    ticket_events = FakeWorksheet("TicketEvents", [list(sys.modules["apps.ticket_events"].EVENT_HEADER)], args.sheets_latency, quota)
+    worksheets = {"TicketLog": ticket_log, "WeeklyCounts": weekly_counts, "TicketEvents": ticket_events}
+    apps.config.sheets.worksheet = lambda title, header=None: worksheets[title]
+    slack = FakeWebClient(args.slack_latency, slack_dispatcher.METHOD_RATES if args.rate_limits else None)
+    apps.dispatcher.client = sys.modules["apps.metrics"].InstrumentedClient(slack, "slack")
+    if not args.rate_limits:
+        apps.dispatcher.rates = {method: 1e9 for method in slack_dispatcher.METHOD_RATES}
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = apps.app.test_client()
+        return local.client
+
+    rng = random.Random(args.seed)
+    requesters = [f"R{i:05d}" for i in range(max(1, args.rows // 50))]
+    ticket_ids = [f"T{1001 + i}" for i in range(args.rows)]
+
+    def run(name, request, count, concurrency=args.concurrency):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        sheets_before = dict(ticket_log.calls)
+        slack_before = dict(slack.calls)
+
+        def one(i):
+            started = time.perf_counter()
+            ok = request(i)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += 0 if ok else 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(count)))
+        elapsed = time.perf_counter() - started
+        # Count the batched Sheets writes and debounced message updates this scenario caused
+        apps.config.sheet.flush()
+        apps.message_updates.flush()
+        return summarise(name, latencies, errors[0], elapsed, _delta(ticket_log.calls, sheets_before), _delta(slack.calls, slack_before))
+
+    # The first request pays for loading the ticket store from the sheet
+    started = time.perf_counter()
+    client().post("/agent-tickets", data={"trigger_id": "warmup", "user_id": requesters[0]})
+    setup_seconds = time.perf_counter() - started
+
+    def post_events(payload):
+        return client().post("/slack/events", json=payload).status_code == 200
+
+    results = [
+        run("new_ticket_modal", lambda i: client().post("/new-ticket", data={"trigger_id": f"t{i}"}).status_code == 200,
+            args.requests),
+        run("create_ticket", lambda i: post_events(new_ticket_payload(rng, rng.choice(requesters))), args.requests),
+        run("agent_tickets", lambda i: client().post(
+            "/agent-tickets", data={"trigger_id": f"t{i}", "user_id": rng.choice(requesters)}).status_code == 200, args.requests),
+    ]
+    for action in ACTIONS:
+        results.append(run(action, lambda i, action=action: post_events(
+            action_payload(action, rng.choice(ticket_ids), "U0000")), args.requests))
+    results.append(run("weekly_summary", lambda i: scheduler.generate_weekly_summary() or True,
+                       max(1, args.requests // 20), concurrency=1))
+    return {"rows": args.rows, "setup_seconds": round(setup_seconds, 3), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1000,10000,50000,200000", help="comma-separated TicketLog sizes")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sheets-latency", type=float, default=0.0, help="seconds per Sheets API call")
+    parser.add_argument("--slack-latency", type=float, default=0.0, help="seconds per Slack API call")
+    parser.add_argument("--rate-limits", action="store_true", help="enforce Slack and Sheets rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = int(args.rows)
+        print(json.dumps(run_child(args)))
+        return
+
+    runs = []
+    for rows in [int(r) for r in args.rows.split(",")]:
+        child_args = [sys.executable, os.path.abspath(__file__), "--child", "--rows", str(rows),
+                      "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                      "--sheets-latency", str(args.sheets_latency), "--slack-latency", str(args.slack_latency),
+                      "--seed", str(args.seed)] + (["--rate-limits"] if args.rate_limits else [])
+        out = subprocess.run(child_args, capture_output=True, text=True, check=True,
+                             env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__))))
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        print(f"\nrows={rows} (first request loaded the store in {run['setup_seconds']:.2f}s)")
+        print(f"{'scenario':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for result in run["results"]:
+            print(f"{result['scenario']:<18}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+
+    if args.output:
+        report = {
+            "benchmark": "load",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("child", "output")},
+            "runs": runs,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Per-request logging overhead: synchronous file handler vs the queued pipeline.
+
+Each simulated request logs what ``/slack/events`` does for a button click:
+an info line on arrival, a debug dump of the payload, a couple of debug
+lines from the helpers and an info line with the timing breakdown. The
+time spent in the request thread is reported per request; for the queued
+pipeline the listener thread's time to drain the queue is reported
+separately, since it is off the request path.
+
+    python benchmarks/bench_logging.py --requests 20000
+"""
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from _support import import_app_module
+
+pipeline = import_app_module("logging_pipeline")
+
+PAYLOAD = {
+    "type": "block_actions",
+    "user": {"id": "U0001", "username": "agent", "team_id": "T0001"},
+    "trigger_id": "1234567890.1234567890.abcdef",
+    "actions": [{"action_id": "resolve_T1001", "value": "T1001", "action_ts": "1700000000.000100", "type": "button"}],
+    "message": {"ts": "1700000000.000100", "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": "x" * 120}}] * 8},
+    "channel": {"id": "C0001", "name": "systems-issues"},
+}
+
+
+def eager_request(logger, i):
+    # The logging in routes/helpers before the pipeline: f-strings built whatever the level
+    logger.info("Received request at /slack/events")
+    logger.debug(f"Received payload: {PAYLOAD}")
+    logger.debug(f"Checking if user {'U0001'} is a system user")
+    logger.debug(f"Updating Slack message with timestamp {'1700000000.000100'}")
+    logger.info(f"POST /slack/events timing: sheets;dur={1.5 + i % 7:.1f}, slack;dur=3.2, total;dur=6.1")
+
+
+def lazy_request(logger, i):
+    logger.info("Received request at /slack/events")
+    logger.debug("Received payload: %s", PAYLOAD)
+    logger.debug("Checking if user %s is a system user", "U0001")
+    logger.debug("Updating Slack message with timestamp %s", "1700000000.000100")
+    logger.info("%s %s timing: %s", "POST", "/slack/events", f"sheets;dur={1.5 + i % 7:.1f}, slack;dur=3.2, total;dur=6.1",
+                extra={"timing_ms": {"sheets": 1.5 + i % 7, "slack": 3.2}})
+
+
+def sync_logger(directory, level):
+    logger = logging.getLogger(f"bench.sync.{level}")
+    handler = RotatingFileHandler(os.path.join(directory, f"sync-{level}.log"), maxBytes=10 ** 9)
+    handler.setFormatter(logging.Formatter(pipeline.TEXT_FORMAT))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger, lambda: None
+
+
+def queued_logger(directory, level, sample_rate=1.0):
+    logger = logging.getLogger(f"bench.queued.{level}.{sample_rate}")
+    handler = RotatingFileHandler(os.path.join(directory, f"queued-{level}-{sample_rate}.log"), maxBytes=10 ** 9)
+    handler.setFormatter(pipeline.JsonFormatter())
+    records = queue.SimpleQueue()
+    queue_handler = pipeline.LazyQueueHandler(records)
+    queue_handler.addFilter(pipeline.DebugSampler(sample_rate))
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    listener = QueueListener(records, handler)
+    listener.start()
+    return logger, listener.stop
+
+
+def measure(make_logger, request, count):
+    logger, stop = make_logger()
+    started = time.perf_counter()
+    for i in range(count):
+        request(logger, i)
+    in_request = time.perf_counter() - started
+    stop()  # waits for the listener to drain the queue
+    total = time.perf_counter() - started
+    return in_request / count * 1e6, (total - in_request) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-logging-")
+    cases = [
+        ("sync handler, f-strings, INFO", lambda: sync_logger(directory, "INFO"), eager_request),
+        ("queued JSON, lazy args, INFO", lambda: queued_logger(directory, "INFO"), lazy_request),
+        ("sync handler, f-strings, DEBUG", lambda: sync_logger(directory, "DEBUG"), eager_request),
+        ("queued JSON, lazy args, DEBUG", lambda: queued_logger(directory, "DEBUG"), lazy_request),
+        ("queued JSON, DEBUG sampled 10%", lambda: queued_logger(directory, "DEBUG", 0.1), lazy_request),
+    ]
+    print(f"{args.requests} simulated requests, 5 log calls each")
+    print(f"{'pipeline':<34}{'request us':>12}{'drain us':>10}")
+    for name, make_logger, request in cases:
+        in_request, drain = measure(make_logger, request, args.requests)
+        print(f"{name:<34}{in_request:>12.1f}{drain:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
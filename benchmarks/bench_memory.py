@@ -0,0 +1,92 @@
+"""Memory and transfer benchmark for the TicketLog read path.
+
+Compares the previous read, ``get_all_values()`` kept as 13-column string
+lists, with ``TicketCache``, which reads only the listing columns through
+``batch_get`` and keeps compact ``Ticket`` records with interned values.
+Responses are round-tripped through JSON, as the API client does, so the
+bytes count approximates the transfer and every string is freshly allocated.
+
+    python benchmarks/bench_memory.py --rows 50000 --details-chars 400 --comments-chars 200
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from _support import import_app_module
+from fakes import HEADER, FakeWorksheet, synthetic_rows
+
+TicketCache = import_app_module("ticket_cache").TicketCache
+_pad = import_app_module("tickets")._pad
+
+
+class JsonWorksheet:
+    """Passes reads through JSON and counts the response bytes."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.bytes_read = 0
+
+    def _decode(self, values):
+        payload = json.dumps(values)
+        self.bytes_read += len(payload)
+        return json.loads(payload)
+
+    def get_all_values(self):
+        return self._decode(self.worksheet.get_all_values())
+
+    def batch_get(self, ranges):
+        return self._decode(self.worksheet.batch_get(ranges))
+
+
+def legacy_load(worksheet):
+    values = worksheet.get_all_values()
+    return {row[0]: _pad(row) for row in values[1:] if row and row[0]}
+
+
+def projected_load(worksheet):
+    cache = TicketCache(worksheet)
+    cache.load()
+    return cache
+
+
+def measure(load, worksheet):
+    gc.collect()
+    tracemalloc.start()
+    index = load(worksheet)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return index, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--details-chars", type=int, default=400)
+    parser.add_argument("--comments-chars", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    for row in rows:
+        row[6] = (row[6] + " ") * (args.details_chars // (len(row[6]) + 1) + 1)
+        row[6] = row[6][:args.details_chars]
+        row[12] = ("U0001: checked the laptop, waiting on IT. " * (args.comments_chars // 42 + 1))[:args.comments_chars]
+    fake = FakeWorksheet("TicketLog", [HEADER] + rows)
+
+    print(f"{args.rows} tickets, {args.details_chars}-char details, {args.comments_chars}-char comments")
+    print(f"{'read path':<34}{'transfer MB':>12}{'resident MB':>13}{'peak MB':>10}{'bytes/ticket':>14}")
+    results = {}
+    for name, load in (("get_all_values + lists (before)", legacy_load), ("batch_get + Ticket (after)", projected_load)):
+        worksheet = JsonWorksheet(fake)
+        index, current, peak = measure(load, worksheet)
+        results[name] = current
+        print(f"{name:<34}{worksheet.bytes_read / 1e6:>12.1f}{current / 1e6:>13.1f}{peak / 1e6:>10.1f}"
+              f"{current / args.rows:>14.0f}")
+        del index
+    before, after = results.values()
+    print(f"resident memory reduced {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
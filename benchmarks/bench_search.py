@@ -0,0 +1,123 @@
+"""Ticket search: inverted index vs scanning every row.
+
+Details and comments are filled with words drawn from a Zipf-like
+distribution over a synthetic vocabulary, plus a few real ones, so common
+words match many tickets and rare ones few. The scan is what a search had
+to do before the index: lower-case substring matches over every row's ID,
+campaign, issue type, details and comments (without the ``get_all_values()``
+call it also needed). Build time and memory of the index are reported too.
+
+    python benchmarks/bench_search.py --rows 100000
+
+Needs numpy installed.
+"""
+import argparse
+import gc
+import random
+import resource
+import statistics
+import time
+
+from _support import import_app_module
+from fakes import synthetic_rows
+
+search = import_app_module("search")
+TICKET_FIELDS = import_app_module("tickets").TICKET_FIELDS
+
+REAL_WORDS = ["salesforce", "freezing", "crashing", "dialer", "headset", "static", "lockout", "gmail", "packet",
+              "voicemail", "recording", "laptop", "battery", "keyboard", "login", "password", "reset", "client"]
+QUERIES = ["dialer", "salesforce freezing", "lockout gmail", "T51234", "headset stat", "word17 word230", "word4 word5 word6"]
+
+
+def vocabulary_sampler(size, rng):
+    words = REAL_WORDS + [f"word{i}" for i in range(size)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return lambda count: rng.choices(words, weights, k=count)
+
+
+def documents(count, seed=0):
+    rng = random.Random(seed)
+    sample = vocabulary_sampler(20000, rng)
+    rows = synthetic_rows(count, seed=seed)
+    fields = [TICKET_FIELDS.index(field) for field in search.SEARCH_FIELDS]
+    for row in rows:
+        row[6] = " ".join(sample(rng.randint(10, 60)))
+        row[12] = " ".join(sample(rng.randint(0, 20)))
+    return [tuple(row[i] for i in fields) for row in rows]
+
+
+def scan(rows, query):
+    words = query.lower().split()
+    matches = []
+    for row in rows:
+        text = " ".join((row[0], row[1], row[2], row[6], row[7])).lower()
+        if all(word in text for word in words):
+            matches.append(row[0])
+    return matches
+
+
+class RowList:
+    """The parts of TicketStore and TicketEventLog the index reads, over a list of rows and no events."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def rows_since(self, position, fields, limit):
+        rows = self.rows[position:position + limit]
+        return rows, position + len(rows)
+
+    def last_event_id(self):
+        return 0
+
+    def events_since(self, after, up_to, limit):
+        return []
+
+
+def build(rows):
+    index = search.TicketSearchIndex()
+    feed = RowList(rows)
+    index.start_loading(feed, feed)
+    while not index.ready:
+        time.sleep(0.01)
+    return index
+
+
+def time_queries(run, repeat):
+    timings = {}
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run(query)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[query] = (statistics.median(samples), result)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = documents(args.rows)
+    gc.collect()
+    # Peak RSS growth (KiB on Linux); tracemalloc would slow the build down several times over
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index = build(rows)
+    build_seconds = time.perf_counter() - started
+    index_mib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(f"{args.rows} tickets: index built in {build_seconds:.1f}s, about {index_mib:.0f} MiB")
+
+    scanned = time_queries(lambda query: len(scan(rows, query)), max(1, args.repeat // 10))
+    indexed = time_queries(lambda query: index.search(query, 0, 10)[1], args.repeat)
+    print(f"{'query':<22}{'scan ms':>10}{'matches':>9}{'index ms':>10}{'matches':>9}")
+    for query in QUERIES:
+        (scan_ms, scan_matches), (index_ms, index_matches) = scanned[query], indexed[query]
+        print(f"{query:<22}{scan_ms:>10.1f}{scan_matches:>9}{index_ms:>10.2f}{index_matches:>9}")
+    print("(the scan matches substrings, the index whole words and a prefix of the last one)")
+
+
+if __name__ == "__main__":
+    main()
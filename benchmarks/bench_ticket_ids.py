@@ -0,0 +1,85 @@
+"""Concurrent allocation benchmark for the SQLite ticket ID allocator.
+
+Spawns several processes, each with several threads, all allocating IDs from
+the same counter file, then checks that no ID was handed out twice.
+
+    python benchmarks/bench_ticket_ids.py --processes 4 --threads 8 --count 500
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from _support import import_app_module
+
+TicketIdAllocator = import_app_module("ticket_ids").TicketIdAllocator
+
+
+def _worker(path, threads, count, results):
+    allocator = TicketIdAllocator(path, seed=lambda: 1000)
+    ids = []
+    latencies = []
+    lock = threading.Lock()
+
+    def run():
+        local_ids = []
+        local_latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            local_ids.append(allocator.next_id())
+            local_latencies.append(time.perf_counter() - start)
+        with lock:
+            ids.extend(local_ids)
+            latencies.extend(local_latencies)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((ids, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--count", type=int, default=250, help="IDs allocated per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ticket_ids.sqlite3")
+        results = multiprocessing.Queue()
+        started = time.perf_counter()
+        procs = [multiprocessing.Process(target=_worker, args=(path, args.threads, args.count, results))
+                 for _ in range(args.processes)]
+        for proc in procs:
+            proc.start()
+        all_ids = []
+        latencies = []
+        for _ in procs:
+            ids, lat = results.get()
+            all_ids.extend(ids)
+            latencies.extend(lat)
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+
+    expected = args.processes * args.threads * args.count
+    duplicates = len(all_ids) - len(set(all_ids))
+    latencies.sort()
+    print(f"allocated:   {len(all_ids)} (expected {expected})")
+    print(f"duplicates:  {duplicates}")
+    print(f"throughput:  {len(all_ids) / elapsed:,.0f} ids/s")
+    print(f"latency p50: {statistics.median(latencies) * 1e6:,.0f} us")
+    print(f"latency p99: {latencies[int(len(latencies) * 0.99) - 1] * 1e6:,.0f} us")
+    if duplicates or len(all_ids) != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""In-process stand-ins for the Google Sheets worksheet and the Slack WebClient and AsyncWebClient.
+
+Both sleep for a configurable latency on every call and can enforce a
+per-minute request quota, failing the way the real services do when it is
+exceeded, so the app's batching, retries and rate limiting are exercised.
+"""
+import asyncio
+import itertools
+import random
+import re
+import threading
+import time
+
+CAMPAIGNS = ["Camp Lejeune", "Maui Wildfires", "LA Wildfire", "Depo-Provera", "CPP Sick and Family Leave"]
+ISSUE_TYPES = ["Salesforce Performance Issues", "Vonage Dialer Functionality Issues", "Account Lockout", "MFA Failure", "Other"]
+PRIORITIES = ["Low", "Medium", "High"]
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+HEADER = ["Ticket ID", "Assigned To", "Campaign", "Issue Type", "Priority", "Status", "Details",
+          "Salesforce Link", "File Attachment", "Created Date", "Requester", "Last Updated", "Comments"]
+
+
+def synthetic_rows(count, requesters=None, seed=0, first_number=1001):
+    """Generate ``count`` TicketLog rows spread over ``requesters`` users."""
+    rng = random.Random(seed)
+    requesters = requesters or max(1, count // 50)
+    rows = []
+    for i in range(count):
+        status = rng.choice(STATUSES)
+        created = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2024"
+        rows.append([
+            f"T{first_number + i}", "Unassigned" if status == "Open" else f"U{rng.randrange(20):04d}",
+            rng.choice(CAMPAIGNS), rng.choice(ISSUE_TYPES), rng.choice(PRIORITIES), status,
+            f"Synthetic ticket {i}", "", "N/A", created, f"R{rng.randrange(requesters):05d}", created, "",
+        ])
+    return rows
+
+
+class RateLimitedError(Exception):
+    """Raised by the fakes when their quota is exceeded; carries a 429 ``response`` like the real clients."""
+
+    def __init__(self, service, retry_after=1):
+        super().__init__(f"{service} rate limited")
+        self.response = _Response(429, {"Retry-After": str(retry_after)})
+
+
+class _Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class Quota:
+    """Fixed one-minute window request quota; ``per_minute=None`` means unlimited."""
+
+    def __init__(self, per_minute=None):
+        self.per_minute = per_minute
+        self._window = None
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def check(self, service):
+        if self.per_minute is None:
+            return
+        with self._lock:
+            window = int(time.monotonic() // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            if self._used >= self.per_minute:
+                raise RateLimitedError(service, retry_after=60 - time.monotonic() % 60)
+            self._used += 1
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+_A1 = re.compile(r"^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+
+def _parse_range(range_name):
+    first_col, first_row, last_col, last_row = _A1.match(range_name).groups()
+    last_col = last_col or first_col
+    return (_column_number(first_col), int(first_row) if first_row else 1,
+            _column_number(last_col), int(last_row) if last_row else None)
+
+
+class FakeWorksheet:
+    """The subset of ``gspread.Worksheet`` the app uses, backed by a list of rows."""
+
+    def __init__(self, title, rows=(), latency=0.0, quota=None):
+        self.title = title
+        self.rows = [list(row) for row in rows]
+        self.latency = latency
+        self.quota = quota or Quota()
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _request(self, name):
+        self.quota.check("Sheets")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _trim(self, row):
+        # The values API drops trailing empty cells
+        while row and row[-1] == "":
+            row = row[:-1]
+        return row
+
+    def get_all_values(self, **kwargs):
+        self._request("get_all_values")
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def _values(self, range_name):
+        first_col, first_row, last_col, last_row = _parse_range(range_name)
+        with self._lock:
+            return [self._trim(row[first_col - 1:last_col]) for row in self.rows[first_row - 1:last_row]]
+
+    def get(self, range_name, **kwargs):
+        self._request("get")
+        return self._values(range_name)
+
+    def batch_get(self, ranges, **kwargs):
+        self._request("batch_get")
+        return [self._values(range_name) for range_name in ranges]
+
+    def row_values(self, row, **kwargs):
+        self._request("row_values")
+        with self._lock:
+            return self._trim(list(self.rows[row - 1])) if row <= len(self.rows) else []
+
+    def col_values(self, col, **kwargs):
+        self._request("col_values")
+        with self._lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        self._request("append_rows")
+        with self._lock:
+            self.rows.extend(list(row) for row in values)
+
+    def update(self, range_name, values, **kwargs):
+        self.batch_update([{"range": range_name, "values": values}])
+
+    def batch_update(self, data, **kwargs):
+        self._request("batch_update")
+        with self._lock:
+            for item in data:
+                first_col, first_row, _, _ = _parse_range(item["range"])
+                for offset, values in enumerate(item["values"]):
+                    while len(self.rows) < first_row + offset:
+                        self.rows.append([])
+                    row = self.rows[first_row + offset - 1]
+                    row.extend([""] * (first_col - 1 + len(values) - len(row)))
+                    row[first_col - 1:first_col - 1 + len(values)] = values
+
+
+class FakeWebClient:
+    """Answers any ``slack_sdk.WebClient`` method with ``{"ok": True}`` after ``latency`` seconds.
+
+    ``rates`` maps method names to requests per minute; methods without an
+    entry are unlimited.
+    """
+
+    def __init__(self, latency=0.0, rates=None):
+        self.latency = latency
+        self.quotas = {method: Quota(rate) for method, rate in (rates or {}).items()}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._ts = itertools.count(1)
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def call(**kwargs):
+            quota = self.quotas.get(method)
+            if quota is not None:
+                quota.check("Slack")
+            if self.latency:
+                time.sleep(self.latency)
+            with self._lock:
+                self.calls[method] = self.calls.get(method, 0) + 1
+            return {"ok": True, "ts": f"{time.time():.0f}.{next(self._ts):06d}", "channel": kwargs.get("channel")}
+        return call
+
+
+class FakeAsyncWebClient(FakeWebClient):
+    """``FakeWebClient`` for ``slack_sdk``'s ``AsyncWebClient``: every method is a coroutine that awaits ``latency``."""
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        async def call(**kwargs):
+            quota = self.quotas.get(method)
+            if quota is not None:
+                quota.check("Slack")
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            with self._lock:
+                self.calls[method] = self.calls.get(method, 0) + 1
+            return {"ok": True, "ts": f"{time.time():.0f}.{next(self._ts):06d}", "channel": kwargs.get("channel")}
+        return call
@@ -1,6 +1,4 @@
 import os
-import logging
-from logging.handlers import RotatingFileHandler
 from flask import Flask
 from apscheduler.schedulers.background import BackgroundScheduler
 import pytz
@@ -9,41 +7,62 @@ import atexit
 # Initialize Flask app
 app = Flask(__name__)
 
-# Configure logging
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Ensure the logs directory exists
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-
-handler = RotatingFileHandler('logs/app.log', maxBytes=1000000, backupCount=5)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+# Configure logging; files are written by a background thread, see logging_pipeline.py.
+# Read from the environment rather than Config so config.py's own messages are captured.
+from apps.logging_pipeline import configure_logging  # type: ignore
+logger = configure_logging(
+    __name__,
+    level=os.environ.get("LOG_LEVEL", "INFO"),
+    json_format=os.environ.get("LOG_FORMAT", "json").lower() == "json",
+    debug_sample_rate=float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", 1.0)),
+)
 logger.info("Application initialized.")
 
 # Import configurations
 from apps.config import Config  # type: ignore # Ensure it matches the new structure
 app.config.from_object(Config)
 
-# Initialize Slack client
-from slack_sdk import WebClient
-client = WebClient(token=app.config['SLACK_BOT_TOKEN'])
-logger.info("Slack client initialized.")
+# Share the Slack client created in config
+from apps.config import client  # type: ignore
+
+# All outbound Slack calls go through the dispatcher so they share per-method rate limits
+from apps.slack_dispatcher import AsyncSlackDispatcher, SlackDispatcher  # type: ignore
+if app.config['SERVER_MODE'] == "async":
+    # Calls in flight are coroutines on the dispatcher's event loop rather than blocked threads; see async_server.py
+    from apps.config import async_slack_client  # type: ignore
+    dispatcher = AsyncSlackDispatcher(async_slack_client, max_in_flight=app.config['SLACK_MAX_IN_FLIGHT'])
+else:
+    dispatcher = SlackDispatcher(client, workers=app.config['SLACK_DISPATCH_WORKERS'])
+atexit.register(lambda: dispatcher.shutdown())
 
-# Initialize Google Sheets
+# Ticket message edits are debounced per message; see message_updates.py
+from apps.message_updates import MessageUpdateCoalescer  # type: ignore
+message_updates = MessageUpdateCoalescer(dispatcher, delay=app.config['CHAT_UPDATE_DEBOUNCE_SECONDS'],
+                                         max_delay=app.config['CHAT_UPDATE_MAX_DELAY_SECONDS'])
+atexit.register(lambda: message_updates.close())
+
+# Google Sheets connects lazily on first use; see clients.py
 from apps.config import sheet  # type: ignore # Ensure correct import
-logger.info("Google Sheets initialized.")
 
-# Initialize scheduler
-scheduler = BackgroundScheduler(timezone=pytz.timezone(app.config['TIMEZONE']))
-scheduler.start()
-atexit.register(lambda: scheduler.shutdown())
-logger.info("Scheduler tasks added.")
+# Initialize scheduler; it is only started in the process elected leader below
+background_scheduler = BackgroundScheduler(timezone=pytz.timezone(app.config['TIMEZONE']))
+atexit.register(lambda: background_scheduler.running and background_scheduler.shutdown())
+
+# Initialize the worker pool used to process Slack events after acknowledging them
+from apps.jobs import JobQueue  # type: ignore
+job_queue = JobQueue(max_workers=app.config['JOB_WORKERS'], max_pending=app.config['JOB_QUEUE_SIZE'])
+atexit.register(lambda: job_queue.shutdown())
+logger.info("Job queue initialized.")
 
 # Import routes, helpers, and scheduler tasks
 from apps import routes, helpers, scheduler  # Ensure correct import
 
+# Exactly one process per host runs the scheduled jobs
+from apps.leader import LeaderElection  # type: ignore
+leader_election = LeaderElection(app.config['SCHEDULER_LOCK_FILE'], on_elected=scheduler.start_scheduler,
+                                 poll_interval=app.config['LEADER_POLL_SECONDS'])
+leader_election.start()
+atexit.register(leader_election.stop)
+
 def create_app():
     return app
\ No newline at end of file
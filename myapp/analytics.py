@@ -0,0 +1,124 @@
+import csv
+import io
+import logging
+
+# numpy and pandas are imported where they are used: they add noticeably to worker
+# boot, and only the weekly summary and exports need them
+
+logger = logging.getLogger(__name__)
+
+# A ticket counts as resolved from its first move into one of these
+RESOLVED_STATUSES = ("Resolved", "Closed")
+ANALYTICS_FIELDS = ("ticket_id", "campaign", "issue_type", "priority", "status", "created_date")
+CATEGORY_FIELDS = ("campaign", "issue_type", "priority", "status")
+PERCENTILES = (50, 90)
+
+TICKET_DATE_FORMAT = "%m/%d/%Y"
+EVENT_TIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+
+def load_ticket_frame(row_chunks, resolutions):
+    """Build one row per ticket with columnar dtypes.
+
+    ``row_chunks`` yields lists of ``ANALYTICS_FIELDS`` tuples
+    (``TicketStore.iter_rows``) and ``resolutions`` is ``(ticket_id, created_at)`` of each ticket's first
+    move to a resolved status (``TicketEventLog.first_status_changes``).
+    Text columns become categoricals and dates ``datetime64``, so the frame
+    costs a few bytes per ticket whatever the text. ``hours_to_resolve`` is
+    measured from the start of the created day, since TicketLog only keeps
+    the date; it is NaN for open tickets and for tickets resolved before the
+    event log was kept, whose ``resolved`` time is unknown.
+    """
+    import pandas as pd
+
+    frames = [pd.DataFrame(rows, columns=list(ANALYTICS_FIELDS)) for rows in row_chunks]
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(ANALYTICS_FIELDS))
+    frame["created"] = pd.to_datetime(frame.pop("created_date"), format=TICKET_DATE_FORMAT, errors="coerce")
+    for field in CATEGORY_FIELDS:
+        frame[field] = frame[field].astype("category")
+
+    resolved = pd.DataFrame(list(resolutions), columns=["ticket_id", "resolved"])
+    resolved["resolved"] = pd.to_datetime(resolved["resolved"], format=EVENT_TIME_FORMAT, errors="coerce")
+    frame = frame.merge(resolved, on="ticket_id", how="left")
+    # A ticket reopened since its first resolution is back in the backlog
+    frame.loc[~frame["status"].isin(RESOLVED_STATUSES), "resolved"] = pd.NaT
+    frame["hours_to_resolve"] = (frame["resolved"] - frame["created"]).dt.total_seconds() / 3600
+    return frame
+
+
+def resolution_percentiles(frame, by=(), percentiles=PERCENTILES, since=None):
+    """Return the count and percentiles of ``hours_to_resolve`` per ``by`` group.
+
+    Columns are ``count`` and ``p50``, ``p90`` and so on; with no ``by`` the
+    result has a single ``all`` row. Only tickets resolved at or after
+    ``since`` count when it is given.
+    """
+    import pandas as pd
+
+    resolved = frame[frame["hours_to_resolve"].notna()]
+    if since is not None:
+        resolved = resolved[resolved["resolved"] >= since]
+    quantiles = [p / 100 for p in percentiles]
+    columns = [f"p{p}" for p in percentiles]
+    if not by:
+        values = resolved["hours_to_resolve"].quantile(quantiles).tolist() if len(resolved) else [float("nan")] * len(quantiles)
+        return pd.DataFrame([[len(resolved)] + values], index=["all"], columns=["count"] + columns)
+    grouped = resolved.groupby(list(by), observed=True)["hours_to_resolve"]
+    return pd.DataFrame({"count": grouped.size(), **{column: grouped.quantile(q) for column, q in zip(columns, quantiles)}})
+
+
+def backlog_trend(frame, weeks, now):
+    """Return the tickets opened and resolved each week and the backlog left at the end of it.
+
+    Weeks start on Monday; the last row is the week before the one ``now``
+    falls in. Tickets resolved at an unknown time are left out entirely.
+    """
+    import numpy as np
+    import pandas as pd
+
+    known = frame[frame["resolved"].notna() | ~frame["status"].isin(RESOLVED_STATUSES)]
+    this_week = pd.Timestamp(now).normalize() - pd.Timedelta(days=pd.Timestamp(now).weekday())
+    boundaries = this_week - pd.to_timedelta(np.arange(weeks, -1, -1) * 7, unit="D")
+    created = np.sort(known["created"].dropna().to_numpy())
+    resolved = np.sort(known["resolved"].dropna().to_numpy())
+    # Tickets opened/resolved before each boundary; the backlog is the difference
+    opened_before = np.searchsorted(created, boundaries.to_numpy(), side="left")
+    resolved_before = np.searchsorted(resolved, boundaries.to_numpy(), side="left")
+    return pd.DataFrame({
+        "opened": np.diff(opened_before),
+        "resolved": np.diff(resolved_before),
+        "backlog": (opened_before - resolved_before)[1:],
+    }, index=pd.Index(boundaries[:-1], name="week"))
+
+
+def csv_chunks(header, row_chunks):
+    """Yield a CSV file a chunk of rows at a time, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in row_chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_parquet(file, header, row_chunks):
+    """Write rows to ``file`` as Parquet, one row group per chunk. Needs pyarrow."""
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([(name, pyarrow.string()) for name in header])
+    rows_written = 0
+    with pyarrow.parquet.ParquetWriter(file, schema) as writer:
+        for rows in row_chunks:
+            if not rows:
+                continue
+            columns = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, pyarrow.string()) for column in columns], schema=schema))
+            rows_written += len(rows)
+    logger.info("Wrote %d rows to Parquet", rows_written)
+    return rows_written
@@ -0,0 +1,349 @@
+from aiohttp import web
+import asyncio
+import contextvars
+import functools
+import hmac
+import json
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from apps import dispatcher, job_queue, message_updates
+from apps.config import Config # type: ignore
+from apps.metrics import (REGISTRY, finish_breakdown, http_request_seconds, job_seconds, server_timing, # type: ignore
+                          slack_queue_depth, start_breakdown)
+from apps.slack_dispatcher import PRIORITY_HIGH, PRIORITY_URGENT # type: ignore
+from apps.idempotency import delivery_key # type: ignore
+from apps.analytics import csv_chunks, write_parquet # type: ignore
+from apps.jobs import call_with_retries_async # type: ignore
+from apps.routes import VIEWS_OPEN_DEADLINE, slack_deliveries # type: ignore
+from apps.helpers import (EXPORT_DATASETS, build_agent_tickets_view, build_new_ticket_modal, build_search_results_view, build_ticket, # type: ignore
+                          bulk_update_tickets, export_rows, generate_ticket_id, handle_ticket_action, is_system_user, log_ticket,
+                          parse_bulk_command, record_new_ticket, record_ticket_posted, send_ticket_confirmation, ticket_post_kwargs)
+
+# asyncio serving mode (SERVER_MODE=async): the routes of routes.py served by aiohttp, e.g.
+#   gunicorn apps.async_server:create_app --worker-class aiohttp.GunicornWebWorker
+# A request waiting on Slack is a suspended coroutine rather than a blocked thread, so one worker keeps
+# hundreds of interactions in flight. Slack calls are awaited through the AsyncSlackDispatcher; Sheets and
+# SQLite have no async clients, so their calls run on a pool of ASYNC_BLOCKING_THREADS threads.
+
+logger = logging.getLogger(__name__)
+
+blocking_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_BLOCKING_THREADS, thread_name_prefix="blocking")
+# Work acknowledged before it finishes (ASYNC_EVENTS); held here so the tasks are not garbage collected
+background_jobs = set()
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run ``fn`` on the blocking pool in the caller's context, so per-request timings include it."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(blocking_executor, call)
+
+async def run_job(name, work):
+    """Await the ``work`` coroutine, or with ``ASYNC_EVENTS`` run it in the background, at most ``JOB_QUEUE_SIZE`` at once."""
+    if not (Config.ASYNC_EVENTS and len(background_jobs) < Config.JOB_QUEUE_SIZE):
+        await work
+        return
+    task = asyncio.ensure_future(_timed_job(name, work))
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+
+async def _timed_job(name, work):
+    started = time.perf_counter()
+    ok = False
+    try:
+        await work
+        ok = True
+    except Exception as e:
+        logger.error("Job %s failed: %s", name, e)
+    finally:
+        elapsed = time.perf_counter() - started
+        job_seconds.observe(elapsed, job=name.split(":", 1)[0], outcome="ok" if ok else "error")
+        logger.info("Job %s %s in %.3fs", name, "finished" if ok else "failed", elapsed)
+
+async def create_ticket(ticket):
+    """Save a new ticket, post it to the channel and confirm to the requester.
+
+    Like ``helpers.create_ticket``, but nothing holds a thread while Slack
+    answers: once the ticket is saved, the channel post and the confirmation
+    DM are in flight together while the bookkeeping runs on the blocking
+    pool, and only the pin record waits for the post.
+    """
+    await run_blocking(log_ticket, ticket)
+    posted = dispatcher.acall("chat_postMessage", **ticket_post_kwargs(ticket))
+    send_ticket_confirmation(ticket)
+    response, _ = await asyncio.gather(posted, run_blocking(record_new_ticket, ticket), return_exceptions=True)
+    if isinstance(response, Exception):
+        logger.warning("Posting ticket %s failed: %s; retrying", ticket.ticket_id, response)
+        response = await call_with_retries_async(dispatcher.acall, "chat_postMessage", retries=Config.JOB_RETRIES,
+                                                 **ticket_post_kwargs(ticket))
+    logger.info("Ticket %s posted to Slack", ticket.ticket_id)
+    await run_blocking(record_ticket_posted, ticket, response)
+
+def error_response(route, e):
+    logger.error("Error in %s: %s", route, e)
+    return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+# Time every route; with REQUEST_TIMING on, also break each request down by Sheets/Slack call
+@web.middleware
+async def time_requests(request, handler):
+    started = time.perf_counter()
+    timing_token = start_breakdown() if Config.REQUEST_TIMING else None
+    response, status = None, 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        http_request_seconds.observe(elapsed, endpoint=request.match_info.route.name or "unknown", method=request.method, status=status)
+        if timing_token is not None:
+            header, timing_ms = server_timing(finish_breakdown(timing_token), elapsed)
+            # Streamed responses have sent their headers already
+            if response is not None and not response.prepared:
+                response.headers["Server-Timing"] = header
+            logger.info("%s %s timing: %s", request.method, request.path, header, extra={"timing_ms": timing_ms})
+
+async def new_ticket(request):
+    logger.info("Received /new-ticket request")
+    try:
+        data = await request.post()
+        trigger_id = data.get("trigger_id")
+        logger.debug("Trigger ID: %s", trigger_id)
+
+        modal = build_new_ticket_modal()
+        response = await dispatcher.acall("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("New ticket modal opened: %s", response)
+        return web.Response()
+    except Exception as e:
+        return error_response("/new-ticket", e)
+
+async def agent_tickets(request):
+    logger.info("Received /agent-tickets request")
+    try:
+        data = await request.post()
+        trigger_id = data.get("trigger_id")
+        user_id = data.get("user_id")
+        logger.debug("Trigger ID: %s, User ID: %s", trigger_id, user_id)
+
+        modal = await run_blocking(build_agent_tickets_view, user_id)
+        response = await dispatcher.acall("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("Agent tickets modal opened: %s", response)
+        return web.Response()
+    except Exception as e:
+        return error_response("/agent-tickets", e)
+
+async def search_tickets(request):
+    logger.info("Received /search-tickets request")
+    try:
+        data = await request.post()
+        trigger_id = data.get("trigger_id")
+        query = (data.get("text") or "").strip()
+        logger.debug("Search from %s: %s", data.get("user_id"), query)
+        if not query:
+            return web.json_response({"response_type": "ephemeral", "text": "Usage: /search-tickets words to look for, e.g. /search-tickets vonage dialer"})
+
+        modal = await run_blocking(build_search_results_view, query)
+        if modal is None:
+            return web.json_response({"response_type": "ephemeral", "text": "Search is still getting ready, please try again in a few seconds."})
+        response = await dispatcher.acall("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("Search results modal opened: %s", response)
+        return web.Response()
+    except Exception as e:
+        return error_response("/search-tickets", e)
+
+async def bulk_tickets(request):
+    logger.info("Received /bulk-tickets request")
+    try:
+        data = await request.post()
+        user_id = data.get("user_id")
+        logger.debug("Bulk command from %s: %s", user_id, data.get("text"))
+        if not is_system_user(user_id):
+            return web.json_response({"response_type": "ephemeral", "text": "Only system users can update tickets in bulk."})
+        try:
+            action, assignee, ticket_ids = parse_bulk_command(data.get("text"))
+        except ValueError as e:
+            return web.json_response({"response_type": "ephemeral", "text": str(e)})
+
+        # Slash commands must be answered within 3 seconds; the work and its progress report happen in the background
+        if not job_queue.submit(f"bulk_tickets:{user_id}", bulk_update_tickets, action, ticket_ids, user_id, assignee=assignee):
+            return web.json_response({"response_type": "ephemeral", "text": "Too busy right now, please try again in a minute."})
+        return web.json_response({"response_type": "ephemeral",
+                                  "text": f"Updating {len(ticket_ids)} tickets; progress will be sent to you by direct message."})
+    except Exception as e:
+        return error_response("/bulk-tickets", e)
+
+async def slack_events(request):
+    logger.info("Received request at /slack/events")
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    key = delivery_key(payload) if isinstance(payload, dict) else None
+    if key is None:
+        return await handle_slack_events(payload)
+    try:
+        claimed, cached = await run_blocking(slack_deliveries.claim, key)
+    except Exception as e:
+        logger.error("Error checking delivery %s, handling it anyway: %s", key, e)
+        return await handle_slack_events(payload)
+    if not claimed:
+        logger.info("Duplicate delivery %s (retry %s), not handling it again", key, request.headers.get("X-Slack-Retry-Num", "?"))
+        if cached is None:
+            # The first delivery is still being handled
+            return web.Response()
+        body, status, mimetype = cached
+        return web.Response(text=body, status=status, content_type=mimetype)
+
+    response = await handle_slack_events(payload)
+    try:
+        if response.status < 500:
+            await run_blocking(slack_deliveries.complete, key, [response.text or "", response.status, response.content_type])
+        else:
+            await run_blocking(slack_deliveries.release, key)
+    except Exception as e:
+        logger.error("Error recording delivery %s: %s", key, e)
+    return response
+
+async def handle_slack_events(payload):
+    try:
+        # Handle URL verification challenge (Slack sends this to verify the endpoint)
+        if "challenge" in payload:
+            logger.debug("Received URL verification challenge")
+            return web.json_response({"challenge": payload["challenge"]})
+
+        logger.debug("Received payload: %s", payload)
+
+        # Handle view submissions (e.g., when a user submits the new ticket modal)
+        if payload.get("type") == "view_submission":
+            callback_id = payload["view"]["callback_id"]
+            if callback_id == "new_ticket":
+                try:
+                    values = payload["view"]["state"]["values"]
+                    campaign = values["campaign_block"]["campaign_select"]["selected_option"]["value"]
+                    issue_type = values["issue_type_block"]["issue_type_select"]["selected_option"]["value"]
+                    priority = values["priority_block"]["priority_select"]["selected_option"]["value"]
+                    details = values["details_block"]["details_input"]["value"]
+                    salesforce_link = values.get("salesforce_link_block", {}).get("salesforce_link_input", {}).get("value", "N/A")
+                    user_id = payload["user"]["id"]
+                except (KeyError, TypeError) as e:
+                    logger.warning("Malformed new_ticket submission, missing %s", e)
+                    return web.json_response({"status": "error", "message": "Malformed submission"}, status=400)
+
+                ticket_id = await run_blocking(generate_ticket_id)
+                ticket = build_ticket(ticket_id, campaign, issue_type, priority, details, salesforce_link, user_id)
+                await run_job(f"create_ticket:{ticket_id}", create_ticket(ticket))
+                return web.Response()
+
+        # Handle button clicks (e.g., "Assign to Me", "Close", "Resolve")
+        if payload.get("type") == "block_actions":
+            action = payload["actions"][0]
+            action_id = action["action_id"]
+
+            # Filter and page through the /agent-tickets modal in place
+            if action_id == "status_filter_select" or action_id.startswith("agent_tickets_page_"):
+                view = payload["view"]
+                state = json.loads(view.get("private_metadata") or "{}")
+                if action_id == "status_filter_select":
+                    status_filter, page = action["selected_option"]["value"], 0
+                else:
+                    status_filter, page = state.get("status", "all"), int(action["value"])
+                modal = await run_blocking(build_agent_tickets_view, payload["user"]["id"], status_filter, page)
+                await dispatcher.acall("views_update", priority=PRIORITY_HIGH, view_id=view["id"], hash=view.get("hash"), view=modal)
+                return web.Response()
+
+            if action_id.startswith("search_tickets_page_"):
+                view = payload["view"]
+                state = json.loads(view.get("private_metadata") or "{}")
+                modal = await run_blocking(build_search_results_view, state.get("query", ""), int(action["value"]))
+                if modal is not None:
+                    await dispatcher.acall("views_update", priority=PRIORITY_HIGH, view_id=view["id"], hash=view.get("hash"), view=modal)
+                return web.Response()
+
+            ticket_id = action["value"]
+            user_id = payload["user"]["id"]
+            message_ts = payload["message"]["ts"]
+            # The transition is local; the message update and confirmation DM it queues go out through the dispatcher
+            await run_job(f"ticket_action:{ticket_id}", run_blocking(handle_ticket_action, action_id, ticket_id, user_id, message_ts))
+            return web.Response()
+
+        return web.Response()
+    except Exception as e:
+        return error_response("/slack/events", e)
+
+async def slack_dispatcher_stats(request):
+    return web.json_response(dict(dispatcher.stats(), message_updates=message_updates.stats()))
+
+async def export_history(request):
+    """Download the ticket log or the event log as CSV or Parquet; needs ``Authorization: Bearer <EXPORT_TOKEN>``."""
+    dataset, fmt = request.match_info["dataset"], request.match_info["fmt"]
+    logger.info("Received /export request for %s.%s", dataset, fmt)
+    token = Config.EXPORT_TOKEN
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return web.json_response({"status": "error", "message": "Unauthorized"}, status=401)
+    if dataset not in EXPORT_DATASETS or fmt not in ("csv", "parquet"):
+        return web.json_response({"status": "error", "message": f"No export {dataset}.{fmt}"}, status=404)
+    response = None
+    try:
+        header, row_chunks = export_rows(dataset)
+        if fmt == "csv":
+            # Streamed as it is read, a chunk at a time
+            chunks = csv_chunks(header, row_chunks)
+            response = web.StreamResponse(headers={"Content-Type": "text/csv", "Content-Disposition": f"attachment; filename={dataset}.csv"})
+            await response.prepare(request)
+            while True:
+                chunk = await run_blocking(next, chunks, None)
+                if chunk is None:
+                    break
+                await response.write(chunk.encode())
+            await response.write_eof()
+            return response
+        # Parquet's footer is written last, so row groups are spooled to disk rather than held in memory
+        with tempfile.TemporaryFile() as file:
+            try:
+                await run_blocking(write_parquet, file, header, row_chunks)
+            except ImportError:
+                return web.json_response({"status": "error", "message": "Parquet export needs pyarrow installed"}, status=501)
+            file.seek(0)
+            response = web.StreamResponse(headers={"Content-Type": "application/vnd.apache.parquet",
+                                                   "Content-Disposition": f"attachment; filename={dataset}.parquet"})
+            await response.prepare(request)
+            while True:
+                data = await run_blocking(file.read, 1 << 16)
+                if not data:
+                    break
+                await response.write(data)
+            await response.write_eof()
+            return response
+    except Exception as e:
+        if response is not None and response.prepared:
+            # Too late for an error response; the client sees a truncated download
+            logger.error("Error in /export after the response started: %s", e)
+            raise
+        return error_response("/export", e)
+
+async def metrics(request):
+    # Metrics are per process; each gunicorn worker reports its own
+    slack_queue_depth.set(dispatcher.stats()["queue_depth"])
+    return web.Response(body=REGISTRY.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4"})
+
+async def _shutdown_blocking_pool(app):
+    blocking_executor.shutdown(wait=True)
+
+async def create_app():
+    app = web.Application(middlewares=[time_requests])
+    app.add_routes([
+        web.post("/new-ticket", new_ticket, name="new_ticket"),
+        web.post("/agent-tickets", agent_tickets, name="agent_tickets"),
+        web.post("/search-tickets", search_tickets, name="search_tickets"),
+        web.post("/bulk-tickets", bulk_tickets, name="bulk_tickets"),
+        web.post("/slack/events", slack_events, name="slack_events"),
+        web.get("/slack/dispatcher-stats", slack_dispatcher_stats, name="slack_dispatcher_stats"),
+        web.get(r"/export/{dataset:[^/.]+}.{fmt:[^/.]+}", export_history, name="export_history"),
+        web.get("/metrics", metrics, name="metrics"),
+    ])
+    app.on_cleanup.append(_shutdown_blocking_pool)
+    return app
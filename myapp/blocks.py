@@ -0,0 +1,307 @@
+# Block Kit rendering for tickets. Everything that does not depend on a ticket
+# (the new-ticket modal, option lists, emoji maps, headers, dividers) is built
+# once at import time; per-ticket views build only their text and reuse the
+# shared static blocks, so treat returned views as read-only.
+
+PRIORITY_EMOJI = {"High": "🔴", "Medium": "🟡"}
+DEFAULT_PRIORITY_EMOJI = "🔵"
+STATUS_EMOJI = {"Open": "🟢", "In Progress": "🔵", "Resolved": "🟡"}
+DEFAULT_STATUS_EMOJI = "🔴"
+
+
+def _option(text, value=None):
+    return {"text": {"type": "plain_text", "text": text}, "value": text if value is None else value}
+
+
+CAMPAIGN_OPTIONS = [
+    _option("Camp Lejeune"),
+    _option("Maui Wildfires"),
+    _option("LA Wildfire"),
+    _option("Depo-Provera"),
+    _option("CPP Sick and Family Leave"),
+]
+ISSUE_TYPE_OPTIONS = [
+    _option("🖥️ System & Software - Salesforce Performance Issues (Freezing or Crashing)", "Salesforce Performance Issues"),
+    _option("🖥️ System & Software - Vonage Dialer Functionality Issues", "Vonage Dialer Functionality Issues"),
+    _option("🖥️ System & Software - Broken or Unresponsive Links (ARA, Co-Counsel, Claim Stage, File Upload, etc.)", "Broken or Unresponsive Links"),
+    _option("💻 Equipment & Hardware - Laptop Fails to Power On", "Laptop Fails to Power On"),
+    _option("💻 Equipment & Hardware - Slow Performance or Freezing Laptop", "Slow Performance or Freezing Laptop"),
+    _option("💻 Equipment & Hardware - Unresponsive Keyboard or Mouse", "Unresponsive Keyboard or Mouse"),
+    _option("💻 Equipment & Hardware - Headset/Mic Malfunction (No Sound, Static, etc.)", "Headset/Microphone Malfunction"),
+    _option("💻 Equipment & Hardware - Charger or Battery Failure", "Charger or Battery Failure"),
+    _option("🔐 Security & Account - Multi-Factor Authentication (MFA) Failure (Security Key)", "MFA Failure"),
+    _option("🔐 Security & Account - Account Lockout (Gmail or Salesforce)", "Account Lockout"),
+    _option("📑 Client & Document - Paper Packet Contains Errors or Missing Information", "Paper Packet Errors"),
+    _option("📑 Client & Document - Paper Packet Mailing Status", "Paper Packet Mailing Status"),
+    _option("📑 Client & Document - Client Information Update Request", "Client Information Update Request"),
+    _option("📑 Client & Document - Client System Error (Missing Document Request, Form Submission Failure, Broken or Unresponsive Link)", "Client System Error"),
+    _option("📊 Management Systems - Reports or Dashboards Failing to Load", "Reports or Dashboards Failing to Load"),
+    _option("📊 Management Systems - Automated Voicemail System Malfunction", "Automated Voicemail System Malfunction"),
+    _option("📊 Management Systems - Missing or Inaccessible Call Recordings", "Missing or Inaccessible Call Recordings"),
+    _option("❓ Other (Not Listed Above)", "Other"),
+]
+PRIORITY_OPTIONS = [
+    _option("🔵 Low", "Low"),
+    _option("🟡 Medium", "Medium"),
+    _option("🔴 High", "High"),
+]
+STATUS_FILTER_OPTIONS = [
+    _option("All", "all"),
+    _option("Open"),
+    _option("In Progress"),
+    _option("Resolved"),
+    _option("Closed"),
+]
+STATUS_FILTER_OPTION_BY_VALUE = {option["value"]: option for option in STATUS_FILTER_OPTIONS}
+
+
+def _select_input(block_id, label, action_id, placeholder, options):
+    return {
+        "type": "input",
+        "block_id": block_id,
+        "label": {"type": "plain_text", "text": label},
+        "element": {
+            "type": "static_select",
+            "action_id": action_id,
+            "placeholder": {"type": "plain_text", "text": placeholder},
+            "options": options
+        },
+        "optional": False
+    }
+
+
+NEW_TICKET_MODAL = {
+    "type": "modal",
+    "callback_id": "new_ticket",
+    "title": {"type": "plain_text", "text": "Submit a New Ticket"},
+    "submit": {"type": "plain_text", "text": "Submit"},
+    "close": {"type": "plain_text", "text": "Cancel"},
+    "blocks": [
+        _select_input("campaign_block", "📂 Campaign", "campaign_select", "Select a campaign", CAMPAIGN_OPTIONS),
+        _select_input("issue_type_block", "📌 Issue Type", "issue_type_select", "Select an issue type", ISSUE_TYPE_OPTIONS),
+        _select_input("priority_block", "⚡ Priority", "priority_select", "Select priority", PRIORITY_OPTIONS),
+        {
+            "type": "input",
+            "block_id": "details_block",
+            "label": {"type": "plain_text", "text": "🗂 Details"},
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "details_input",
+                "multiline": True,
+                "placeholder": {"type": "plain_text", "text": "Describe the issue in detail"}
+            },
+            "optional": False
+        },
+        {
+            "type": "input",
+            "block_id": "salesforce_link_block",
+            "label": {"type": "plain_text", "text": "📎 Salesforce Link (Optional)"},
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "salesforce_link_input",
+                "placeholder": {"type": "plain_text", "text": "Paste Salesforce URL"}
+            },
+            "optional": True
+        },
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "📂 *File Upload:* (Optional) Upload the file to Slack and include the file URL in the details field."}
+        }
+    ]
+}
+
+# Static blocks shared by every rendered ticket
+DIVIDER = {"type": "divider"}
+TICKET_HEADER = {"type": "header", "text": {"type": "plain_text", "text": "🎫 Ticket Details", "emoji": True}}
+AGENT_TICKETS_HEADER = {"type": "header", "text": {"type": "plain_text", "text": "🔍 Your Submitted Tickets", "emoji": True}}
+NO_TICKETS_SECTION = {"type": "section", "text": {"type": "mrkdwn", "text": "🎉 You have no submitted tickets.\n\n"}}
+NO_SEARCH_RESULTS_SECTION = {"type": "section", "text": {"type": "mrkdwn", "text": "No tickets match your search."}}
+
+
+# Text shared by the new-ticket and updated-ticket messages
+def _summary_text(campaign, issue_type, priority, assigned_to, status):
+    return (
+        f"📂 *Campaign:* {campaign}\n\n"
+        f"📌 *Issue:* {issue_type}\n\n"
+        f"⚡ *Priority:* {priority} {PRIORITY_EMOJI.get(priority, DEFAULT_PRIORITY_EMOJI)}\n\n"
+        f"👤 *Assigned To:* {assigned_to}\n\n"
+        f"🔄 *Status:* {status} {STATUS_EMOJI.get(status, DEFAULT_STATUS_EMOJI)}\n\n"
+    )
+
+
+def _details_text(details, salesforce_link):
+    return f"🖋️ *Details:* {details}\n\n🔗 *Salesforce Link:* {salesforce_link}\n\n"
+
+
+# Buttons, keyed by the action prefix the /slack/events handler dispatches on
+BUTTONS = {
+    "assign_to_me": ("🖐 Assign to Me", "primary"),
+    "reassign": ("🔁 Reassign", "primary"),
+    "close": ("❌ Close", "danger"),
+    "resolve": ("🟢 Resolve", "primary"),
+    "reopen": ("🔄 Reopen", None),
+}
+NEW_TICKET_ACTIONS = ("assign_to_me", "close", "resolve")
+
+# Buttons offered to system users, by (status, unassigned)
+_MANAGER_ACTIONS = {
+    ("Open", True): ("assign_to_me", "reassign", "close", "resolve"),
+    ("Open", False): ("reassign", "close", "resolve"),
+    ("In Progress", True): ("reassign", "close", "resolve"),
+    ("In Progress", False): ("reassign", "close", "resolve"),
+    ("Resolved", True): ("reopen",),
+    ("Resolved", False): ("reopen",),
+    ("Closed", True): ("reopen",),
+    ("Closed", False): ("reopen",),
+}
+
+
+def _button_template(kind):
+    text, style = BUTTONS[kind]
+    text = {"type": "plain_text", "text": text}
+    prefix = f"{kind}_"
+    if style:
+        return lambda ticket_id: {"type": "button", "text": text, "action_id": prefix + ticket_id, "value": ticket_id, "style": style}
+    return lambda ticket_id: {"type": "button", "text": text, "action_id": prefix + ticket_id, "value": ticket_id}
+
+
+_BUTTON_TEMPLATES = {kind: _button_template(kind) for kind in BUTTONS}
+_ACTION_TEMPLATES = {kinds: tuple(_BUTTON_TEMPLATES[kind] for kind in kinds)
+                     for kinds in set(_MANAGER_ACTIONS.values()) | {NEW_TICKET_ACTIONS}}
+
+
+def _section(text):
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def _buttons(kinds, ticket_id):
+    return [template(ticket_id) for template in _ACTION_TEMPLATES[kinds]]
+
+
+def ticket_actions(status, assigned_to, can_manage):
+    """Return the button kinds offered for a ticket in the given state."""
+    if not can_manage:
+        return ()
+    return _MANAGER_ACTIONS.get((status, assigned_to == "Unassigned"), ())
+
+
+def render_new_ticket_modal():
+    return NEW_TICKET_MODAL
+
+
+def render_new_ticket_message(ticket_id, campaign, issue_type, priority, details, salesforce_link, created_date):
+    """Render the message posted to the channel when a ticket is submitted."""
+    return [
+        TICKET_HEADER,
+        _section(f"✅ *Ticket ID:* {ticket_id}\n\n"),
+        _section(_summary_text(campaign, issue_type, priority, "Unassigned", "Open")),
+        DIVIDER,
+        _section(_details_text(details, salesforce_link)),
+        _section(f"📅 *Created Date:* {created_date}\n\n"),
+        DIVIDER,
+        {"type": "actions", "elements": _buttons(NEW_TICKET_ACTIONS, ticket_id)},
+    ]
+
+
+def render_ticket_message(ticket, can_manage, comments=None):
+    """Render the channel message for a ticket after it changes."""
+    ticket_id, assigned_to, status = ticket.ticket_id, ticket.assigned_to, ticket.status
+    if comments is None:
+        comments = ticket.comments
+    blocks = [
+        TICKET_HEADER,
+        _section(f"✅ *Ticket ID:* {ticket_id}\n\n"),
+        _section(_summary_text(ticket.campaign, ticket.issue_type, ticket.priority,
+                               assigned_to if assigned_to != "Unassigned" else "❌ Unassigned", status)),
+        DIVIDER,
+        _section(_details_text(ticket.details, ticket.salesforce_link or "N/A")),
+        _section(f"📂 *File Attachment:* {ticket.attachment}\n\n"),
+        _section(f"📅 *Created Date:* {ticket.created_date}\n\n"),
+        _section(f"💬 *Comments:* {comments or 'N/A'}\n\n"),
+        DIVIDER,
+    ]
+    kinds = ticket_actions(status, assigned_to, can_manage)
+    if kinds:
+        # Slack rejects an actions block without elements
+        blocks.append({"type": "actions", "elements": _buttons(kinds, ticket_id)})
+    return blocks
+
+
+def render_agent_tickets_view(tickets, status_filter, page, page_count, total, private_metadata):
+    """Render one page of the /agent-tickets modal."""
+    blocks = [
+        AGENT_TICKETS_HEADER,
+        {
+            "type": "actions",
+            "block_id": "status_filter_block",
+            "elements": [
+                {
+                    "type": "static_select",
+                    "action_id": "status_filter_select",
+                    "placeholder": {"type": "plain_text", "text": "Choose a status", "emoji": True},
+                    "options": STATUS_FILTER_OPTIONS,
+                    "initial_option": STATUS_FILTER_OPTION_BY_VALUE[status_filter]
+                }
+            ]
+        },
+        DIVIDER
+    ]
+    if not tickets:
+        blocks.append(NO_TICKETS_SECTION)
+    for ticket in tickets:
+        status_emoji = STATUS_EMOJI.get(ticket.status, DEFAULT_STATUS_EMOJI)
+        blocks.append(_section(f"*{ticket.ticket_id}* _({ticket.status} {status_emoji})_\n\n*Campaign:* {ticket.campaign}\n\n"
+                               f"*Issue:* {ticket.issue_type}\n\n*Date:* {ticket.created_date}\n\n"))
+        blocks.append(DIVIDER)
+
+    if page_count > 1:
+        navigation = []
+        if page > 0:
+            navigation.append({"type": "button", "text": {"type": "plain_text", "text": "◀ Previous"}, "action_id": "agent_tickets_page_prev", "value": str(page - 1)})
+        if page < page_count - 1:
+            navigation.append({"type": "button", "text": {"type": "plain_text", "text": "Next ▶"}, "action_id": "agent_tickets_page_next", "value": str(page + 1)})
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"Page {page + 1} of {page_count} · {total} tickets"}]})
+        blocks.append({"type": "actions", "block_id": "pagination_block", "elements": navigation})
+
+    return {
+        "type": "modal",
+        "callback_id": "agent_tickets_view",
+        "private_metadata": private_metadata,
+        "title": {"type": "plain_text", "text": "Your Tickets", "emoji": True},
+        "close": {"type": "plain_text", "text": "Close", "emoji": True},
+        "blocks": blocks
+    }
+
+
+def render_search_results_view(query, hits, page, page_count, total, private_metadata):
+    """Render one page of the /search-tickets modal."""
+    blocks = [
+        {"type": "context", "elements": [{"type": "plain_text", "text": f"{total} tickets match “{query}”", "emoji": True}]},
+        DIVIDER
+    ]
+    if not hits:
+        blocks.append(NO_SEARCH_RESULTS_SECTION)
+    for hit in hits:
+        status_emoji = STATUS_EMOJI.get(hit.status, DEFAULT_STATUS_EMOJI)
+        priority_emoji = PRIORITY_EMOJI.get(hit.priority, DEFAULT_PRIORITY_EMOJI)
+        blocks.append(_section(f"*{hit.ticket_id}* _({hit.status} {status_emoji})_ · {priority_emoji} {hit.priority}\n"
+                               f"*{hit.campaign}* · {hit.issue_type} · {hit.created_date}\n>{hit.snippet or '—'}"))
+        blocks.append(DIVIDER)
+
+    if page_count > 1:
+        navigation = []
+        if page > 0:
+            navigation.append({"type": "button", "text": {"type": "plain_text", "text": "◀ Previous"}, "action_id": "search_tickets_page_prev", "value": str(page - 1)})
+        if page < page_count - 1:
+            navigation.append({"type": "button", "text": {"type": "plain_text", "text": "Next ▶"}, "action_id": "search_tickets_page_next", "value": str(page + 1)})
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"Page {page + 1} of {page_count}"}]})
+        blocks.append({"type": "actions", "block_id": "pagination_block", "elements": navigation})
+
+    return {
+        "type": "modal",
+        "callback_id": "search_tickets_view",
+        "private_metadata": private_metadata,
+        "title": {"type": "plain_text", "text": "Search Tickets", "emoji": True},
+        "close": {"type": "plain_text", "text": "Close", "emoji": True},
+        "blocks": blocks
+    }
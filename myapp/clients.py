@@ -0,0 +1,126 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SHEETS_SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+class LazyProxy:
+    """Stands in for an object that is only created on first attribute access."""
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                target = self._target
+                if target is None:
+                    target = self._factory()
+                    object.__setattr__(self, "_target", target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+
+class GoogleSheetsProvider:
+    """Connects to Google Sheets on first use and keeps one pooled session per process.
+
+    The service-account token is refreshed in the background ``refresh_margin``
+    seconds before it expires, so no request pays for a token round-trip.
+    ``close()`` stops the refresher and closes the session.
+    """
+
+    def __init__(self, credentials_info, spreadsheet_id, pool_size=10, refresh_margin=300):
+        self.credentials_info = credentials_info
+        self.spreadsheet_id = spreadsheet_id
+        self.pool_size = pool_size
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._session = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._refresher = None
+        self._stopped = threading.Event()
+
+    def _connect(self):
+        # Imported here so importing config stays cheap
+        import gspread
+        from google.auth.transport.requests import AuthorizedSession, Request
+        from google.oauth2.service_account import Credentials
+        from requests.adapters import HTTPAdapter
+
+        logger.info("Connecting to Google Sheets")
+        credentials = Credentials.from_service_account_info(self.credentials_info, scopes=SHEETS_SCOPES)
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        # A sessionless Request; going through the AuthorizedSession would fetch the token twice
+        credentials.refresh(Request())
+        client = gspread.Client(auth=credentials, session=session)
+        self._credentials = credentials
+        self._session = session
+        self._spreadsheet = client.open_by_key(self.spreadsheet_id)
+        self._refresher = threading.Thread(target=self._refresh_tokens, name="sheets-token-refresh", daemon=True)
+        self._refresher.start()
+        logger.info("Google Sheets connected")
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is None:
+                self._connect()
+            return self._spreadsheet
+
+    def worksheet(self, title, header=None):
+        """Return the worksheet ``title``; if ``header`` is given, create it with that header row when missing."""
+        import gspread
+
+        spreadsheet = self.spreadsheet()
+        with self._lock:
+            if title not in self._worksheets:
+                try:
+                    self._worksheets[title] = spreadsheet.worksheet(title)
+                except gspread.exceptions.WorksheetNotFound:
+                    if header is None:
+                        raise
+                    logger.info("Creating worksheet %s", title)
+                    worksheet = spreadsheet.add_worksheet(title, rows=1000, cols=len(header))
+                    worksheet.append_row(list(header))
+                    self._worksheets[title] = worksheet
+            return self._worksheets[title]
+
+    def _refresh_tokens(self):
+        from google.auth.transport.requests import Request
+
+        while not self._stopped.is_set():
+            expiry = self._credentials.expiry
+            # google-auth reports expiry as a naive UTC datetime
+            wait = 60.0
+            if expiry is not None:
+                wait = (expiry - timedelta(seconds=self.refresh_margin) - datetime.utcnow()).total_seconds()
+            if wait > 0:
+                self._stopped.wait(min(wait, 300))
+                continue
+            try:
+                self._credentials.refresh(Request())
+                logger.debug("Refreshed Google Sheets token, expires %s", self._credentials.expiry)
+            except Exception as e:
+                logger.error("Error refreshing Google Sheets token: %s", e)
+                self._stopped.wait(30)
+
+    def close(self, timeout=5):
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout)
+        if self._session is not None:
+            self._session.close()
@@ -2,21 +2,14 @@ import os
 import json
 import logging
 from slack_sdk import WebClient
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import atexit
+from apps.clients import GoogleSheetsProvider, LazyProxy  # type: ignore
+from apps.metrics import InstrumentedClient  # type: ignore
+from apps.sheet_writer import BatchedWorksheet  # type: ignore
+from apps.ticket_events import EVENT_HEADER  # type: ignore
 
-# Configure logging (avoid circular import from .app)
+# Records reach logs/config.log through the queue set up in logging_pipeline.py
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Ensure logs directory exists
-if not os.path.exists("logs"):
-    os.makedirs("logs")
-
-handler = logging.FileHandler("logs/config.log")
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 class Config:
     PORT = int(os.environ.get("PORT", 8080))
@@ -26,6 +19,44 @@ class Config:
     SLACK_CHANNEL = os.environ.get("SLACK_CHANNEL", "#systems-issues")
     SYSTEM_USERS = os.environ.get("SYSTEM_USERS", "").split(",")
     TIMEZONE = os.environ.get("TIMEZONE", "America/New_York")
+    TICKET_CACHE_RELOAD_SECONDS = int(os.environ.get("TICKET_CACHE_RELOAD_SECONDS", 900))
+    LOCAL_STATE_DB = os.environ.get("LOCAL_STATE_DB", "data/sysalert.sqlite3")
+    ASYNC_EVENTS = os.environ.get("ASYNC_EVENTS", "false").lower() == "true"
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+    JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 100))
+    JOB_RETRIES = int(os.environ.get("JOB_RETRIES", 3))
+    SHEETS_FLUSH_INTERVAL = float(os.environ.get("SHEETS_FLUSH_INTERVAL", 2.0))
+    SHEETS_FLUSH_SIZE = int(os.environ.get("SHEETS_FLUSH_SIZE", 50))
+    SHEETS_FLUSH_MAX_BACKOFF = float(os.environ.get("SHEETS_FLUSH_MAX_BACKOFF", 60))
+    SLACK_DISPATCH_WORKERS = int(os.environ.get("SLACK_DISPATCH_WORKERS", 4))
+    SERVER_MODE = os.environ.get("SERVER_MODE", "sync").lower()
+    SLACK_MAX_IN_FLIGHT = int(os.environ.get("SLACK_MAX_IN_FLIGHT", 100))
+    ASYNC_BLOCKING_THREADS = int(os.environ.get("ASYNC_BLOCKING_THREADS", 16))
+    COUNTER_RECONCILE_HOURS = int(os.environ.get("COUNTER_RECONCILE_HOURS", 24))
+    SCHEDULER_LOCK_FILE = os.environ.get("SCHEDULER_LOCK_FILE", "data/scheduler.lock")
+    LEADER_POLL_SECONDS = float(os.environ.get("LEADER_POLL_SECONDS", 5))
+    SHEETS_POOL_SIZE = int(os.environ.get("SHEETS_POOL_SIZE", 10))
+    TOKEN_REFRESH_MARGIN = int(os.environ.get("TOKEN_REFRESH_MARGIN", 300))
+    TICKET_STORE_BACKEND = os.environ.get("TICKET_STORE_BACKEND", "sqlite").lower()
+    SHEETS_MIRROR = os.environ.get("SHEETS_MIRROR", "true").lower() == "true"
+    REQUEST_TIMING = os.environ.get("REQUEST_TIMING", "false").lower() == "true"
+    SLA_HOURS = {
+        "High": int(os.environ.get("SLA_HOURS_HIGH", 4)),
+        "Medium": int(os.environ.get("SLA_HOURS_MEDIUM", 24)),
+        "Low": int(os.environ.get("SLA_HOURS_LOW", 72)),
+    }
+    SLA_CHECK_MINUTES = int(os.environ.get("SLA_CHECK_MINUTES", 5))
+    PIN_SYNC_MINUTES = int(os.environ.get("PIN_SYNC_MINUTES", 2))
+    COMMENTS_SHOWN = int(os.environ.get("COMMENTS_SHOWN", 5))
+    BULK_MAX_TICKETS = int(os.environ.get("BULK_MAX_TICKETS", 200))
+    ANALYTICS_WEEKS = int(os.environ.get("ANALYTICS_WEEKS", 4))
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+    EXPORT_TOKEN = os.environ.get("EXPORT_TOKEN")
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 600))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10000))
+    IDEMPOTENCY_SHARED = os.environ.get("IDEMPOTENCY_SHARED", "true").lower() == "true"
+    CHAT_UPDATE_DEBOUNCE_SECONDS = float(os.environ.get("CHAT_UPDATE_DEBOUNCE_SECONDS", 0.5))
+    CHAT_UPDATE_MAX_DELAY_SECONDS = float(os.environ.get("CHAT_UPDATE_MAX_DELAY_SECONDS", 2.0))
 
     # Validate environment variables
     if not SLACK_BOT_TOKEN:
@@ -39,31 +70,52 @@ class Config:
     try:
         GOOGLE_SHEETS_CREDENTIALS = json.loads(GOOGLE_SHEETS_CREDENTIALS_STR)
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in GOOGLE_SHEETS_CREDENTIALS: {e}")
+        logger.error("Invalid JSON in GOOGLE_SHEETS_CREDENTIALS: %s", e)
         raise ValueError(f"Invalid JSON in GOOGLE_SHEETS_CREDENTIALS: {e}")
     
     if not GOOGLE_SHEET_ID:
         logger.error("GOOGLE_SHEET_ID environment variable is not set.")
         raise ValueError("GOOGLE_SHEET_ID environment variable is not set.")
 
-# ✅ Initialize Slack client
+    if TICKET_STORE_BACKEND not in ("sqlite", "sheets"):
+        logger.error("Invalid TICKET_STORE_BACKEND: %s", TICKET_STORE_BACKEND)
+        raise ValueError(f"TICKET_STORE_BACKEND must be 'sqlite' or 'sheets', not {TICKET_STORE_BACKEND!r}.")
+
+    if SERVER_MODE not in ("sync", "async"):
+        logger.error("Invalid SERVER_MODE: %s", SERVER_MODE)
+        raise ValueError(f"SERVER_MODE must be 'sync' or 'async', not {SERVER_MODE!r}.")
+
+# ✅ Initialize Slack client (one per process; constructing it makes no network calls)
 try:
-    client = WebClient(token=Config.SLACK_BOT_TOKEN)
+    client = InstrumentedClient(WebClient(token=Config.SLACK_BOT_TOKEN), "slack")
     logger.info("Slack client initialized successfully.")
 except Exception as e:
-    logger.error(f"Failed to initialize Slack client: {e}")
+    logger.error("Failed to initialize Slack client: %s", e)
     raise
 
-# ✅ Initialize Google Sheets
-try:
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(Config.GOOGLE_SHEETS_CREDENTIALS, scope)
-    gc = gspread.authorize(creds)
-    spreadsheet = gc.open_by_key(Config.GOOGLE_SHEET_ID)
-    sheet = spreadsheet.worksheet("TicketLog")
-    weekly_counts_sheet = spreadsheet.worksheet("WeeklyCounts")
-    logger.info("Google Sheets initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize Google Sheets: {e}")
-    raise
+# The asyncio server (SERVER_MODE=async) sends Slack calls with AsyncWebClient, which needs aiohttp
+if Config.SERVER_MODE == "async":
+    from slack_sdk.web.async_client import AsyncWebClient
+
+    def async_slack_client(session):
+        return InstrumentedClient(AsyncWebClient(token=Config.SLACK_BOT_TOKEN, session=session), "slack")
 
+# ✅ Google Sheets connects on first use, so importing config makes no network calls
+sheets = GoogleSheetsProvider(
+    Config.GOOGLE_SHEETS_CREDENTIALS,
+    Config.GOOGLE_SHEET_ID,
+    pool_size=Config.SHEETS_POOL_SIZE,
+    refresh_margin=Config.TOKEN_REFRESH_MARGIN,
+)
+# Registered before the worksheets so it runs after their final flushes
+atexit.register(sheets.close)
+# Writes are batched and flushed in the background; see sheet_writer.py. API calls are timed in metrics.py
+sheet = BatchedWorksheet(LazyProxy(lambda: InstrumentedClient(sheets.worksheet("TicketLog"), "sheets")),
+                         Config.SHEETS_FLUSH_INTERVAL, Config.SHEETS_FLUSH_SIZE, Config.SHEETS_FLUSH_MAX_BACKOFF, "TicketLog")
+weekly_counts_sheet = BatchedWorksheet(LazyProxy(lambda: InstrumentedClient(sheets.worksheet("WeeklyCounts"), "sheets")),
+                                       Config.SHEETS_FLUSH_INTERVAL, Config.SHEETS_FLUSH_SIZE, Config.SHEETS_FLUSH_MAX_BACKOFF, "WeeklyCounts")
+ticket_events_sheet = BatchedWorksheet(LazyProxy(lambda: InstrumentedClient(sheets.worksheet("TicketEvents", header=EVENT_HEADER), "sheets")),
+                                       Config.SHEETS_FLUSH_INTERVAL, Config.SHEETS_FLUSH_SIZE, Config.SHEETS_FLUSH_MAX_BACKOFF, "TicketEvents")
+atexit.register(sheet.close)
+atexit.register(weekly_counts_sheet.close)
+atexit.register(ticket_events_sheet.close)
@@ -1,212 +1,389 @@
-from . import sheet, logger, client
-from apps.config import Config # type: ignore
+from . import sheet, logger, dispatcher, message_updates
+from apps.config import Config, ticket_events_sheet # type: ignore
+from apps.ticket_store import SheetsTicketStore, SqliteTicketStore, TicketConflict # type: ignore
+from apps.tickets import TICKET_FIELDS, InvalidTransition, Ticket, check_transition # type: ignore
+from apps.ticket_ids import TicketIdAllocator, last_ticket_number # type: ignore
+from apps.ticket_stats import TicketCounters # type: ignore
+from apps.sla import ACTIVE_STATUSES, SLATracker # type: ignore
+from apps.pins import PinTracker # type: ignore
+from apps.ticket_events import EVENT_FIELDS, TicketEventLog # type: ignore
+from apps.search import TicketSearchIndex # type: ignore
+from apps.jobs import call_with_retries # type: ignore
+from apps.slack_dispatcher import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL # type: ignore
+from apps.blocks import (render_agent_tickets_view, render_new_ticket_message, render_new_ticket_modal, # type: ignore
+                         render_search_results_view, render_ticket_message)
+from datetime import datetime
+import atexit
+import json
+import threading
+
+# SQLite is the primary store by default; TicketLog is kept in sync as a mirror
+sheets_ticket_store = SheetsTicketStore(sheet, reload_interval=Config.TICKET_CACHE_RELOAD_SECONDS)
+if Config.TICKET_STORE_BACKEND == "sheets":
+    ticket_store = sheets_ticket_store
+else:
+    mirror = sheets_ticket_store if Config.SHEETS_MIRROR else None
+    ticket_store = SqliteTicketStore(Config.LOCAL_STATE_DB, mirror=mirror, seed=mirror and mirror.all_tickets,
+                                     mirror_interval=Config.SHEETS_FLUSH_INTERVAL, max_backoff=Config.SHEETS_FLUSH_MAX_BACKOFF)
+    atexit.register(ticket_store.close)
+
+ticket_id_allocator = TicketIdAllocator(
+    Config.LOCAL_STATE_DB,
+    seed=lambda: last_ticket_number(ticket_store.ticket_ids()),
+)
+ticket_counters = TicketCounters(Config.LOCAL_STATE_DB, seed=ticket_store.count_rows)
+sla_tracker = SLATracker(
+    Config.LOCAL_STATE_DB, Config.SLA_HOURS,
+    seed=lambda: [(t.ticket_id, t.priority) for t in ticket_store.tickets_with_status(ACTIVE_STATUSES)],
+)
+pin_tracker = PinTracker(Config.LOCAL_STATE_DB)
+# Comments and status changes; TicketEvents mirrors the log whenever TicketLog is kept up to date
+ticket_events = TicketEventLog(
+    Config.LOCAL_STATE_DB,
+    mirror=ticket_events_sheet if Config.SHEETS_MIRROR or Config.TICKET_STORE_BACKEND == "sheets" else None,
+)
+# Built in the background on the first search; each search first catches up on changes made by any worker
+search_index = TicketSearchIndex(chunk_size=Config.EXPORT_CHUNK_SIZE)
 
 
 def is_system_user(user_id):
-    logger.debug(f"Checking if user {user_id} is a system user")
+    logger.debug("Checking if user %s is a system user", user_id)
     return user_id in Config.SYSTEM_USERS
 
-def find_ticket_by_id(ticket_id):
-    logger.debug(f"Finding ticket by ID: {ticket_id}")
-    tickets = sheet.get_all_values()
-    for i, row in enumerate(tickets):
-        if i == 0:  # Skip header row
-            continue
-        if row[0] == ticket_id:
-            logger.debug(f"Ticket {ticket_id} found at row {i}")
-            return i, row
-    logger.debug(f"Ticket {ticket_id} not found")
-    return None, None
-
 def update_ticket_status(ticket_id, status, assigned_to=None, message_ts=None, comment=None, action_user_id=None):
-    logger.info(f"Updating ticket status: Ticket ID: {ticket_id}, Status: {status}, Assigned To: {assigned_to}, Comment: {comment}, Action User ID: {action_user_id}")
+    logger.info("Updating ticket status: Ticket ID: %s, Status: %s, Assigned To: %s, Comment: %s, Action User ID: %s",
+                ticket_id, status, assigned_to, comment, action_user_id)
     try:
-        row_index, ticket = find_ticket_by_id(ticket_id)
+        changes = {"status": status}
+        if assigned_to:
+            changes["assigned_to"] = assigned_to
+        old, ticket = call_with_retries(transition_ticket, ticket_id, status, changes, retries=Config.JOB_RETRIES,
+                                        give_up_on=(InvalidTransition, TicketConflict))
         if not ticket:
             logger.error("Ticket not found")
             return False
-
-        ticket[5] = status
-        if assigned_to:
-            ticket[1] = assigned_to
-        if comment:
-            current_comments = ticket[12] if len(ticket) > 12 else ""
-            ticket[12] = f"{current_comments}\n{action_user_id}: {comment}" if current_comments else f"{action_user_id}: {comment}"
-
-        logger.debug(f"Updating row {row_index + 1} in Google Sheet")
-        sheet.update(f"A{row_index + 1}:M{row_index + 1}", [ticket])
-        logger.info("Row updated successfully")
+        logger.info("Ticket updated successfully")
+        record_ticket_change(old, ticket, action_user_id, comment)
 
         if message_ts:
-            logger.debug(f"Updating Slack message with timestamp {message_ts}")
-            message_blocks = [
-                {"type": "header", "text": {"type": "plain_text", "text": "🎫 Ticket Details", "emoji": True}},
-                {"type": "section", "text": {"type": "mrkdwn", "text": f"✅ *Ticket ID:* {ticket[0]}\n\n"}},
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"📂 *Campaign:* {ticket[2]}\n\n"
-                                f"📌 *Issue:* {ticket[3]}\n\n"
-                                f"⚡ *Priority:* {ticket[4]} {'🔴' if ticket[4] == 'High' else '🟡' if ticket[4] == 'Medium' else '🔵'}\n\n"
-                                f"👤 *Assigned To:* {ticket[1] if ticket[1] != 'Unassigned' else '❌ Unassigned'}\n\n"
-                                f"🔄 *Status:* {ticket[5]} {'🟢' if ticket[5] == 'Open' else '🔵' if ticket[5] == 'In Progress' else '🟡' if ticket[5] == 'Resolved' else '🔴'}\n\n"
-                    }
-                },
-                {"type": "divider"},
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"🖋️ *Details:* {ticket[6]}\n\n"
-                                f"🔗 *Salesforce Link:* {ticket[7] or 'N/A'}\n\n"
-                    }
-                },
-                {"type": "section", "text": {"type": "mrkdwn", "text": f"📂 *File Attachment:* {ticket[8]}\n\n"}},
-                {"type": "section", "text": {"type": "mrkdwn", "text": f"📅 *Created Date:* {ticket[10]}\n\n"}},
-                {"type": "section", "text": {"type": "mrkdwn", "text": f"💬 *Comments:* {ticket[12] if len(ticket) > 12 and ticket[12] else 'N/A'}\n\n"}},
-                {"type": "divider"},
-                {
-                    "type": "actions",
-                    "elements": [
-                        {"type": "button", "text": {"type": "plain_text", "text": "🖐 Assign to Me"}, "action_id": f"assign_to_me_{ticket_id}", "value": ticket_id, "style": "primary"} if is_system_user(action_user_id) and ticket[5] == "Open" and ticket[1] == "Unassigned" else None,
-                        {"type": "button", "text": {"type": "plain_text", "text": "🔁 Reassign"}, "action_id": f"reassign_{ticket_id}", "value": ticket_id, "style": "primary"} if is_system_user(action_user_id) and ticket[5] in ["Open", "In Progress"] else None,
-                        {"type": "button", "text": {"type": "plain_text", "text": "❌ Close"}, "action_id": f"close_{ticket_id}", "value": ticket_id, "style": "danger"} if is_system_user(action_user_id) and ticket[5] in ["Open", "In Progress"] else None,
-                        {"type": "button", "text": {"type": "plain_text", "text": "🟢 Resolve"}, "action_id": f"resolve_{ticket_id}", "value": ticket_id, "style": "primary"} if is_system_user(action_user_id) and ticket[5] in ["Open", "In Progress"] else None,
-                        {"type": "button", "text": {"type": "plain_text", "text": "🔄 Reopen"}, "action_id": f"reopen_{ticket_id}", "value": ticket_id} if is_system_user(action_user_id) and ticket[5] in ["Closed", "Resolved"] else None
-                    ]
-                }
-            ]
-            message_blocks[-1]["elements"] = [elem for elem in message_blocks[-1]["elements"] if elem is not None]
-            client.chat_update(channel=Config.SLACK_CHANNEL, ts=message_ts, blocks=message_blocks)
-            logger.info("Slack message updated successfully")
+            logger.debug("Updating Slack message with timestamp %s", message_ts)
+            message_blocks = render_ticket_message(ticket, is_system_user(action_user_id), recent_comments(ticket_id))
+            # Sent after a short debounce; a quick series of clicks on one ticket becomes one chat_update
+            message_updates.update(Config.SLACK_CHANNEL, message_ts, blocks=message_blocks)
+            logger.info("Slack message update queued")
 
         return True
+    except (InvalidTransition, TicketConflict):
+        raise
     except Exception as e:
-        logger.error(f"Error updating ticket status: {e}")
+        logger.error("Error updating ticket status: %s", e)
         return False
 
+def record_ticket_change(old, ticket, action_user_id, comment=None):
+    """Bring the event log, counters, SLA deadlines and pin state up to date with a saved change."""
+    try:
+        if old.status != ticket.status:
+            ticket_events.status_changed(ticket.ticket_id, action_user_id, old.status, ticket.status)
+        if comment:
+            ticket_events.comment(ticket.ticket_id, action_user_id, comment)
+    except Exception as e:
+        logger.error("Error recording ticket events: %s", e)
+    try:
+        ticket_counters.record_status_change(old.status, ticket.status)
+    except Exception as e:
+        logger.error("Error updating ticket counters: %s", e)
+    try:
+        sla_tracker.status_changed(ticket.ticket_id, ticket.priority, old.status, ticket.status)
+    except Exception as e:
+        logger.error("Error updating SLA deadline: %s", e)
+    try:
+        pin_tracker.ticket_changed(ticket)
+    except Exception as e:
+        logger.error("Error updating ticket pin state: %s", e)
+
+TRANSITION_ATTEMPTS = 5
+
+def transition_ticket(ticket_id, status, changes):
+    """Move a ticket to ``status`` with compare-and-swap, returning ``(old, new)`` or ``(None, None)``.
+
+    If another handler updates the ticket between the read and the write, the
+    ticket is read again and the move re-checked against its new status, so
+    concurrent clicks never overwrite each other and no lock is needed.
+    Raises ``InvalidTransition`` when the move is not allowed from the
+    current status, and ``TicketConflict`` if every attempt lost a race.
+    """
+    for attempt in range(1, TRANSITION_ATTEMPTS + 1):
+        current = ticket_store.get(ticket_id)
+        if current is None:
+            return None, None
+        check_transition(current, status)
+        try:
+            return ticket_store.update(ticket_id, changes, expected_version=current.version)
+        except TicketConflict as e:
+            if attempt == TRANSITION_ATTEMPTS:
+                raise
+            logger.info("%s; retrying (attempt %d/%d)", e, attempt, TRANSITION_ATTEMPTS)
+
+def recent_comments(ticket_id):
+    """Return the latest ``COMMENTS_SHOWN`` comments as message text, or ``None`` if the log has none."""
+    try:
+        comments = ticket_events.latest_comments(ticket_id, Config.COMMENTS_SHOWN)
+    except Exception as e:
+        logger.error("Error reading comments for ticket %s: %s", ticket_id, e)
+        return None
+    # None falls back to the Comments column, where comments were kept before the event log
+    return "\n".join(f"{user_id}: {text}" for _, user_id, text in comments) or None
+
 def generate_ticket_id():
     logger.debug("Generating ticket ID")
-    tickets = sheet.get_all_values()
-    if len(tickets) <= 1:
-        return "T1001"
-    last_ticket_id = tickets[-1][0]
-    if not last_ticket_id.startswith("T"):
-        return "T1001"
-    number = int(last_ticket_id[1:]) + 1
-    return f"T{number}"
+    return ticket_id_allocator.next_id()
+
+def build_ticket(ticket_id, campaign, issue_type, priority, details, salesforce_link, user_id):
+    created_date = datetime.now().strftime("%m/%d/%Y")
+    return Ticket(
+        ticket_id=ticket_id, assigned_to="Unassigned", campaign=campaign, issue_type=issue_type, priority=priority,
+        status="Open", details=details, salesforce_link=salesforce_link, attachment="N/A", created_date=created_date,
+        requester=user_id, last_updated=created_date,
+    )
+
+def log_ticket(ticket):
+    call_with_retries(ticket_store.create, ticket, retries=Config.JOB_RETRIES)
+    logger.info("Ticket %s saved", ticket.ticket_id)
+
+def ticket_post_kwargs(ticket):
+    message_blocks = render_new_ticket_message(ticket.ticket_id, ticket.campaign, ticket.issue_type, ticket.priority,
+                                               ticket.details, ticket.salesforce_link, ticket.created_date)
+    return dict(channel=Config.SLACK_CHANNEL, blocks=message_blocks,
+                priority=PRIORITY_HIGH if ticket.priority == "High" else PRIORITY_NORMAL)
+
+def post_ticket(ticket):
+    response = call_with_retries(dispatcher.call, "chat_postMessage", retries=Config.JOB_RETRIES, **ticket_post_kwargs(ticket))
+    logger.info("Ticket %s posted to Slack", ticket.ticket_id)
+    return response
+
+def create_ticket(ticket):
+    """Save a new ticket, post it to the channel and confirm to the requester.
+
+    Once the ticket is saved, the channel post and the confirmation DM are
+    queued together and sent concurrently by the dispatcher while the local
+    bookkeeping runs; only the pin record waits for the post.
+    """
+    log_ticket(ticket)
+    posted = dispatcher.submit("chat_postMessage", **ticket_post_kwargs(ticket))
+    send_ticket_confirmation(ticket)
+    record_new_ticket(ticket)
+    try:
+        response = posted.result()
+        logger.info("Ticket %s posted to Slack", ticket.ticket_id)
+    except Exception as e:
+        logger.warning("Posting ticket %s failed: %s; retrying", ticket.ticket_id, e)
+        response = post_ticket(ticket)
+    record_ticket_posted(ticket, response)
+
+def send_ticket_confirmation(ticket):
+    return send_direct_message(ticket.requester, f"✅ Your ticket ({ticket.ticket_id}) has been submitted successfully!")
+
+def record_new_ticket(ticket):
+    """Count a saved ticket and start its SLA deadline."""
+    try:
+        ticket_counters.record_created(ticket.campaign, ticket.priority, ticket.status)
+    except Exception as e:
+        logger.error("Error updating ticket counters: %s", e)
+    try:
+        sla_tracker.track(ticket.ticket_id, ticket.priority)
+    except Exception as e:
+        logger.error("Error starting SLA deadline: %s", e)
+
+def record_ticket_posted(ticket, response):
+    """Remember where the ticket's channel message is, for pinning and later updates."""
+    try:
+        pin_tracker.ticket_posted(ticket, response["channel"], response["ts"])
+    except Exception as e:
+        logger.error("Error recording ticket message for pinning: %s", e)
+
+def handle_ticket_action(action_id, ticket_id, user_id, message_ts):
+    """Apply an Assign/Close/Resolve/Reopen button click and confirm to the user who clicked."""
+    if action_id.startswith("assign_to_me_"):
+        status, assigned_to, confirmation = "In Progress", user_id, f"✅ You have been assigned to ticket {ticket_id}."
+    elif action_id.startswith("close_"):
+        status, assigned_to, confirmation = "Closed", None, f"✅ Ticket {ticket_id} has been closed."
+    elif action_id.startswith("resolve_"):
+        status, assigned_to, confirmation = "Resolved", None, f"✅ Ticket {ticket_id} has been resolved."
+    elif action_id.startswith("reopen_"):
+        status, assigned_to, confirmation = "Open", None, f"✅ Ticket {ticket_id} has been reopened."
+    else:
+        logger.debug("Ignoring unhandled action %s", action_id)
+        return
+    try:
+        updated = update_ticket_status(ticket_id, status, assigned_to=assigned_to, message_ts=message_ts, action_user_id=user_id)
+    except (InvalidTransition, TicketConflict) as e:
+        current = e.current if isinstance(e, TicketConflict) else ticket_store.get(ticket_id)
+        if current is not None and current.status == status and assigned_to in (None, current.assigned_to):
+            # Already as asked, e.g. a double click; nothing to apply or report
+            logger.info("Ignoring %s on %s: already %s", action_id, ticket_id, status)
+            return
+        # Someone else got there first; tell the user rather than overwrite their change
+        logger.info("Not applying %s: %s", action_id, e)
+        current_status = current.status if current is not None else e.old_status
+        send_direct_message(user_id, f"⚠️ Ticket {ticket_id} was changed by someone else and is now {current_status}; your action was not applied.")
+        return
+    if not updated:
+        raise RuntimeError(f"Could not update ticket {ticket_id}")
+    send_direct_message(user_id, confirmation)
+
+BULK_ACTIONS = {"close": "Closed", "resolve": "Resolved", "reassign": "In Progress"}
+BULK_USAGE = "Usage: /bulk-tickets close|resolve T1001 T1002 ... or /bulk-tickets reassign @user T1001 T1002 ..."
+
+def parse_bulk_command(text):
+    """Parse ``/bulk-tickets`` text into ``(action, assignee, ticket_ids)``; raises ``ValueError`` with a usage hint."""
+    words = (text or "").replace(",", " ").split()
+    if not words or words[0].lower() not in BULK_ACTIONS:
+        raise ValueError(BULK_USAGE)
+    action, words, assignee = words[0].lower(), words[1:], None
+    if action == "reassign":
+        # Needs "Escape channels, users, and links" on the command so mentions arrive as <@U123|name>
+        if not words or not words[0].startswith("<@"):
+            raise ValueError(BULK_USAGE)
+        assignee, words = words[0][2:].rstrip(">").split("|")[0], words[1:]
+    ticket_ids = list(dict.fromkeys(words))
+    if not ticket_ids:
+        raise ValueError(BULK_USAGE)
+    if len(ticket_ids) > Config.BULK_MAX_TICKETS:
+        raise ValueError(f"At most {Config.BULK_MAX_TICKETS} tickets can be updated at once.")
+    return action, assignee, ticket_ids
+
+def bulk_update_tickets(action, ticket_ids, user_id, assignee=None):
+    """Close, resolve or reassign many tickets at once and report progress to ``user_id`` by DM.
+
+    Every allowed change is saved in one ``update_many`` write. The channel
+    messages of the updated tickets then go through ``message_updates``,
+    whose dispatcher workers and rate limits bound how many are in flight;
+    the progress DM is edited as they complete.
+    """
+    status = BULK_ACTIONS[action]
+    skipped = {}
+
+    def changes_for(ticket):
+        if action == "reassign":
+            if ticket.status not in ACTIVE_STATUSES:
+                skipped[ticket.ticket_id] = ticket.status
+                return None
+            return {"assigned_to": assignee, "status": status if ticket.status == "Open" else ticket.status}
+        try:
+            check_transition(ticket, status)
+        except InvalidTransition:
+            skipped[ticket.ticket_id] = ticket.status
+            return None
+        return {"status": status}
+
+    logger.info("Bulk %s of %d tickets by %s", action, len(ticket_ids), user_id)
+    updated = call_with_retries(ticket_store.update_many, ticket_ids, changes_for, retries=Config.JOB_RETRIES)
+    for old, ticket in updated:
+        record_ticket_change(old, ticket, user_id)
+    updated_ids = {ticket.ticket_id for _, ticket in updated}
+    not_found = [ticket_id for ticket_id in ticket_ids if ticket_id not in updated_ids and ticket_id not in skipped]
+    try:
+        messages = pin_tracker.messages(updated_ids)
+    except Exception as e:
+        logger.error("Error looking up ticket messages: %s", e)
+        messages = {}
+
+    summary = f"{action.capitalize()}: {len(updated)} of {len(ticket_ids)} tickets updated"
+    if skipped:
+        summary += f"; skipped {', '.join(f'{ticket_id} ({current})' for ticket_id, current in skipped.items())}"
+    if not_found:
+        summary += f"; not found: {', '.join(not_found)}"
+    progress = {"done": 0, "failed": 0}
+    lock = threading.Lock()
+    try:
+        report = dispatcher.call("chat_postMessage", channel=user_id, text=f"⏳ {summary}. Updating {len(messages)} channel messages…")
+    except Exception as e:
+        logger.error("Error sending bulk update progress: %s", e)
+        report = None
+
+    def report_progress():
+        done, failed = progress["done"], progress["failed"]
+        if done < len(messages):
+            text = f"⏳ {summary}. Channel messages updated: {done - failed}/{len(messages)}"
+        else:
+            text = f"✅ {summary}. Channel messages updated: {done - failed}/{len(messages)}"
+            if failed:
+                text += f" ({failed} failed)"
+        if report is not None:
+            # Debounced like any other message, so a fast run edits the DM a handful of times
+            message_updates.update(report["channel"], report["ts"], text=text)
+
+    def message_updated(ok):
+        with lock:
+            progress["done"] += 1
+            progress["failed"] += not ok
+            report_progress()
+
+    system_user = is_system_user(user_id)
+    for _, ticket in updated:
+        if ticket.ticket_id in messages:
+            message_blocks = render_ticket_message(ticket, system_user, recent_comments(ticket.ticket_id))
+            channel, ts = messages[ticket.ticket_id]
+            message_updates.update(channel, ts, on_done=message_updated, blocks=message_blocks)
+    if not messages:
+        report_progress()
+    return updated
+
+EXPORT_DATASETS = ("tickets", "events")
+
+def export_rows(dataset):
+    """Return ``(header, row_chunks)`` for a history export; each chunk is read only when the export reaches it."""
+    if dataset == "tickets":
+        return TICKET_FIELDS, ticket_store.iter_rows(Config.EXPORT_CHUNK_SIZE)
+    if dataset == "events":
+        return EVENT_FIELDS, ticket_events.iter_events(Config.EXPORT_CHUNK_SIZE)
+    raise ValueError(f"Unknown export dataset {dataset}")
 
 def send_direct_message(user_id, message):
-    logger.debug(f"Sending direct message to user {user_id}: {message}")
+    logger.debug("Sending direct message to user %s: %s", user_id, message)
     try:
-        client.chat_postMessage(channel=user_id, text=message)
-        logger.info("Direct message sent successfully")
+        # Confirmations are the least urgent Slack traffic; don't wait for them
+        future = dispatcher.submit("chat_postMessage", priority=PRIORITY_LOW, channel=user_id, text=message)
+        future.add_done_callback(_log_direct_message_result)
+        return future
     except Exception as e:
-        logger.error(f"Error sending direct message: {e}")
+        logger.error("Error sending direct message: %s", e)
+
+def _log_direct_message_result(future):
+    if future.exception():
+        logger.error("Error sending direct message: %s", future.exception())
+    else:
+        logger.info("Direct message sent successfully")
+
+AGENT_TICKETS_PAGE_SIZE = 20  # two blocks per ticket keeps the modal well under Slack's 100-block limit
+
+def build_agent_tickets_view(user_id, status_filter="all", page=0):
+    """Build one page of the /agent-tickets modal from the requester index."""
+    tickets = ticket_store.tickets_for_requester(user_id, None if status_filter == "all" else status_filter)
+    page_count = max(1, -(-len(tickets) // AGENT_TICKETS_PAGE_SIZE))
+    page = min(max(page, 0), page_count - 1)
+    page_tickets = tickets[page * AGENT_TICKETS_PAGE_SIZE:(page + 1) * AGENT_TICKETS_PAGE_SIZE]
+    logger.debug("Found %d tickets for user %s with status %s, showing page %d/%d", len(tickets), user_id, status_filter, page + 1, page_count)
+    return render_agent_tickets_view(page_tickets, status_filter, page, page_count, len(tickets),
+                                     json.dumps({"status": status_filter, "page": page}))
+
+SEARCH_PAGE_SIZE = 10  # results carry a details snippet, so fewer fit a readable page than in /agent-tickets
+SEARCH_QUERY_CHARS = 200  # keeps the query well inside the modal's private_metadata limit
+
+def build_search_results_view(query, page=0):
+    """Build one page of the /search-tickets modal, or return ``None`` while the index is still being built."""
+    search_index.start_loading(ticket_store, ticket_events)
+    if not search_index.ready:
+        return None
+    query = query[:SEARCH_QUERY_CHARS]
+    page = max(page, 0)
+    hits, total = search_index.search(query, page, SEARCH_PAGE_SIZE)
+    page_count = max(1, -(-total // SEARCH_PAGE_SIZE))
+    if page >= page_count:
+        page = page_count - 1
+        hits, total = search_index.search(query, page, SEARCH_PAGE_SIZE)
+    logger.debug("Search %r matched %d tickets, showing page %d/%d", query, total, page + 1, page_count)
+    return render_search_results_view(query, hits, page, page_count, total, json.dumps({"query": query, "page": page}))
 
 def build_new_ticket_modal():
-    campaign_options = [
-        {"text": {"type": "plain_text", "text": "Camp Lejeune"}, "value": "Camp Lejeune"},
-        {"text": {"type": "plain_text", "text": "Maui Wildfires"}, "value": "Maui Wildfires"},
-        {"text": {"type": "plain_text", "text": "LA Wildfire"}, "value": "LA Wildfire"},
-        {"text": {"type": "plain_text", "text": "Depo-Provera"}, "value": "Depo-Provera"},
-        {"text": {"type": "plain_text", "text": "CPP Sick and Family Leave"}, "value": "CPP Sick and Family Leave"}
-    ]
-    issue_type_options = [
-        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Salesforce Performance Issues (Freezing or Crashing)"}, "value": "Salesforce Performance Issues"},
-        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Vonage Dialer Functionality Issues"}, "value": "Vonage Dialer Functionality Issues"},
-        {"text": {"type": "plain_text", "text": "🖥️ System & Software - Broken or Unresponsive Links (ARA, Co-Counsel, Claim Stage, File Upload, etc.)"}, "value": "Broken or Unresponsive Links"},
-        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Laptop Fails to Power On"}, "value": "Laptop Fails to Power On"},
-        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Slow Performance or Freezing Laptop"}, "value": "Slow Performance or Freezing Laptop"},
-        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Unresponsive Keyboard or Mouse"}, "value": "Unresponsive Keyboard or Mouse"},
-        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Headset/Mic Malfunction (No Sound, Static, etc.)"}, "value": "Headset/Microphone Malfunction"},
-        {"text": {"type": "plain_text", "text": "💻 Equipment & Hardware - Charger or Battery Failure"}, "value": "Charger or Battery Failure"},
-        {"text": {"type": "plain_text", "text": "🔐 Security & Account - Multi-Factor Authentication (MFA) Failure (Security Key)"}, "value": "MFA Failure"},
-        {"text": {"type": "plain_text", "text": "🔐 Security & Account - Account Lockout (Gmail or Salesforce)"}, "value": "Account Lockout"},
-        {"text": {"type": "plain_text", "text": "📑 Client & Document - Paper Packet Contains Errors or Missing Information"}, "value": "Paper Packet Errors"},
-        {"text": {"type": "plain_text", "text": "📑 Client & Document - Paper Packet Mailing Status"}, "value": "Paper Packet Mailing Status"},
-        {"text": {"type": "plain_text", "text": "📑 Client & Document - Client Information Update Request"}, "value": "Client Information Update Request"},
-        {"text": {"type": "plain_text", "text": "📑 Client & Document - Client System Error (Missing Document Request, Form Submission Failure, Broken or Unresponsive Link)"}, "value": "Client System Error"},
-        {"text": {"type": "plain_text", "text": "📊 Management Systems - Reports or Dashboards Failing to Load"}, "value": "Reports or Dashboards Failing to Load"},
-        {"text": {"type": "plain_text", "text": "📊 Management Systems - Automated Voicemail System Malfunction"}, "value": "Automated Voicemail System Malfunction"},
-        {"text": {"type": "plain_text", "text": "📊 Management Systems - Missing or Inaccessible Call Recordings"}, "value": "Missing or Inaccessible Call Recordings"},
-        {"text": {"type": "plain_text", "text": "❓ Other (Not Listed Above)"}, "value": "Other"}
-    ]
-    priority_options = [
-        {"text": {"type": "plain_text", "text": "🔵 Low"}, "value": "Low"},
-        {"text": {"type": "plain_text", "text": "🟡 Medium"}, "value": "Medium"},
-        {"text": {"type": "plain_text", "text": "🔴 High"}, "value": "High"}
-    ]
-    return {
-        "type": "modal",
-        "callback_id": "new_ticket",
-        "title": {"type": "plain_text", "text": "Submit a New Ticket"},
-        "submit": {"type": "plain_text", "text": "Submit"},
-        "close": {"type": "plain_text", "text": "Cancel"},
-        "blocks": [
-            {
-                "type": "input",
-                "block_id": "campaign_block",
-                "label": {"type": "plain_text", "text": "📂 Campaign"},
-                "element": {
-                    "type": "static_select",
-                    "action_id": "campaign_select",
-                    "placeholder": {"type": "plain_text", "text": "Select a campaign"},
-                    "options": campaign_options
-                },
-                "optional": False
-            },
-            {
-                "type": "input",
-                "block_id": "issue_type_block",
-                "label": {"type": "plain_text", "text": "📌 Issue Type"},
-                "element": {
-                    "type": "static_select",
-                    "action_id": "issue_type_select",
-                    "placeholder": {"type": "plain_text", "text": "Select an issue type"},
-                    "options": issue_type_options
-                },
-                "optional": False
-            },
-            {
-                "type": "input",
-                "block_id": "priority_block",
-                "label": {"type": "plain_text", "text": "⚡ Priority"},
-                "element": {
-                    "type": "static_select",
-                    "action_id": "priority_select",
-                    "placeholder": {"type": "plain_text", "text": "Select priority"},
-                    "options": priority_options
-                },
-                "optional": False
-            },
-            {
-                "type": "input",
-                "block_id": "details_block",
-                "label": {"type": "plain_text", "text": "🗂 Details"},
-                "element": {
-                    "type": "plain_text_input",
-                    "action_id": "details_input",
-                    "multiline": True,
-                    "placeholder": {"type": "plain_text", "text": "Describe the issue in detail"}
-                },
-                "optional": False
-            },
-            {
-                "type": "input",
-                "block_id": "salesforce_link_block",
-                "label": {"type": "plain_text", "text": "📎 Salesforce Link (Optional)"},
-                "element": {
-                    "type": "plain_text_input",
-                    "action_id": "salesforce_link_input",
-                    "placeholder": {"type": "plain_text", "text": "Paste Salesforce URL"}
-                },
-                "optional": True
-            },
-            {
-                "type": "section",
-                "text": {"type": "mrkdwn", "text": "📂 *File Upload:* (Optional) Upload the file to Slack and include the file URL in the details field."}
-            }
-        ]
-    }
+    return render_new_ticket_modal()
@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+_PENDING = object()
+
+
+def delivery_key(payload):
+    """Return the identifier shared by every delivery of one Slack interaction, or ``None``."""
+    kind = payload.get("type")
+    if kind == "event_callback" and payload.get("event_id"):
+        return f"event:{payload['event_id']}"
+    if kind == "view_submission":
+        view = payload.get("view") or {}
+        if view.get("id"):
+            return f"view_submission:{view['id']}:{view.get('hash', '')}:{payload.get('trigger_id', '')}"
+    if kind == "block_actions":
+        actions = payload.get("actions") or []
+        if actions:
+            action = actions[0]
+            return f"block_actions:{action.get('action_id')}:{action.get('action_ts')}:{payload.get('trigger_id', '')}"
+    return None
+
+
+class IdempotencyCache:
+    """Remembers which deliveries have been handled and what they returned.
+
+    The first delivery of a key ``claim``s it and later ``complete``s it with
+    its result; repeated deliveries get that result back instead of doing the
+    work again, or ``None`` while the first is still being handled. Entries
+    live for ``ttl`` seconds (``pending_ttl`` until completed, so a worker
+    that dies mid-request does not block retries for long) and at most
+    ``max_entries`` are kept, least recently used evicted first.
+
+    With ``path`` the keys are shared through the local SQLite file so a
+    retry routed to another worker is still recognized; completed results
+    are also kept in memory so repeats don't touch the database.
+    """
+
+    PRUNE_EVERY = 100  # claims between sweeps of the shared table
+
+    def __init__(self, ttl=600, max_entries=10000, path=None, pending_ttl=120):
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, result or _PENDING), least recently used first
+        self._claims = 0
+        self.db = LocalDatabase(path, schema=[
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            "key TEXT PRIMARY KEY, result TEXT, expires_at REAL NOT NULL, last_used REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idempotency_keys_last_used ON idempotency_keys (last_used)",
+        ]) if path else None
+
+    def _remember(self, key, expires_at, result):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def claim(self, key):
+        """Return ``(True, None)`` if this is the first delivery of ``key``, else ``(False, result)``."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return False, None if entry[1] is _PENDING else entry[1]
+            self._entries.pop(key, None)
+            if self.db is None:
+                self._remember(key, now + self.pending_ttl, _PENDING)
+                return True, None
+
+        claimed, result = self._claim_shared(key, now)
+        with self._lock:
+            if claimed:
+                self._remember(key, now + self.pending_ttl, _PENDING)
+            elif result is not None:
+                self._remember(key, now + self.ttl, result)
+        return claimed, result
+
+    def _claim_shared(self, key, now):
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT result, expires_at FROM idempotency_keys WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                conn.execute("UPDATE idempotency_keys SET last_used = ? WHERE key = ?", (now, key))
+                return False, None if row[0] is None else json.loads(row[0])
+            conn.execute("INSERT OR REPLACE INTO idempotency_keys (key, result, expires_at, last_used) VALUES (?, NULL, ?, ?)",
+                         (key, now + self.pending_ttl, now))
+            self._claims += 1
+            if self._claims % self.PRUNE_EVERY == 0:
+                self._prune(conn, now)
+        return True, None
+
+    def _prune(self, conn, now):
+        expired = conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM idempotency_keys WHERE key IN "
+                         "(SELECT key FROM idempotency_keys ORDER BY last_used LIMIT ?)", (excess,))
+        logger.debug("Pruned %d expired and %d least recently used idempotency keys", expired, max(excess, 0))
+
+    def complete(self, key, result):
+        """Record the result of a claimed key; ``result`` must be JSON-serializable."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now + self.ttl, result)
+        if self.db is not None:
+            with self.db.transaction() as conn:
+                conn.execute("UPDATE idempotency_keys SET result = ?, expires_at = ?, last_used = ? WHERE key = ?",
+                             (json.dumps(result), now + self.ttl, now, key))
+
+    def release(self, key):
+        """Forget a claimed key whose handling failed, so a retry does the work again."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.db is not None:
+            with self.db.transaction() as conn:
+                conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND result IS NULL", (key,))
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import job_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def call_with_retries(fn, *args, retries=3, backoff=0.5, give_up_on=(), **kwargs):
+    """Call ``fn`` and retry with exponential backoff if it raises anything but ``give_up_on``."""
+    for attempt in range(1, retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or isinstance(e, give_up_on):
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            logger.warning("%s failed (attempt %d/%d): %s; retrying in %.1fs", getattr(fn, "__name__", fn), attempt, retries, e, delay)
+            time.sleep(delay)
+
+
+async def call_with_retries_async(fn, *args, retries=3, backoff=0.5, give_up_on=(), **kwargs):
+    """Await ``fn`` like ``call_with_retries``, without blocking the event loop between attempts."""
+    for attempt in range(1, retries + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or isinstance(e, give_up_on):
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            logger.warning("%s failed (attempt %d/%d): %s; retrying in %.1fs", getattr(fn, "__name__", fn), attempt, retries, e, delay)
+            await asyncio.sleep(delay)
+
+
+class JobQueue:
+    """Bounded worker pool for work done after a Slack request has been acknowledged.
+
+    At most ``max_pending`` jobs may be queued or running at once; ``submit``
+    returns ``None`` instead of blocking when the queue is full so the caller
+    can fall back to doing the work inline.
+    """
+
+    def __init__(self, max_workers=4, max_pending=100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def submit(self, name, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Job queue full, not queueing %s", name)
+            return None
+        enqueued_at = time.perf_counter()
+        try:
+            return self._executor.submit(self._run, name, enqueued_at, fn, args, kwargs)
+        except RuntimeError:
+            # Executor is shutting down
+            self._slots.release()
+            return None
+
+    def _run(self, name, enqueued_at, fn, args, kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        except Exception as e:
+            logger.error("Job %s failed: %s", name, e)
+            raise
+        finally:
+            finished = time.perf_counter()
+            self._slots.release()
+            self._record(name, ok, started - enqueued_at, finished - started)
+            job_seconds.observe(finished - started, job=name.split(":", 1)[0], outcome="ok" if ok else "error")
+            logger.info("Job %s %s in %.3fs (queued %.3fs)", name, "finished" if ok else "failed", finished - started, started - enqueued_at)
+
+    def _record(self, name, ok, queued, elapsed):
+        # Aggregate by job type, e.g. "create_ticket:T1234" -> "create_ticket"
+        kind = name.split(":", 1)[0]
+        with self._stats_lock:
+            stats = self._stats.setdefault(kind, {"count": 0, "failed": 0, "queued_seconds": 0.0, "run_seconds": 0.0, "max_run_seconds": 0.0})
+            stats["count"] += 1
+            stats["failed"] += 0 if ok else 1
+            stats["queued_seconds"] += queued
+            stats["run_seconds"] += elapsed
+            stats["max_run_seconds"] = max(stats["max_run_seconds"], elapsed)
+
+    def stats(self):
+        with self._stats_lock:
+            return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
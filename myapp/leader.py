@@ -0,0 +1,71 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Elects one process on the host to run scheduled jobs.
+
+    Every process polls for an exclusive ``flock`` on ``lock_path``. The
+    winner calls ``on_elected`` once and holds the lock for the rest of its
+    life, refreshing a heartbeat (pid and timestamp) in the file. The kernel
+    releases the lock when the leader exits or crashes, so a follower takes
+    over within ``poll_interval`` seconds.
+    """
+
+    def __init__(self, lock_path, on_elected, poll_interval=5.0):
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def is_leader(self):
+        return self._fd is not None
+
+    def start(self):
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def _try_acquire(self):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _heartbeat(self):
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, f"{os.getpid()} {time.time():.0f}\n".encode(), 0)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self.is_leader and self._try_acquire():
+                logger.info("Process %d elected scheduler leader", os.getpid())
+                self._heartbeat()
+                try:
+                    self.on_elected()
+                except Exception as e:
+                    logger.error("Error starting scheduled jobs: %s", e)
+            elif self.is_leader:
+                self._heartbeat()
+            self._stopped.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopped.set()
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
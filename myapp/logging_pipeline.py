@@ -0,0 +1,109 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Passes a ``rate`` fraction of DEBUG records and every record above DEBUG.
+
+    A record can carry its own rate with ``extra={"sample_rate": 0.01}``.
+    Sampled records keep the rate as a field so counts can be scaled back up.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = getattr(record, "sample_rate", self.rate)
+        if rate >= 1.0:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queues records without formatting them, so message arguments are only
+    rendered on the listener thread.
+
+    The stock ``QueueHandler`` formats every record in the logging thread to
+    make it safe to pickle; this queue never leaves the process, so only the
+    traceback is rendered up front, to drop its frames. Arguments are
+    referenced, not copied, and should not be mutated after logging them.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record = copy.copy(record)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def configure_logging(logger_name="apps", directory="logs", level="INFO", json_format=True,
+                      debug_sample_rate=1.0, max_bytes=1000000, backup_count=5):
+    """Send ``logger_name``'s records through a queue to a background writer thread.
+
+    Everything goes to ``app.log`` and records from ``<logger_name>.config``
+    also to ``config.log``, as JSON lines unless ``json_format`` is false.
+    Safe to call more than once; only the first call takes effect.
+    """
+    global _listener
+    logger = logging.getLogger(logger_name)
+    if _listener is not None:
+        return logger
+    os.makedirs(directory, exist_ok=True)
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+    app_handler = RotatingFileHandler(os.path.join(directory, "app.log"), maxBytes=max_bytes, backupCount=backup_count)
+    config_handler = RotatingFileHandler(os.path.join(directory, "config.log"), maxBytes=max_bytes, backupCount=backup_count)
+    config_handler.addFilter(logging.Filter(f"{logger_name}.config"))
+    for handler in (app_handler, config_handler):
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+    logger.addHandler(queue_handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = QueueListener(records, app_handler, config_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return logger
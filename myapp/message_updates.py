@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+
+from .metrics import slack_message_updates
+from .slack_dispatcher import PRIORITY_NORMAL
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingUpdate:
+    __slots__ = ("kwargs", "first_queued", "due", "attempts", "callbacks")
+
+    def __init__(self, kwargs, now, due):
+        self.kwargs = kwargs
+        self.first_queued = now
+        self.due = due
+        self.attempts = 0
+        self.callbacks = []
+
+
+class MessageUpdateCoalescer:
+    """Debounces ``chat_update`` calls so a burst of changes to one message becomes one call.
+
+    ``update(channel, ts, **kwargs)`` keeps only the latest arguments for each
+    ``(channel, ts)`` and sends them through the dispatcher once the message
+    has been quiet for ``delay`` seconds, or ``max_delay`` seconds after the
+    first change of the burst, whichever comes first. Only one call per
+    message is in flight at a time, so an older state can never land after
+    a newer one. A failed call is retried up to ``retries`` times unless a
+    newer state has been queued meanwhile. ``stats()["coalesced"]`` is the
+    number of calls saved. ``on_done(ok)`` is called once the update, or a
+    later one for the same message that replaced it, has been sent or given
+    up on.
+    """
+
+    def __init__(self, dispatcher, delay=0.5, max_delay=2.0, retries=3, priority=PRIORITY_NORMAL):
+        self.dispatcher = dispatcher
+        self.delay = delay
+        self.max_delay = max_delay
+        self.retries = retries
+        self.priority = priority
+        self._cond = threading.Condition()
+        self._pending = {}  # (channel, ts) -> _PendingUpdate
+        self._in_flight = set()
+        self._stats = {"requested": 0, "sent": 0, "coalesced": 0, "failed": 0}
+        self._stopped = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        # Started on first use so forked workers each get their own
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="message-updates", daemon=True)
+            self._thread.start()
+
+    def update(self, channel, ts, on_done=None, **kwargs):
+        """Queue ``chat_update`` for the message, replacing any state queued for it."""
+        now = time.monotonic()
+        key = (channel, ts)
+        with self._cond:
+            self._stats["requested"] += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingUpdate(kwargs, now, now + self.delay)
+            else:
+                self._stats["coalesced"] += 1
+                slack_message_updates.inc(outcome="coalesced")
+                pending.kwargs = kwargs
+                pending.attempts = 0
+                pending.due = min(now + self.delay, pending.first_queued + self.max_delay)
+            if on_done is not None:
+                pending.callbacks.append(on_done)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _take_due(self, now):
+        due = [key for key, pending in self._pending.items() if pending.due <= now and key not in self._in_flight]
+        calls = []
+        for key in due:
+            calls.append((key, self._pending.pop(key)))
+            self._in_flight.add(key)
+        return calls
+
+    def _next_due(self):
+        times = [pending.due for key, pending in self._pending.items() if key not in self._in_flight]
+        return min(times) if times else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped and not self._pending:
+                        return
+                    now = time.monotonic()
+                    calls = self._take_due(float("inf") if self._stopped else now)
+                    if calls:
+                        break
+                    next_due = self._next_due()
+                    self._cond.wait(None if next_due is None else max(0.0, next_due - now))
+            for key, pending in calls:
+                self._send(key, pending)
+
+    def _send(self, key, pending):
+        channel, ts = key
+        pending.attempts += 1
+        try:
+            future = self.dispatcher.submit("chat_update", priority=self.priority, channel=channel, ts=ts, **pending.kwargs)
+        except Exception as e:
+            self._done(key, pending, e)
+            return
+        future.add_done_callback(lambda f: self._done(key, pending, f.exception()))
+
+    def _done(self, key, pending, error):
+        callbacks, ok = [], error is None
+        with self._cond:
+            self._in_flight.discard(key)
+            if error is None:
+                self._stats["sent"] += 1
+                slack_message_updates.inc(outcome="sent")
+                callbacks = pending.callbacks
+            elif key in self._pending:
+                # A newer state is already queued; it supersedes the one that failed
+                logger.warning("chat_update for message %s failed, newer state queued: %s", key[1], error)
+                self._pending[key].callbacks.extend(pending.callbacks)
+            elif pending.attempts < self.retries and not self._stopped:
+                logger.warning("chat_update for message %s failed (attempt %d/%d): %s", key[1], pending.attempts, self.retries, error)
+                pending.due = time.monotonic() + self.delay * 2 ** pending.attempts
+                self._pending[key] = pending
+            else:
+                self._stats["failed"] += 1
+                slack_message_updates.inc(outcome="failed")
+                logger.error("Giving up on chat_update for message %s: %s", key[1], error)
+                callbacks = pending.callbacks
+            self._cond.notify()
+        for callback in callbacks:
+            try:
+                callback(ok)
+            except Exception as e:
+                logger.error("Error in message update callback: %s", e)
+
+    def flush(self, timeout=10):
+        """Send everything queued now and wait up to ``timeout`` seconds for it to finish."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            for pending in self._pending.values():
+                pending.due = 0
+            self._cond.notify()
+            while (self._pending or self._in_flight) and time.monotonic() < deadline:
+                self._cond.wait(0.05)
+
+    def close(self, timeout=10):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending))
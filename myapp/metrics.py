@@ -0,0 +1,245 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a cached lookup up to a Sheets call stuck behind a quota
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[0][i] += 1
+                    break
+            sample[1] += value
+            sample[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Process-local metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+external_call_seconds = REGISTRY.histogram(
+    "sysalert_external_call_seconds", "Time spent in Google Sheets and Slack API calls.", ("service", "method"))
+external_call_errors = REGISTRY.counter(
+    "sysalert_external_call_errors_total", "Google Sheets and Slack API calls that raised.", ("service", "method"))
+http_request_seconds = REGISTRY.histogram(
+    "sysalert_http_request_seconds", "Time to answer each route.", ("endpoint", "method", "status"))
+job_seconds = REGISTRY.histogram(
+    "sysalert_job_seconds", "Run time of scheduled and queued background jobs.", ("job", "outcome"))
+slack_queue_depth = REGISTRY.gauge(
+    "sysalert_slack_queue_depth", "Slack API calls waiting in the dispatcher queue.")
+sheet_pending_writes = REGISTRY.gauge(
+    "sysalert_sheet_pending_writes", "Google Sheets writes queued and not yet flushed, per worksheet.", ("worksheet",))
+sheet_flush_failures = REGISTRY.gauge(
+    "sysalert_sheet_flush_failures", "Consecutive failed background flushes per worksheet; 0 once one succeeds.", ("worksheet",))
+slack_message_updates = REGISTRY.counter(
+    "sysalert_slack_message_updates_total", "Ticket message updates by outcome: sent, coalesced into a later one, or failed.", ("outcome",))
+
+# Set for the duration of a request when per-request timing is on; a list of (name, seconds)
+_breakdown = contextvars.ContextVar("request_timing_breakdown", default=None)
+
+
+def start_breakdown():
+    return _breakdown.set([])
+
+
+def finish_breakdown(token):
+    timings = _breakdown.get()
+    _breakdown.reset(token)
+    return timings or []
+
+
+def record_timing(name, seconds):
+    timings = _breakdown.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def server_timing(timings, elapsed):
+    """Return the ``Server-Timing`` header for a finished breakdown and its total milliseconds per call name."""
+    totals = {}
+    for name, seconds in timings:
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, total + seconds)
+    breakdown = [f"{name};dur={total * 1000:.1f};desc=\"{count} calls\"" for name, (count, total) in totals.items()]
+    breakdown.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(breakdown), {name: round(total * 1000, 1) for name, (_, total) in totals.items()}
+
+
+class InstrumentedClient:
+    """Times every method call made on ``target`` as ``service``/``method``.
+
+    Wraps a gspread worksheet or a Slack ``WebClient`` or ``AsyncWebClient``,
+    whose coroutine methods are timed until they complete; anything that is
+    not callable is passed through untouched.
+    """
+
+    def __init__(self, target, service):
+        self._target = target
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        service = self._service
+
+        if inspect.iscoroutinefunction(attr):
+            @functools.wraps(attr)
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                except Exception:
+                    external_call_errors.inc(service=service, method=name)
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    external_call_seconds.observe(elapsed, service=service, method=name)
+                    record_timing(f"{service}.{name}", elapsed)
+            return timed_async
+
+        @functools.wraps(attr)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                external_call_errors.inc(service=service, method=name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                external_call_seconds.observe(elapsed, service=service, method=name)
+                record_timing(f"{service}.{name}", elapsed)
+        return timed
+
+
+def track_job(name):
+    """Record the run time of a scheduled job in ``job_seconds``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = fn(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                job_seconds.observe(time.perf_counter() - started, job=name, outcome=outcome)
+        return wrapper
+    return decorator
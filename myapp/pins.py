@@ -0,0 +1,85 @@
+import logging
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+# Slack errors that mean the pin is already in the state we want
+_SETTLED_ERRORS = {"pins_add": {"already_pinned"}, "pins_remove": {"no_pin", "message_not_found"}}
+
+
+def wants_pin(ticket):
+    return ticket.priority == "High" and ticket.assigned_to == "Unassigned" and ticket.status == "Open"
+
+
+class PinTracker:
+    """Keeps the channel's pins in line with the set of High, Unassigned, Open tickets.
+
+    Each ticket's channel message is recorded when it is posted, together
+    with whether it should be pinned (``wanted``) and whether it is
+    (``pinned``). Ticket events only flip ``wanted``; ``sync()`` then calls
+    ``pins_add``/``pins_remove`` for the rows where the two differ, found
+    through a partial index, so each run costs one Slack call per change
+    rather than one per ticket.
+    """
+
+    def __init__(self, path):
+        self.db = LocalDatabase(path, schema=[
+            "CREATE TABLE IF NOT EXISTS ticket_pins ("
+            "ticket_id TEXT PRIMARY KEY, channel TEXT NOT NULL, ts TEXT NOT NULL, "
+            "wanted INTEGER NOT NULL, pinned INTEGER NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS ticket_pins_pending ON ticket_pins (ticket_id) WHERE wanted != pinned",
+        ])
+
+    def ticket_posted(self, ticket, channel, ts):
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO ticket_pins (ticket_id, channel, ts, wanted) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ticket_id) DO UPDATE SET channel = excluded.channel, ts = excluded.ts, wanted = excluded.wanted",
+                (ticket.ticket_id, channel, ts, int(wants_pin(ticket))),
+            )
+
+    def ticket_changed(self, ticket):
+        # Tickets posted before messages were recorded have no row and are never pinned
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE ticket_pins SET wanted = ? WHERE ticket_id = ?", (int(wants_pin(ticket)), ticket.ticket_id))
+
+    def messages(self, ticket_ids):
+        """Return ``{ticket_id: (channel, ts)}`` for the tickets whose channel message was recorded."""
+        ticket_ids = list(ticket_ids)
+        if not ticket_ids:
+            return {}
+        rows = self.db.connection().execute(
+            f"SELECT ticket_id, channel, ts FROM ticket_pins WHERE ticket_id IN ({', '.join('?' * len(ticket_ids))})", ticket_ids)
+        return {ticket_id: (channel, ts) for ticket_id, channel, ts in rows}
+
+    def pending(self):
+        """Return ``(ticket_id, channel, ts, wanted)`` for every message whose pin needs to change."""
+        return self.db.connection().execute(
+            "SELECT ticket_id, channel, ts, wanted FROM ticket_pins WHERE wanted != pinned").fetchall()
+
+    def sync(self, call):
+        """Add and remove pins for the pending changes using ``call(method, **kwargs)``.
+
+        Returns ``(added, removed, failed)`` counts.
+        """
+        added = removed = failed = 0
+        for ticket_id, channel, ts, wanted in self.pending():
+            method = "pins_add" if wanted else "pins_remove"
+            try:
+                call(method, channel=channel, timestamp=ts)
+            except Exception as e:
+                response = getattr(e, "response", None)
+                error = response.get("error") if hasattr(response, "get") else None
+                if error not in _SETTLED_ERRORS[method]:
+                    logger.error("Could not %s ticket %s: %s", "pin" if wanted else "unpin", ticket_id, e)
+                    failed += 1
+                    continue
+            with self.db.transaction() as conn:
+                # Only settle if the ticket has not changed again meanwhile
+                conn.execute("UPDATE ticket_pins SET pinned = ? WHERE ticket_id = ? AND wanted = ?", (wanted, ticket_id, wanted))
+            if wanted:
+                added += 1
+            else:
+                removed += 1
+        return added, removed, failed
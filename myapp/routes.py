@@ -1,26 +1,64 @@
-from flask import request, jsonify
+from flask import Response, g, request, jsonify, send_file, stream_with_context
+import hmac
+import json
 import logging
-from apps import app, client
-from apps.helpers import build_new_ticket_modal, update_ticket_status, send_direct_message
+import tempfile
+import time
+from apps import app, dispatcher, job_queue, message_updates
+from apps.config import Config # type: ignore
+from apps.metrics import REGISTRY, finish_breakdown, http_request_seconds, server_timing, slack_queue_depth, start_breakdown # type: ignore
+from apps.slack_dispatcher import PRIORITY_HIGH, PRIORITY_URGENT # type: ignore
+from apps.idempotency import IdempotencyCache, delivery_key # type: ignore
+from apps.analytics import csv_chunks, write_parquet # type: ignore
+from apps.helpers import (EXPORT_DATASETS, build_agent_tickets_view, build_new_ticket_modal, build_search_results_view, build_ticket, # type: ignore
+                          bulk_update_tickets, create_ticket, export_rows, generate_ticket_id, handle_ticket_action, is_system_user,
+                          parse_bulk_command)
 
 logger = logging.getLogger(__name__)
 
+# trigger_id is only valid for 3 seconds after the slash command
+VIEWS_OPEN_DEADLINE = 2.5
+
+# Slack redelivers events it did not see acknowledged in time; answer those from here
+slack_deliveries = IdempotencyCache(
+    ttl=Config.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=Config.IDEMPOTENCY_MAX_ENTRIES,
+    path=Config.LOCAL_STATE_DB if Config.IDEMPOTENCY_SHARED else None,
+)
+
+# Time every route; with REQUEST_TIMING on, also break each request down by Sheets/Slack call
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if Config.REQUEST_TIMING:
+        g.timing_token = start_breakdown()
+
+@app.after_request
+def record_request_time(response):
+    elapsed = time.perf_counter() - g.request_started
+    http_request_seconds.observe(elapsed, endpoint=request.endpoint or "unknown", method=request.method, status=response.status_code)
+    if "timing_token" in g:
+        header, timing_ms = server_timing(finish_breakdown(g.pop("timing_token")), elapsed)
+        response.headers["Server-Timing"] = header
+        logger.info("%s %s timing: %s", request.method, request.path, header, extra={"timing_ms": timing_ms})
+    return response
+
 # Existing routes
 @app.route("/new-ticket", methods=["POST"])
 def new_ticket():
     logger.info("Received /new-ticket request")
     try:
         data = request.form
-        logger.debug(f"Request form data: {data}")
+        logger.debug("Request form data: %s", data)
         trigger_id = data.get("trigger_id")
-        logger.debug(f"Trigger ID: {trigger_id}")
+        logger.debug("Trigger ID: %s", trigger_id)
 
         modal = build_new_ticket_modal()
-        response = client.views_open(trigger_id=trigger_id, view=modal)
-        logger.info(f"New ticket modal opened: {response}")
+        response = dispatcher.call("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("New ticket modal opened: %s", response)
         return "", 200
     except Exception as e:
-        logger.error(f"Error in /new-ticket: {str(e)}")
+        logger.error("Error in /new-ticket: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route("/agent-tickets", methods=["POST"])
@@ -28,82 +66,94 @@ def agent_tickets():
     logger.info("Received /agent-tickets request")
     try:
         data = request.form
-        logger.debug(f"Request form data: {data}")
+        logger.debug("Request form data: %s", data)
         trigger_id = data.get("trigger_id")
         user_id = data.get("user_id")
-        logger.debug(f"Trigger ID: {trigger_id}, User ID: {user_id}")
-
-        from config import sheet
-        tickets = sheet.get_all_values()[1:]
-        logger.debug(f"Total tickets fetched: {len(tickets)}")
-        agent_tickets = [row for row in tickets if row[10] == user_id]
-        logger.debug(f"Found {len(agent_tickets)} tickets for user {user_id}")
-
-        blocks = [
-            {"type": "header", "text": {"type": "plain_text", "text": "🔍 Your Submitted Tickets", "emoji": True}},
-            {
-                "type": "input",
-                "block_id": "status_filter_block",
-                "label": {"type": "plain_text", "text": "Filter by Status", "emoji": True},
-                "element": {
-                    "type": "static_select",
-                    "action_id": "status_filter_select",
-                    "placeholder": {"type": "plain_text", "text": "Choose a status", "emoji": True},
-                    "options": [
-                        {"text": {"type": "plain_text", "text": "All"}, "value": "all"},
-                        {"text": {"type": "plain_text", "text": "Open"}, "value": "Open"},
-                        {"text": {"type": "plain_text", "text": "In Progress"}, "value": "In Progress"},
-                        {"text": {"type": "plain_text", "text": "Resolved"}, "value": "Resolved"},
-                        {"text": {"type": "plain_text", "text": "Closed"}, "value": "Closed"}
-                    ],
-                    "initial_option": {"text": {"type": "plain_text", "text": "All"}, "value": "all"}
-                }
-            },
-            {"type": "divider"}
-        ]
-
-        if not agent_tickets:
-            logger.debug("No tickets found for this user")
-            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "🎉 You have no submitted tickets.\n\n"}})
-        else:
-            logger.debug("Adding tickets to modal blocks")
-            for ticket in agent_tickets:
-                ticket_id = ticket[0]
-                status = ticket[5]
-                campaign = ticket[2]
-                issue = ticket[3]
-                created_date = ticket[10]
-                blocks.append({
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*{ticket_id}* _({status} {'🟢' if status == 'Open' else '🔵' if status == 'In Progress' else '🟡' if status == 'Resolved' else '🔴'})_\n\n"
-                                f"*Campaign:* {campaign}\n\n"
-                                f"*Issue:* {issue}\n\n"
-                                f"*Date:* {created_date}\n\n"
-                    }
-                })
-                blocks.append({"type": "divider"})
-
-        modal = {
-            "type": "modal",
-            "callback_id": "agent_tickets_view",
-            "title": {"type": "plain_text", "text": "Your Tickets", "emoji": True},
-            "close": {"type": "plain_text", "text": "Close", "emoji": True},
-            "blocks": blocks
-        }
-
-        response = client.views_open(trigger_id=trigger_id, view=modal)
-        logger.info(f"Agent tickets modal opened: {response}")
+        logger.debug("Trigger ID: %s, User ID: %s", trigger_id, user_id)
+
+        modal = build_agent_tickets_view(user_id)
+        response = dispatcher.call("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("Agent tickets modal opened: %s", response)
         return "", 200
     except Exception as e:
-        logger.error(f"Error in /agent-tickets: {str(e)}")
+        logger.error("Error in /agent-tickets: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/search-tickets", methods=["POST"])
+def search_tickets():
+    logger.info("Received /search-tickets request")
+    try:
+        data = request.form
+        trigger_id = data.get("trigger_id")
+        query = (data.get("text") or "").strip()
+        logger.debug("Search from %s: %s", data.get("user_id"), query)
+        if not query:
+            return jsonify({"response_type": "ephemeral", "text": "Usage: /search-tickets words to look for, e.g. /search-tickets vonage dialer"})
+
+        modal = build_search_results_view(query)
+        if modal is None:
+            return jsonify({"response_type": "ephemeral", "text": "Search is still getting ready, please try again in a few seconds."})
+        response = dispatcher.call("views_open", priority=PRIORITY_URGENT, deadline=VIEWS_OPEN_DEADLINE, trigger_id=trigger_id, view=modal)
+        logger.info("Search results modal opened: %s", response)
+        return "", 200
+    except Exception as e:
+        logger.error("Error in /search-tickets: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/bulk-tickets", methods=["POST"])
+def bulk_tickets():
+    logger.info("Received /bulk-tickets request")
+    try:
+        data = request.form
+        user_id = data.get("user_id")
+        logger.debug("Bulk command from %s: %s", user_id, data.get("text"))
+        if not is_system_user(user_id):
+            return jsonify({"response_type": "ephemeral", "text": "Only system users can update tickets in bulk."})
+        try:
+            action, assignee, ticket_ids = parse_bulk_command(data.get("text"))
+        except ValueError as e:
+            return jsonify({"response_type": "ephemeral", "text": str(e)})
+
+        # Slash commands must be answered within 3 seconds; the work and its progress report happen in the background
+        if not job_queue.submit(f"bulk_tickets:{user_id}", bulk_update_tickets, action, ticket_ids, user_id, assignee=assignee):
+            return jsonify({"response_type": "ephemeral", "text": "Too busy right now, please try again in a minute."})
+        return jsonify({"response_type": "ephemeral",
+                        "text": f"Updating {len(ticket_ids)} tickets; progress will be sent to you by direct message."})
+    except Exception as e:
+        logger.error("Error in /bulk-tickets: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # New route for Slack events and interactivity
 @app.route("/slack/events", methods=["POST"])
 def slack_events():
     logger.info("Received request at /slack/events")
+    key = delivery_key(request.get_json(silent=True) or {})
+    if key is None:
+        return handle_slack_events()
+    try:
+        claimed, cached = slack_deliveries.claim(key)
+    except Exception as e:
+        logger.error("Error checking delivery %s, handling it anyway: %s", key, e)
+        return handle_slack_events()
+    if not claimed:
+        logger.info("Duplicate delivery %s (retry %s), not handling it again", key, request.headers.get("X-Slack-Retry-Num", "?"))
+        if cached is None:
+            # The first delivery is still being handled
+            return "", 200
+        body, status, mimetype = cached
+        return Response(body, status=status, mimetype=mimetype)
+
+    response = app.make_response(handle_slack_events())
+    try:
+        if response.status_code < 500:
+            slack_deliveries.complete(key, [response.get_data(as_text=True), response.status_code, response.mimetype])
+        else:
+            slack_deliveries.release(key)
+    except Exception as e:
+        logger.error("Error recording delivery %s: %s", key, e)
+    return response
+
+def handle_slack_events():
     try:
         # Handle URL verification challenge (Slack sends this to verify the endpoint)
         if "challenge" in request.json:
@@ -112,98 +162,107 @@ def slack_events():
 
         # Handle events and interactivity payloads
         payload = request.json
-        logger.debug(f"Received payload: {payload}")
+        logger.debug("Received payload: %s", payload)
 
         # Handle view submissions (e.g., when a user submits the new ticket modal)
         if payload.get("type") == "view_submission":
             callback_id = payload["view"]["callback_id"]
             if callback_id == "new_ticket":
                 # Extract values from the modal submission
-                values = payload["view"]["state"]["values"]
-                campaign = values["campaign_block"]["campaign_select"]["selected_option"]["value"]
-                issue_type = values["issue_type_block"]["issue_type_select"]["selected_option"]["value"]
-                priority = values["priority_block"]["priority_select"]["selected_option"]["value"]
-                details = values["details_block"]["details_input"]["value"]
-                salesforce_link = values.get("salesforce_link_block", {}).get("salesforce_link_input", {}).get("value", "N/A")
-                user_id = payload["user"]["id"]
+                try:
+                    values = payload["view"]["state"]["values"]
+                    campaign = values["campaign_block"]["campaign_select"]["selected_option"]["value"]
+                    issue_type = values["issue_type_block"]["issue_type_select"]["selected_option"]["value"]
+                    priority = values["priority_block"]["priority_select"]["selected_option"]["value"]
+                    details = values["details_block"]["details_input"]["value"]
+                    salesforce_link = values.get("salesforce_link_block", {}).get("salesforce_link_input", {}).get("value", "N/A")
+                    user_id = payload["user"]["id"]
+                except (KeyError, TypeError) as e:
+                    logger.warning("Malformed new_ticket submission, missing %s", e)
+                    return jsonify({"status": "error", "message": "Malformed submission"}), 400
 
                 # Generate a ticket ID
-                from helpers import generate_ticket_id
                 ticket_id = generate_ticket_id()
+                ticket = build_ticket(ticket_id, campaign, issue_type, priority, details, salesforce_link, user_id)
 
-                # Log the ticket to Google Sheets
-                from config import sheet
-                from datetime import datetime
-                created_date = datetime.now().strftime("%m/%d/%Y")
-                ticket_data = [
-                    ticket_id, "Unassigned", campaign, issue_type, priority, "Open",
-                    details, salesforce_link, "N/A", created_date, user_id, created_date, ""
-                ]
-                sheet.append_row(ticket_data)
-                logger.info(f"Ticket {ticket_id} logged to Google Sheets")
-
-                # Post the ticket to Slack
-                message_blocks = [
-                    {"type": "header", "text": {"type": "plain_text", "text": "🎫 Ticket Details", "emoji": True}},
-                    {"type": "section", "text": {"type": "mrkdwn", "text": f"✅ *Ticket ID:* {ticket_id}\n\n"}},
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": f"📂 *Campaign:* {campaign}\n\n"
-                                    f"📌 *Issue:* {issue_type}\n\n"
-                                    f"⚡ *Priority:* {priority} {'🔴' if priority == 'High' else '🟡' if priority == 'Medium' else '🔵'}\n\n"
-                                    f"👤 *Assigned To:* Unassigned\n\n"
-                                    f"🔄 *Status:* Open 🟢\n\n"
-                        }
-                    },
-                    {"type": "divider"},
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": f"🖋️ *Details:* {details}\n\n"
-                                    f"🔗 *Salesforce Link:* {salesforce_link}\n\n"
-                        }
-                    },
-                    {"type": "section", "text": {"type": "mrkdwn", "text": f"📅 *Created Date:* {created_date}\n\n"}},
-                    {"type": "divider"},
-                    {
-                        "type": "actions",
-                        "elements": [
-                            {"type": "button", "text": {"type": "plain_text", "text": "🖐 Assign to Me"}, "action_id": f"assign_to_me_{ticket_id}", "value": ticket_id, "style": "primary"},
-                            {"type": "button", "text": {"type": "plain_text", "text": "❌ Close"}, "action_id": f"close_{ticket_id}", "value": ticket_id, "style": "danger"},
-                            {"type": "button", "text": {"type": "plain_text", "text": "🟢 Resolve"}, "action_id": f"resolve_{ticket_id}", "value": ticket_id, "style": "primary"}
-                        ]
-                    }
-                ]
-                response = client.chat_postMessage(channel="#systems-issues", blocks=message_blocks)
-                logger.info(f"Ticket {ticket_id} posted to Slack")
-
-                # Send a confirmation to the user
-                send_direct_message(user_id, f"✅ Your ticket ({ticket_id}) has been submitted successfully!")
+                # Save the ticket, post it to Slack and confirm to the user
+                if not (Config.ASYNC_EVENTS and job_queue.submit(f"create_ticket:{ticket_id}", create_ticket, ticket)):
+                    create_ticket(ticket)
                 return "", 200
 
         # Handle button clicks (e.g., "Assign to Me", "Close", "Resolve")
         if payload.get("type") == "block_actions":
             action = payload["actions"][0]
             action_id = action["action_id"]
+
+            # Filter and page through the /agent-tickets modal in place
+            if action_id == "status_filter_select" or action_id.startswith("agent_tickets_page_"):
+                view = payload["view"]
+                state = json.loads(view.get("private_metadata") or "{}")
+                if action_id == "status_filter_select":
+                    status_filter, page = action["selected_option"]["value"], 0
+                else:
+                    status_filter, page = state.get("status", "all"), int(action["value"])
+                modal = build_agent_tickets_view(payload["user"]["id"], status_filter, page)
+                dispatcher.call("views_update", priority=PRIORITY_HIGH, view_id=view["id"], hash=view.get("hash"), view=modal)
+                return "", 200
+
+            if action_id.startswith("search_tickets_page_"):
+                view = payload["view"]
+                state = json.loads(view.get("private_metadata") or "{}")
+                modal = build_search_results_view(state.get("query", ""), int(action["value"]))
+                if modal is not None:
+                    dispatcher.call("views_update", priority=PRIORITY_HIGH, view_id=view["id"], hash=view.get("hash"), view=modal)
+                return "", 200
+
             ticket_id = action["value"]
             user_id = payload["user"]["id"]
+            message_ts = payload["message"]["ts"]
 
-            if action_id.startswith("assign_to_me_"):
-                update_ticket_status(ticket_id, "In Progress", assigned_to=user_id, message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ You have been assigned to ticket {ticket_id}.")
-            elif action_id.startswith("close_"):
-                update_ticket_status(ticket_id, "Closed", message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ Ticket {ticket_id} has been closed.")
-            elif action_id.startswith("resolve_"):
-                update_ticket_status(ticket_id, "Resolved", message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ Ticket {ticket_id} has been resolved.")
-
+            if not (Config.ASYNC_EVENTS and job_queue.submit(f"ticket_action:{ticket_id}", handle_ticket_action, action_id, ticket_id, user_id, message_ts)):
+                handle_ticket_action(action_id, ticket_id, user_id, message_ts)
             return "", 200
 
         return "", 200
     except Exception as e:
-        logger.error(f"Error in /slack/events: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
+        logger.error("Error in /slack/events: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/slack/dispatcher-stats", methods=["GET"])
+def slack_dispatcher_stats():
+    return jsonify(dict(dispatcher.stats(), message_updates=message_updates.stats()))
+
+@app.route("/export/<dataset>.<fmt>", methods=["GET"])
+def export_history(dataset, fmt):
+    """Download the ticket log or the event log as CSV or Parquet; needs ``Authorization: Bearer <EXPORT_TOKEN>``."""
+    logger.info("Received /export request for %s.%s", dataset, fmt)
+    token = Config.EXPORT_TOKEN
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+    if dataset not in EXPORT_DATASETS or fmt not in ("csv", "parquet"):
+        return jsonify({"status": "error", "message": f"No export {dataset}.{fmt}"}), 404
+    try:
+        header, row_chunks = export_rows(dataset)
+        if fmt == "csv":
+            # Streamed as it is read, a chunk at a time
+            return Response(stream_with_context(csv_chunks(header, row_chunks)), mimetype="text/csv",
+                            headers={"Content-Disposition": f"attachment; filename={dataset}.csv"})
+        # Parquet's footer is written last, so row groups are spooled to disk rather than held in memory
+        file = tempfile.TemporaryFile()
+        try:
+            write_parquet(file, header, row_chunks)
+        except ImportError:
+            file.close()
+            return jsonify({"status": "error", "message": "Parquet export needs pyarrow installed"}), 501
+        file.seek(0)
+        return send_file(file, mimetype="application/vnd.apache.parquet", as_attachment=True, download_name=f"{dataset}.parquet")
+    except Exception as e:
+        logger.error("Error in /export: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Metrics are per process; each gunicorn worker reports its own
+    slack_queue_depth.set(dispatcher.stats()["queue_depth"])
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -1,226 +1,27 @@
-from flask import request, jsonify
 import logging
-from apps import app, client
-from apps.helpers import build_new_ticket_modal, update_ticket_status, send_direct_message # type: ignore
-from apps.config import sheet, weekly_counts_sheet, Config # type: ignore
-from datetime import datetime
+from apps import background_scheduler, dispatcher
+from apps.config import weekly_counts_sheet, Config # type: ignore
+from apps.helpers import pin_tracker, sla_tracker, ticket_counters, ticket_events, ticket_store # type: ignore
+from apps.analytics import ANALYTICS_FIELDS, RESOLVED_STATUSES, backlog_trend, load_ticket_frame, resolution_percentiles # type: ignore
+from apps.blocks import DEFAULT_PRIORITY_EMOJI, PRIORITY_EMOJI # type: ignore
+from apps.jobs import call_with_retries # type: ignore
+from apps.ticket_stats import STATUSES # type: ignore
+from apps.metrics import track_job # type: ignore
+from datetime import datetime, timedelta
+import math
 import pytz
 
 logger = logging.getLogger(__name__)
 
-# Existing routes
-@app.route("/new-ticket", methods=["POST"])
-def new_ticket():
-    logger.info("Received /new-ticket request")
-    try:
-        data = request.form
-        logger.debug(f"Request form data: {data}")
-        trigger_id = data.get("trigger_id")
-        logger.debug(f"Trigger ID: {trigger_id}")
-
-        modal = build_new_ticket_modal()
-        response = client.views_open(trigger_id=trigger_id, view=modal)
-        logger.info(f"New ticket modal opened: {response}")
-        return "", 200
-    except Exception as e:
-        logger.error(f"Error in /new-ticket: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-@app.route("/agent-tickets", methods=["POST"])
-def agent_tickets():
-    logger.info("Received /agent-tickets request")
-    try:
-        data = request.form
-        logger.debug(f"Request form data: {data}")
-        trigger_id = data.get("trigger_id")
-        user_id = data.get("user_id")
-        logger.debug(f"Trigger ID: {trigger_id}, User ID: {user_id}")
-
-        tickets = sheet.get_all_values()[1:]
-        logger.debug(f"Total tickets fetched: {len(tickets)}")
-        agent_tickets = [row for row in tickets if row[10] == user_id]
-        logger.debug(f"Found {len(agent_tickets)} tickets for user {user_id}")
-
-        blocks = [
-            {"type": "header", "text": {"type": "plain_text", "text": "🔍 Your Submitted Tickets", "emoji": True}},
-            {
-                "type": "input",
-                "block_id": "status_filter_block",
-                "label": {"type": "plain_text", "text": "Filter by Status", "emoji": True},
-                "element": {
-                    "type": "static_select",
-                    "action_id": "status_filter_select",
-                    "placeholder": {"type": "plain_text", "text": "Choose a status", "emoji": True},
-                    "options": [
-                        {"text": {"type": "plain_text", "text": "All"}, "value": "all"},
-                        {"text": {"type": "plain_text", "text": "Open"}, "value": "Open"},
-                        {"text": {"type": "plain_text", "text": "In Progress"}, "value": "In Progress"},
-                        {"text": {"type": "plain_text", "text": "Resolved"}, "value": "Resolved"},
-                        {"text": {"type": "plain_text", "text": "Closed"}, "value": "Closed"}
-                    ],
-                    "initial_option": {"text": {"type": "plain_text", "text": "All"}, "value": "all"}
-                }
-            },
-            {"type": "divider"}
-        ]
-
-        if not agent_tickets:
-            logger.debug("No tickets found for this user")
-            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "🎉 You have no submitted tickets.\n\n"}})
-        else:
-            logger.debug("Adding tickets to modal blocks")
-            for ticket in agent_tickets:
-                ticket_id = ticket[0]
-                status = ticket[5]
-                campaign = ticket[2]
-                issue = ticket[3]
-                created_date = ticket[10]
-                blocks.append({
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"*{ticket_id}* _({status} {'🟢' if status == 'Open' else '🔵' if status == 'In Progress' else '🟡' if status == 'Resolved' else '🔴'})_\n\n"
-                                f"*Campaign:* {campaign}\n\n"
-                                f"*Issue:* {issue}\n\n"
-                                f"*Date:* {created_date}\n\n"
-                    }
-                })
-                blocks.append({"type": "divider"})
-
-        modal = {
-            "type": "modal",
-            "callback_id": "agent_tickets_view",
-            "title": {"type": "plain_text", "text": "Your Tickets", "emoji": True},
-            "close": {"type": "plain_text", "text": "Close", "emoji": True},
-            "blocks": blocks
-        }
-
-        response = client.views_open(trigger_id=trigger_id, view=modal)
-        logger.info(f"Agent tickets modal opened: {response}")
-        return "", 200
-    except Exception as e:
-        logger.error(f"Error in /agent-tickets: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-# New route for Slack events and interactivity
-@app.route("/slack/events", methods=["POST"])
-def slack_events():
-    logger.info("Received request at /slack/events")
-    try:
-        # Handle URL verification challenge (Slack sends this to verify the endpoint)
-        if "challenge" in request.json:
-            logger.debug("Received URL verification challenge")
-            return jsonify({"challenge": request.json["challenge"]})
-
-        # Handle events and interactivity payloads
-        payload = request.json
-        logger.debug(f"Received payload: {payload}")
-
-        # Handle view submissions (e.g., when a user submits the new ticket modal)
-        if payload.get("type") == "view_submission":
-            callback_id = payload["view"]["callback_id"]
-            if callback_id == "new_ticket":
-                # Extract values from the modal submission
-                values = payload["view"]["state"]["values"]
-                campaign = values["campaign_block"]["campaign_select"]["selected_option"]["value"]
-                issue_type = values["issue_type_block"]["issue_type_select"]["selected_option"]["value"]
-                priority = values["priority_block"]["priority_select"]["selected_option"]["value"]
-                details = values["details_block"]["details_input"]["value"]
-                salesforce_link = values.get("salesforce_link_block", {}).get("salesforce_link_input", {}).get("value", "N/A")
-                user_id = payload["user"]["id"]
-
-                # Generate a ticket ID
-                from apps.helpers import generate_ticket_id # type: ignore
-                ticket_id = generate_ticket_id()
-
-                # Log the ticket to Google Sheets
-                from apps.config import sheet # type: ignore
-                from datetime import datetime
-                created_date = datetime.now().strftime("%m/%d/%Y")
-                ticket_data = [
-                    ticket_id, "Unassigned", campaign, issue_type, priority, "Open",
-                    details, salesforce_link, "N/A", created_date, user_id, created_date, ""
-                ]
-                sheet.append_row(ticket_data)
-                logger.info(f"Ticket {ticket_id} logged to Google Sheets")
-
-                # Post the ticket to Slack
-                message_blocks = [
-                    {"type": "header", "text": {"type": "plain_text", "text": "🎫 Ticket Details", "emoji": True}},
-                    {"type": "section", "text": {"type": "mrkdwn", "text": f"✅ *Ticket ID:* {ticket_id}\n\n"}},
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": f"📂 *Campaign:* {campaign}\n\n"
-                                    f"📌 *Issue:* {issue_type}\n\n"
-                                    f"⚡ *Priority:* {priority} {'🔴' if priority == 'High' else '🟡' if priority == 'Medium' else '🔵'}\n\n"
-                                    f"👤 *Assigned To:* Unassigned\n\n"
-                                    f"🔄 *Status:* Open 🟢\n\n"
-                        }
-                    },
-                    {"type": "divider"},
-                    {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": f"🖋️ *Details:* {details}\n\n"
-                                    f"🔗 *Salesforce Link:* {salesforce_link}\n\n"
-                        }
-                    },
-                    {"type": "section", "text": {"type": "mrkdwn", "text": f"📅 *Created Date:* {created_date}\n\n"}},
-                    {"type": "divider"},
-                    {
-                        "type": "actions",
-                        "elements": [
-                            {"type": "button", "text": {"type": "plain_text", "text": "🖐 Assign to Me"}, "action_id": f"assign_to_me_{ticket_id}", "value": ticket_id, "style": "primary"},
-                            {"type": "button", "text": {"type": "plain_text", "text": "❌ Close"}, "action_id": f"close_{ticket_id}", "value": ticket_id, "style": "danger"},
-                            {"type": "button", "text": {"type": "plain_text", "text": "🟢 Resolve"}, "action_id": f"resolve_{ticket_id}", "value": ticket_id, "style": "primary"}
-                        ]
-                    }
-                ]
-                response = client.chat_postMessage(channel="#systems-issues", blocks=message_blocks)
-                logger.info(f"Ticket {ticket_id} posted to Slack")
-
-                # Send a confirmation to the user
-                send_direct_message(user_id, f"✅ Your ticket ({ticket_id}) has been submitted successfully!")
-                return "", 200
-
-        # Handle button clicks (e.g., "Assign to Me", "Close", "Resolve")
-        if payload.get("type") == "block_actions":
-            action = payload["actions"][0]
-            action_id = action["action_id"]
-            ticket_id = action["value"]
-            user_id = payload["user"]["id"]
-
-            if action_id.startswith("assign_to_me_"):
-                update_ticket_status(ticket_id, "In Progress", assigned_to=user_id, message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ You have been assigned to ticket {ticket_id}.")
-            elif action_id.startswith("close_"):
-                update_ticket_status(ticket_id, "Closed", message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ Ticket {ticket_id} has been closed.")
-            elif action_id.startswith("resolve_"):
-                update_ticket_status(ticket_id, "Resolved", message_ts=payload["message"]["ts"], action_user_id=user_id)
-                send_direct_message(user_id, f"✅ Ticket {ticket_id} has been resolved.")
-
-            return "", 200
-
-        return "", 200
-    except Exception as e:
-        logger.error(f"Error in /slack/events: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
 # Background tasks
+@track_job("weekly_summary")
 def generate_weekly_summary():
     """Generate and post a weekly ticket summary to the Slack channel."""
     try:
         logger.info("Generating weekly summary...")
-        tickets = sheet.get_all_values()[1:]  # Skip header row
-        total_tickets = len(tickets)
-        open_tickets = len([row for row in tickets if row[5] == "Open"])
-        in_progress_tickets = len([row for row in tickets if row[5] == "In Progress"])
-        resolved_tickets = len([row for row in tickets if row[5] == "Resolved"])
-        closed_tickets = len([row for row in tickets if row[5] == "Closed"])
+        counts = ticket_counters.counts()
+        total_tickets = counts["total"].get("", 0)
+        open_tickets, in_progress_tickets, resolved_tickets, closed_tickets = (counts["status"].get(status, 0) for status in STATUSES)
 
         summary = (
             f"📊 *Weekly Ticket Summary*\n\n"
@@ -230,16 +31,128 @@ def generate_weekly_summary():
             f"🟡 *Resolved:* {resolved_tickets}\n"
             f"🔴 *Closed:* {closed_tickets}\n"
         )
-
-        client.chat_postMessage(channel=Config.SLACK_CHANNEL, text=summary)
+        try:
+            analytics, overall = build_analytics_summary(datetime.now())
+            summary += f"\n{analytics}"
+        except Exception as e:
+            logger.error("Error computing ticket analytics: %s", e)
+            overall = None
+
+        dispatcher.call("chat_postMessage", channel=Config.SLACK_CHANNEL, text=summary)
         logger.info("Weekly summary posted.")
 
         # Update WeeklyCounts sheet
         week_number = datetime.now(pytz.timezone(Config.TIMEZONE)).isocalendar()[1]
         new_row = [week_number, total_tickets, open_tickets, in_progress_tickets, resolved_tickets, closed_tickets]
+        if overall is not None:
+            new_row += [_round_hours(overall["p50"]), _round_hours(overall["p90"])]
         weekly_counts_sheet.append_row(new_row)
         logger.info("WeeklyCounts sheet updated.")
     except Exception as e:
-        logger.error(f"Error in weekly summary: {e}")
+        logger.error("Error in weekly summary: %s", e)
+
+SLOWEST_GROUPS_SHOWN = 3
+SLOWEST_GROUP_MIN_TICKETS = 5  # fewer resolved tickets than this make a p90 meaningless
+
+def _round_hours(hours):
+    return "" if math.isnan(hours) else round(hours, 1)
+
+def _format_hours(hours):
+    return "–" if math.isnan(hours) else f"{hours:.1f}h"
+
+def build_analytics_summary(now):
+    """Return the resolution time and backlog part of the weekly summary, and the overall percentiles row.
+
+    The ticket log is read a chunk at a time into a columnar frame; times to
+    resolution cover tickets resolved in the last ``ANALYTICS_WEEKS`` weeks.
+    """
+    frame = load_ticket_frame(ticket_store.iter_rows(Config.EXPORT_CHUNK_SIZE, ANALYTICS_FIELDS),
+                              ticket_events.first_status_changes(RESOLVED_STATUSES))
+    since = now - timedelta(weeks=Config.ANALYTICS_WEEKS)
+    overall = resolution_percentiles(frame, since=since).iloc[0]
+    lines = [f"⏱ *Time to Resolution* (last {Config.ANALYTICS_WEEKS} weeks, {int(overall['count'])} tickets): "
+             f"median {_format_hours(overall['p50'])}, p90 {_format_hours(overall['p90'])}"]
+    by_priority = resolution_percentiles(frame, ("priority",), since=since)
+    for priority in sorted(by_priority.index, key=lambda p: Config.SLA_HOURS.get(p, float("inf"))):
+        row = by_priority.loc[priority]
+        lines.append(f"    {PRIORITY_EMOJI.get(priority, DEFAULT_PRIORITY_EMOJI)} {priority}: "
+                     f"median {_format_hours(row['p50'])}, p90 {_format_hours(row['p90'])} ({int(row['count'])})")
+    groups = resolution_percentiles(frame, ("campaign", "issue_type"), since=since)
+    slowest = groups[groups["count"] >= SLOWEST_GROUP_MIN_TICKETS].nlargest(SLOWEST_GROUPS_SHOWN, "p90")
+    if len(slowest):
+        lines.append("🐢 *Slowest to resolve* (p90): " + ", ".join(
+            f"{campaign} / {issue_type} {_format_hours(row['p90'])}" for (campaign, issue_type), row in slowest.iterrows()))
+    trend = backlog_trend(frame, Config.ANALYTICS_WEEKS, now)
+    first_week, last_week = trend.iloc[0], trend.iloc[-1]
+    backlog_before = int(first_week["backlog"] - first_week["opened"] + first_week["resolved"])
+    lines.append(f"📈 *Backlog:* {backlog_before} → {int(last_week['backlog'])} over {Config.ANALYTICS_WEEKS} weeks; "
+                 f"last week {int(last_week['opened'])} opened, {int(last_week['resolved'])} resolved")
+    return "\n".join(lines), overall
+
+@track_job("reconcile_ticket_counters")
+def reconcile_ticket_counters():
+    """Recount tickets from the ticket store and correct any drift in the running counters."""
+    try:
+        logger.info("Reconciling ticket counters...")
+        drift = ticket_counters.reconcile(ticket_store.count_rows)
+        if drift:
+            logger.warning("Ticket counters drifted from the ticket store and were corrected: %s", drift)
+        else:
+            logger.info("Ticket counters match the ticket store.")
+    except Exception as e:
+        logger.error("Error reconciling ticket counters: %s", e)
+
+OVERDUE_IDS_PER_PRIORITY = 30  # keeps the escalation message readable after a long outage
+
+def build_overdue_message(overdue):
+    by_priority = {}
+    for ticket_id, priority, _ in sorted(overdue, key=lambda entry: entry[2]):
+        by_priority.setdefault(priority, []).append(ticket_id)
+    lines = [f"⏰ *Overdue Tickets* ({len(overdue)} past SLA)\n"]
+    # Tightest SLA first
+    for priority in sorted(by_priority, key=lambda p: Config.SLA_HOURS.get(p, float("inf"))):
+        ticket_ids = by_priority[priority]
+        shown = ", ".join(ticket_ids[:OVERDUE_IDS_PER_PRIORITY])
+        more = f" and {len(ticket_ids) - OVERDUE_IDS_PER_PRIORITY} more" if len(ticket_ids) > OVERDUE_IDS_PER_PRIORITY else ""
+        sla = f" ({Config.SLA_HOURS[priority]}h SLA)" if priority in Config.SLA_HOURS else ""
+        lines.append(f"{PRIORITY_EMOJI.get(priority, DEFAULT_PRIORITY_EMOJI)} *{priority}*{sla}: {shown}{more}")
+    return "\n".join(lines)
+
+@track_job("check_overdue_tickets")
+def check_overdue_tickets():
+    """Post one message listing the tickets that have passed their SLA since the last check."""
+    try:
+        overdue = sla_tracker.pop_expired()
+        if not overdue:
+            logger.info("No newly overdue tickets.")
+            return
+        logger.info("%d tickets newly overdue", len(overdue))
+        try:
+            call_with_retries(dispatcher.call, "chat_postMessage", channel=Config.SLACK_CHANNEL,
+                              text=build_overdue_message(overdue), retries=Config.JOB_RETRIES)
+        except Exception as e:
+            logger.error("Could not post overdue tickets %s: %s", [ticket_id for ticket_id, _, _ in overdue], e)
+    except Exception as e:
+        logger.error("Error checking overdue tickets: %s", e)
 
-# Other background tasks like check_overdue_tickets() and pin_high_priority_unassigned_tickets() remain the same.
+@track_job("pin_high_priority_unassigned_tickets")
+def pin_high_priority_unassigned_tickets():
+    """Pin High, Unassigned, Open tickets in the channel and unpin the ones that no longer are."""
+    try:
+        # Failed calls stay pending and are retried on the next run
+        added, removed, failed = pin_tracker.sync(dispatcher.call)
+        if added or removed or failed:
+            logger.info("Pinned %d and unpinned %d tickets, %d left for the next run", added, removed, failed)
+        else:
+            logger.debug("Ticket pins already up to date.")
+    except Exception as e:
+        logger.error("Error pinning high priority tickets: %s", e)
+
+def start_scheduler():
+    """Register the background tasks and start the scheduler; called in the elected leader only."""
+    background_scheduler.add_job(generate_weekly_summary, "cron", day_of_week="mon", hour=9, id="weekly_summary", replace_existing=True)
+    background_scheduler.add_job(reconcile_ticket_counters, "interval", hours=Config.COUNTER_RECONCILE_HOURS, id="reconcile_ticket_counters", replace_existing=True)
+    background_scheduler.add_job(check_overdue_tickets, "interval", minutes=Config.SLA_CHECK_MINUTES, id="check_overdue_tickets", replace_existing=True)
+    background_scheduler.add_job(pin_high_priority_unassigned_tickets, "interval", minutes=Config.PIN_SYNC_MINUTES, id="pin_high_priority_unassigned_tickets", replace_existing=True)
+    background_scheduler.start()
+    logger.info("Scheduler tasks added.")
@@ -0,0 +1,316 @@
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Columns read to build the index, in this order
+SEARCH_FIELDS = ("ticket_id", "campaign", "issue_type", "priority", "status", "created_date", "details", "comments")
+# How much one occurrence of a term counts, by the field it is in
+FIELD_WEIGHTS = {"ticket_id": 8, "campaign": 3, "issue_type": 3, "details": 1, "comments": 1}
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "i", "in", "is", "it",
+    "its", "me", "my", "no", "not", "of", "on", "or", "so", "that", "the", "their", "this", "to", "was", "we",
+    "were", "when", "with",
+))
+SNIPPET_CHARS = 150
+MAX_PREFIX_TERMS = 50  # terms the last query word may expand to
+MAX_WEIGHT = 0xFFFF
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# What a result shows; details are cut down to a one-line snippet
+SearchHit = namedtuple("SearchHit", ("ticket_id", "campaign", "issue_type", "priority", "status", "created_date", "snippet"))
+
+_TERM = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"\d+$")
+
+
+def tokenize(text):
+    return [term for term in _TERM.findall(text.lower()) if term not in STOP_WORDS]
+
+
+def _ticket_id_terms(ticket_id):
+    # "T1042" is found by "t1042" and by "1042"
+    terms = tokenize(ticket_id)
+    number = _NUMBER.search(ticket_id)
+    if number and number.group() not in terms:
+        terms.append(number.group())
+    return terms
+
+
+def _snippet(details):
+    details = " ".join(details.split())
+    return details if len(details) <= SNIPPET_CHARS else details[:SNIPPET_CHARS - 1].rstrip() + "…"
+
+
+class _Postings:
+    """Ascending document numbers holding a term, with the term's weight in each."""
+
+    __slots__ = ("docs", "weights")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.weights = array("H")
+
+    def add(self, doc, weight):
+        """Record ``weight`` for ``doc`` unless the term is already there."""
+        if not self.docs or self.docs[-1] < doc:
+            self.docs.append(doc)
+            self.weights.append(weight)
+            return True
+        position = bisect_left(self.docs, doc)
+        if position < len(self.docs) and self.docs[position] == doc:
+            return False
+        self.docs.insert(position, doc)
+        self.weights.insert(position, weight)
+        return True
+
+
+class _IndexState:
+    def __init__(self):
+        self.postings = {}  # term -> _Postings
+        self.vocabulary = []  # every term, sorted when a prefix lookup needs it
+        self.vocabulary_sorted = True
+        self.doc_numbers = {}  # ticket_id -> document number, in creation order
+        self.hits = []  # document number -> SearchHit
+        self.lengths = array("I")  # document number -> summed term weights
+        self.total_length = 0
+        self.ticket_position = 0  # TicketStore.rows_since position of the last ticket read
+        self.event_id = 0  # last ticket event applied
+
+    def _postings(self, term):
+        postings = self.postings.get(term)
+        if postings is None:
+            postings = self.postings[term] = _Postings()
+            self.vocabulary.append(term)
+            self.vocabulary_sorted = False
+        return postings
+
+    def _add_terms(self, doc, weights):
+        added = 0
+        for term, weight in weights.items():
+            if self._postings(term).add(doc, min(weight, MAX_WEIGHT)):
+                added += weight
+        self.lengths[doc] += added
+        self.total_length += added
+
+    def _append_terms(self, doc, weights):
+        # ``doc`` is the newest document, so it goes at the end of every list
+        postings = self.postings
+        for term, weight in weights.items():
+            entry = postings.get(term) or self._postings(term)
+            entry.docs.append(doc)
+            entry.weights.append(weight if weight < MAX_WEIGHT else MAX_WEIGHT)
+        length = sum(weights.values())
+        self.lengths.append(length)
+        self.total_length += length
+
+    def add(self, fields):
+        ticket_id = fields["ticket_id"]
+        hit = SearchHit(ticket_id, fields["campaign"], fields["issue_type"], fields["priority"], fields["status"],
+                        fields["created_date"], _snippet(fields["details"]))
+        doc = self.doc_numbers.get(ticket_id)
+        if doc is not None:
+            # Only status and assignment change after creation; the indexed text stays as it was
+            self.hits[doc] = hit
+            return
+        doc = self.doc_numbers[ticket_id] = len(self.hits)
+        self.hits.append(hit)
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            terms = _ticket_id_terms(ticket_id) if field == "ticket_id" else tokenize(fields[field])
+            for term in terms:
+                weights[term] = weights.get(term, 0) + weight
+        self._append_terms(doc, weights)
+
+    def status_changed(self, ticket_id, status):
+        doc = self.doc_numbers.get(ticket_id)
+        if doc is not None:
+            self.hits[doc] = self.hits[doc]._replace(status=status)
+
+    def comment(self, ticket_id, text):
+        # A comment adds the terms the ticket did not have yet, so replaying one is harmless
+        doc = self.doc_numbers.get(ticket_id)
+        if doc is not None:
+            self._add_terms(doc, dict.fromkeys(tokenize(text), FIELD_WEIGHTS["comments"]))
+
+    def expand(self, prefix):
+        if not self.vocabulary_sorted:
+            self.vocabulary.sort()
+            self.vocabulary_sorted = True
+        start = bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+
+class TicketSearchIndex:
+    """In-process inverted index over ticket IDs, campaigns, issue types, details and comments.
+
+    Every term maps to the ascending numbers of the tickets holding it, with
+    its weight in each (a term in the ID counts more than one in the
+    details, see ``FIELD_WEIGHTS``), in compact arrays. ``search`` scores
+    the postings of each query word with BM25 in numpy, starting from the
+    word with the fewest tickets and keeping the tickets every other word
+    has too, and sorts only the page asked for; the last word also matches
+    as a prefix.
+
+    ``start_loading(tickets, events)`` builds the index once in the
+    background from a ``TicketStore`` and the ``TicketEventLog``. After that,
+    every search first reads the tickets created and the events logged since
+    the last one (``rows_since`` and ``events_since``), so tickets created,
+    changed or commented on by any worker show up, not only this one's.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+        self._state = _IndexState()
+        self._ready = False
+        self._loading = False
+        self._tickets = None
+        self._events = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def start_loading(self, tickets, events):
+        """Build the index on a background thread. Safe to call repeatedly; only the first call loads."""
+        with self._lock:
+            if self._loading or self._ready:
+                return
+            self._loading = True
+            self._tickets, self._events = tickets, events
+        threading.Thread(target=self._load, name="search-index", daemon=True).start()
+
+    def _load(self):
+        # Imported while loading so the first search doesn't pay for it
+        import numpy  # noqa: F401  (warm the import for the first search)
+        started = time.perf_counter()
+        state = _IndexState()
+        try:
+            # Nothing else sees the new state yet, so it needs no lock
+            self._catch_up(state, nullcontext())
+        except Exception as e:
+            logger.error("Error building the search index: %s", e)
+            with self._lock:
+                self._loading = False
+            return
+        with self._lock:
+            self._state = state
+            self._ready, self._loading = True, False
+        logger.info("Search index built with %d tickets and %d terms in %.1fs",
+                    len(state.hits), len(state.postings), time.perf_counter() - started)
+
+    def _catch_up(self, state, lock):
+        # Every event up to here was logged after its ticket was saved, so the
+        # ticket reads that follow cover the tickets of all of them
+        last_event_id = self._events.last_event_id()
+        while True:
+            rows, position = self._tickets.rows_since(state.ticket_position, SEARCH_FIELDS, self.chunk_size)
+            if position == state.ticket_position:
+                break
+            with lock:
+                for row in rows:
+                    state.add(dict(zip(SEARCH_FIELDS, row)))
+                state.ticket_position = position
+        while state.event_id < last_event_id:
+            events = self._events.events_since(state.event_id, last_event_id, self.chunk_size)
+            with lock:
+                for event_id, ticket_id, kind, new_status, text in events:
+                    if kind == "comment":
+                        state.comment(ticket_id, text)
+                    elif kind == "status":
+                        state.status_changed(ticket_id, new_status)
+                state.event_id = events[-1][0] if events else last_event_id
+
+    def refresh(self):
+        """Apply the tickets and events saved since the last refresh, by this process or any other."""
+        if not self._ready:
+            return
+        with self._catch_up_lock:
+            try:
+                self._catch_up(self._state, self._lock)
+            except Exception as e:
+                # Search what we have rather than fail the search
+                logger.error("Error updating the search index: %s", e)
+
+    def search(self, query, page=0, page_size=10):
+        """Return ``(hits, total)``: one page of the tickets matching every word of ``query``, best first."""
+        import numpy as np
+
+        words = tokenize(query)
+        if not words:
+            return [], 0
+        self.refresh()
+        with self._lock:
+            state = self._state
+            groups = []
+            for position, word in enumerate(words):
+                terms = state.expand(word) if position == len(words) - 1 else [word]
+                postings = [state.postings[term] for term in terms if term in state.postings]
+                if not postings:
+                    return [], 0
+                groups.append(postings)
+            docs, scores = self._score(np, state, groups)
+            total = len(docs)
+            hits_wanted = (page + 1) * page_size
+            if len(docs) > hits_wanted:
+                best = np.argpartition(-scores, hits_wanted - 1)[:hits_wanted]
+                docs, scores = docs[best], scores[best]
+            # Best score first, newest ticket first among equals
+            order = np.lexsort((-docs.astype(np.int64), -scores))[page * page_size:]
+            return [state.hits[doc] for doc in docs[order].tolist()], total
+
+    @staticmethod
+    def _score(np, state, groups):
+        # Postings are copied out of their arrays, which must stay resizable for new tickets
+        count = len(state.hits)
+        average_length = state.total_length / count if count else 1.0
+        lengths = np.array(state.lengths, dtype=np.float64)
+
+        def group_scores(group):
+            # BM25 per term; a word matching several terms by prefix counts its best one
+            docs, scores = [], []
+            for postings in group:
+                term_docs = np.array(postings.docs)
+                weights = np.array(postings.weights, dtype=np.float64)
+                idf = math.log(1 + (count - len(term_docs) + 0.5) / (len(term_docs) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[term_docs] / average_length)
+                docs.append(term_docs)
+                scores.append(idf * weights * (BM25_K1 + 1) / (weights + norm))
+            if len(group) == 1:
+                return docs[0], scores[0]
+            docs, scores = np.concatenate(docs), np.concatenate(scores)
+            order = np.lexsort((-scores, docs))
+            docs, scores = docs[order], scores[order]
+            first = np.ones(len(docs), dtype=bool)
+            first[1:] = docs[1:] != docs[:-1]
+            return docs[first], scores[first]
+
+        # Start from the word held by the fewest tickets and keep the tickets every other word has too
+        groups = sorted(groups, key=lambda group: sum(len(postings.docs) for postings in group))
+        docs, scores = group_scores(groups[0])
+        for group in groups[1:]:
+            if not len(docs):
+                break
+            group_docs, group_score = group_scores(group)
+            positions = np.minimum(np.searchsorted(group_docs, docs), len(group_docs) - 1)
+            found = group_docs[positions] == docs
+            docs, scores = docs[found], scores[found] + group_score[positions[found]]
+        return docs, scores
+
+    def __len__(self):
+        return len(self._state.hits)
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+
+from .metrics import sheet_flush_failures, sheet_pending_writes
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedWorksheet:
+    """Write-behind wrapper around a gspread worksheet.
+
+    ``append_row``, ``update`` and ``batch_update`` are queued and written in
+    one ``append_rows`` plus one ``batch_update`` call every ``flush_interval``
+    seconds, or as soon as ``flush_size`` writes are pending. Repeated updates
+    of the same range collapse into the latest value, sent in the order of
+    each range's latest write so it lands after any older write to an
+    overlapping range. Reads flush pending writes first so callers
+    always see their own writes; anything else is delegated to the worksheet.
+
+    A failed flush keeps its writes queued. Background flushes then back off
+    exponentially, up to ``max_backoff`` seconds between attempts, and the
+    consecutive failures and queued writes are reported in ``/metrics`` under
+    ``name``; a flush made before a read is tried once and does not count.
+    """
+
+    def __init__(self, worksheet, flush_interval=2.0, flush_size=50, max_backoff=60.0, name="worksheet"):
+        self.worksheet = worksheet
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_backoff = max_backoff
+        self.name = name
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._appends = []
+        self._updates = {}  # range -> values, in last-write order
+        self._failures = 0
+        self._retry_at = 0.0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def _pending(self):
+        return len(self._appends) + len(self._updates)
+
+    def _ensure_thread(self):
+        # Started on first write so forked workers each get their own flusher
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # While backing off, a full queue doesn't bring the next attempt forward
+            backoff = self._retry_at - time.monotonic()
+            if backoff > 0 and self._stopped.wait(backoff):
+                break
+            self._flush(scheduled=True)
+
+    def append_row(self, values, **kwargs):
+        if kwargs:
+            self.flush()
+            return self.worksheet.append_row(values, **kwargs)
+        with self._lock:
+            self._appends.append(list(values))
+            self._after_write()
+
+    def update(self, range_name, values=None, **kwargs):
+        if kwargs:
+            self.flush()
+            return self.worksheet.update(range_name, values, **kwargs)
+        with self._lock:
+            self._queue_update(range_name, values)
+            self._after_write()
+
+    def batch_update(self, data, **kwargs):
+        if kwargs:
+            self.flush()
+            return self.worksheet.batch_update(data, **kwargs)
+        with self._lock:
+            for item in data:
+                self._queue_update(item["range"], item["values"])
+            self._after_write()
+
+    def _queue_update(self, range_name, values, updates=None):
+        # Re-inserted rather than overwritten in place, so a rewrite moves after older overlapping writes
+        updates = self._updates if updates is None else updates
+        updates.pop(range_name, None)
+        updates[range_name] = values
+
+    def _after_write(self):
+        self._ensure_thread()
+        pending = self._pending()
+        sheet_pending_writes.set(pending, worksheet=self.name)
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything queued now; on failure the writes stay queued for the background flusher."""
+        return self._flush(scheduled=False)
+
+    def _flush(self, scheduled):
+        # Only one flush talks to the API at a time; writers keep queueing meanwhile
+        with self._flush_lock:
+            with self._lock:
+                appends, updates = self._appends, self._updates
+                if not appends and not updates:
+                    return True
+                self._appends, self._updates = [], {}
+            counts = (len(appends), len(updates))
+            try:
+                if appends:
+                    self.worksheet.append_rows(appends)
+                    appends = []
+                if updates:
+                    self.worksheet.batch_update([{"range": r, "values": v} for r, v in updates.items()])
+            except Exception as e:
+                with self._lock:
+                    # Put the batch back in front of anything queued since
+                    self._appends = appends + self._appends
+                    for range_name, values in self._updates.items():
+                        self._queue_update(range_name, values, updates)
+                    self._updates = updates
+                    pending = self._pending()
+                sheet_pending_writes.set(pending, worksheet=self.name)
+                if not scheduled:
+                    logger.warning("Flush of %s before a read failed, %d writes still queued: %s", self.name, pending, e)
+                    return False
+                self._failures += 1
+                backoff = min(self.flush_interval * 2 ** min(self._failures, 16), self.max_backoff)
+                self._retry_at = time.monotonic() + backoff
+                sheet_flush_failures.set(self._failures, worksheet=self.name)
+                logger.error("Failed to flush %s (attempt %d), %d writes still queued, retrying in %.1fs: %s",
+                             self.name, self._failures, pending, backoff, e)
+                return False
+            logger.debug("Flushed %d appends and %d updates to %s", counts[0], counts[1], self.name)
+            if self._failures:
+                logger.info("Flushed %s again after %d failed attempts", self.name, self._failures)
+            self._failures, self._retry_at = 0, 0.0
+            sheet_flush_failures.set(0, worksheet=self.name)
+            with self._lock:
+                sheet_pending_writes.set(self._pending(), worksheet=self.name)
+            return True
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        if not self.flush():
+            with self._lock:
+                logger.error("Exiting with %d writes to %s unwritten", self._pending(), self.name)
+
+    # Reads see pending writes
+
+    def row_values(self, row, **kwargs):
+        self.flush()
+        return self.worksheet.row_values(row, **kwargs)
+
+    def get_all_values(self, **kwargs):
+        self.flush()
+        return self.worksheet.get_all_values(**kwargs)
+
+    def get(self, range_name=None, **kwargs):
+        self.flush()
+        return self.worksheet.get(range_name, **kwargs)
+
+    def col_values(self, col, **kwargs):
+        self.flush()
+        return self.worksheet.col_values(col, **kwargs)
+
+    def batch_get(self, ranges, **kwargs):
+        self.flush()
+        return self.worksheet.batch_get(ranges, **kwargs)
@@ -0,0 +1,130 @@
+import heapq
+import logging
+import threading
+import time
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+# Tickets in these statuses are on the clock
+ACTIVE_STATUSES = ("Open", "In Progress")
+
+
+class SLATracker:
+    """Finds tickets that have been active past their priority's SLA.
+
+    Any worker records deadline changes in the ``sla_deadlines`` table of the
+    local SQLite file, each stamped with an increasing ``seq``. The process
+    that checks deadlines (the scheduler leader) keeps a min-heap of
+    ``(deadline, ticket_id, seq)`` and on every check only reads rows changed
+    since the last one, so a check costs O(changes + expired · log n) rather
+    than a scan. Entries superseded by a later change are skipped when they
+    reach the top of the heap. ``seed()`` should return ``(ticket_id,
+    priority)`` for every active ticket and is used once to fill an empty
+    table, with each ticket's clock starting at that moment.
+    """
+
+    def __init__(self, path, sla_hours, seed=None):
+        self.db = LocalDatabase(path, schema=[
+            "CREATE TABLE IF NOT EXISTS sla_deadlines ("
+            "ticket_id TEXT PRIMARY KEY, priority TEXT NOT NULL, deadline REAL, "
+            "escalated INTEGER NOT NULL DEFAULT 0, seq INTEGER NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS sla_deadlines_seq ON sla_deadlines (seq)",
+        ])
+        self.sla_seconds = {priority: hours * 3600 for priority, hours in sla_hours.items()}
+        self.default_seconds = max(self.sla_seconds.values())
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._heap = []
+        self._live = {}  # ticket_id -> seq of the entry that counts
+        self._last_seq = 0
+        self._seeded = False
+
+    def deadline(self, priority, start):
+        return start + self.sla_seconds.get(priority, self.default_seconds)
+
+    def _write(self, conn, ticket_id, priority, deadline):
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM sla_deadlines").fetchone()[0]
+        conn.execute(
+            "INSERT INTO sla_deadlines (ticket_id, priority, deadline, escalated, seq) VALUES (?, ?, ?, 0, ?) "
+            "ON CONFLICT (ticket_id) DO UPDATE SET priority = excluded.priority, deadline = excluded.deadline, "
+            "escalated = 0, seq = excluded.seq",
+            (ticket_id, priority, deadline, seq),
+        )
+
+    def track(self, ticket_id, priority, start=None):
+        """Start the clock on a ticket; ``start`` defaults to now."""
+        self._ensure_seeded()
+        deadline = self.deadline(priority, time.time() if start is None else start)
+        with self.db.transaction() as conn:
+            self._write(conn, ticket_id, priority, deadline)
+
+    def untrack(self, ticket_id):
+        self._ensure_seeded()
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT priority, deadline FROM sla_deadlines WHERE ticket_id = ?", (ticket_id,)).fetchone()
+            if row is not None and row[1] is not None:
+                self._write(conn, ticket_id, row[0], None)
+
+    def status_changed(self, ticket_id, priority, old_status, new_status):
+        if new_status in ACTIVE_STATUSES and old_status not in ACTIVE_STATUSES:
+            # Reopened; the clock starts again
+            self.track(ticket_id, priority)
+        elif new_status not in ACTIVE_STATUSES:
+            self.untrack(ticket_id)
+
+    def _ensure_seeded(self):
+        if self._seeded:
+            return
+        conn = self.db.connection()
+        if self.seed and conn.execute("SELECT 1 FROM sla_deadlines LIMIT 1").fetchone() is None:
+            tickets = self.seed()
+            # Tickets from before the tracker existed get a full SLA from now; counting
+            # from their created date would escalate the whole backlog on the first check
+            start = time.time()
+            with self.db.transaction() as conn:
+                if conn.execute("SELECT 1 FROM sla_deadlines LIMIT 1").fetchone() is None:
+                    logger.info("Seeding SLA deadlines for %d active tickets", len(tickets))
+                    for ticket_id, priority in tickets:
+                        self._write(conn, ticket_id, priority, self.deadline(priority, start))
+        self._seeded = True
+
+    def _sync(self):
+        rows = self.db.connection().execute(
+            "SELECT ticket_id, priority, deadline, escalated, seq FROM sla_deadlines WHERE seq > ? ORDER BY seq",
+            (self._last_seq,)).fetchall()
+        for ticket_id, priority, deadline, escalated, seq in rows:
+            if deadline is None or escalated:
+                self._live.pop(ticket_id, None)
+            else:
+                self._live[ticket_id] = seq
+                heapq.heappush(self._heap, (deadline, ticket_id, seq, priority))
+            self._last_seq = seq
+
+    def pop_expired(self, now=None):
+        """Return ``(ticket_id, priority, deadline)`` for every ticket now past its deadline.
+
+        Each ticket is returned once; it is tracked again only if it leaves
+        and re-enters an active status.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_seeded()
+            self._sync()
+            expired, escalated = [], []
+            while self._heap and self._heap[0][0] <= now:
+                deadline, ticket_id, seq, priority = heapq.heappop(self._heap)
+                if self._live.get(ticket_id) != seq:
+                    continue
+                del self._live[ticket_id]
+                expired.append((ticket_id, priority, deadline))
+                escalated.append((ticket_id, seq))
+            if escalated:
+                with self.db.transaction() as conn:
+                    # Leave the row alone if another worker changed it since the sync
+                    conn.executemany("UPDATE sla_deadlines SET escalated = 1 WHERE ticket_id = ? AND seq = ?", escalated)
+            return expired
+
+    def __len__(self):
+        return len(self._live)
@@ -0,0 +1,338 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_for_futures
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are sent first
+PRIORITY_URGENT = 0  # views_open and friends; the trigger_id expires after 3 seconds
+PRIORITY_HIGH = 1  # High-priority ticket posts
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3  # confirmation DMs
+
+# Sustained requests per minute, following Slack's published method tiers
+METHOD_RATES = {
+    "views_open": 100,
+    "views_update": 100,
+    "views_push": 100,
+    "chat_postMessage": 60,  # roughly one message per second per channel
+    "chat_update": 50,
+    "pins_add": 20,
+    "pins_remove": 20,
+}
+DEFAULT_RATE = 50
+MAX_RATE_LIMITED_RETRIES = 5
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now):
+        self._refill(now)
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Call:
+    __slots__ = ("priority", "seq", "method", "kwargs", "future", "enqueued_at", "deadline", "attempts", "context")
+
+    def __init__(self, priority, seq, method, kwargs, deadline):
+        self.priority = priority
+        self.seq = seq
+        self.method = method
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.attempts = 0
+        # Run the call in the caller's context so per-request timings include it
+        self.context = contextvars.copy_context()
+
+    @property
+    def bucket_key(self):
+        # chat.postMessage is limited per channel; everything else per method
+        if self.method == "chat_postMessage":
+            return self.method, self.kwargs.get("channel")
+        return self.method, None
+
+
+class SlackDispatcher:
+    """Single outbound path for Slack Web API calls.
+
+    Calls are queued by priority and released through a token bucket per
+    method (per channel for ``chat_postMessage``), one at a time as a worker
+    frees up, so a call queued behind a backlog of lower priority ones is
+    still sent next. A 429 response pauses that bucket for the
+    ``Retry-After`` period and the call is re-queued in place.
+    ``stats()`` reports queue depth and per-method wait times.
+    """
+
+    def __init__(self, client, workers=4, rates=None):
+        self.client = client
+        self.rates = dict(METHOD_RATES, **(rates or {}))
+        self._cond = threading.Condition()
+        self._pending = []
+        self._seq = itertools.count()
+        self._buckets = {}
+        self._blocked_until = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slack")
+        self._free_workers = threading.Semaphore(workers)
+        self._thread = None
+        self._stopped = False
+        self._metrics = {}
+
+    def submit(self, method, priority=PRIORITY_NORMAL, deadline=None, **kwargs):
+        """Queue ``client.<method>(**kwargs)`` and return a Future for its response.
+
+        ``deadline`` is the number of seconds the call may wait before it is
+        sent; past it the call is abandoned with a ``TimeoutError``.
+        """
+        call = _Call(priority, next(self._seq), method, kwargs,
+                     time.monotonic() + deadline if deadline is not None else None)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Slack dispatcher is shut down")
+            self._ensure_thread()
+            self._pending.append(call)
+            self._cond.notify()
+        return call.future
+
+    def call(self, method, priority=PRIORITY_NORMAL, deadline=None, timeout=None, **kwargs):
+        """Queue a call and block until Slack responds."""
+        return self.submit(method, priority=priority, deadline=deadline, **kwargs).result(timeout)
+
+    async def acall(self, method, priority=PRIORITY_NORMAL, deadline=None, **kwargs):
+        """Queue a call and await Slack's response without blocking the caller's event loop."""
+        return await asyncio.wrap_future(self.submit(method, priority=priority, deadline=deadline, **kwargs))
+
+    def _ensure_thread(self):
+        # Started on first use so forked workers each get their own dispatcher thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="slack-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rates.get(key[0], DEFAULT_RATE))
+        return bucket
+
+    def _next_call(self):
+        with self._cond:
+            while True:
+                if self._stopped and not self._pending:
+                    return None
+                now = time.monotonic()
+                next_ready = None
+                self._pending.sort(key=lambda c: (c.priority, c.seq))
+                for call in self._pending:
+                    if call.deadline is not None and call.deadline < now:
+                        self._pending.remove(call)
+                        self._expire(call)
+                        break
+                    key = call.bucket_key
+                    bucket = self._bucket(key)
+                    ready_at = max(self._blocked_until.get(key, 0), bucket.ready_at(now))
+                    if ready_at <= now:
+                        self._pending.remove(call)
+                        bucket.take()
+                        return call
+                    next_ready = ready_at if next_ready is None else min(next_ready, ready_at)
+                else:
+                    self._cond.wait(None if next_ready is None else next_ready - now)
+
+    def _run(self):
+        while True:
+            # Choose the next call only once a worker is free to send it, so
+            # nothing sits in the executor's FIFO queue behind lower priorities
+            self._free_workers.acquire()
+            call = self._next_call()
+            if call is None:
+                self._free_workers.release()
+                return
+            self._start(call)
+
+    def _start(self, call):
+        self._executor.submit(self._execute, call)
+
+    def _expire(self, call):
+        with self._cond:
+            self._metric(call.method)["expired"] += 1
+        call.future.set_exception(TimeoutError(f"{call.method} waited past its deadline"))
+
+    def _metric(self, method):
+        metric = self._metrics.get(method)
+        if metric is None:
+            metric = self._metrics[method] = {"calls": 0, "errors": 0, "rate_limited": 0, "expired": 0,
+                                              "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        return metric
+
+    def _execute(self, call):
+        try:
+            if call.deadline is not None and call.deadline < time.monotonic():
+                self._expire(call)
+                return
+            self._send(call)
+        finally:
+            self._free_workers.release()
+
+    def _send(self, call):
+        waited = time.monotonic() - call.enqueued_at
+        call.attempts += 1
+        try:
+            response = call.context.run(getattr(self.client, call.method), **call.kwargs)
+        except Exception as e:
+            self._failed(call, waited, e)
+            return
+        self._succeeded(call, waited, response)
+
+    def _failed(self, call, waited, error):
+        response = getattr(error, "response", None)
+        if getattr(response, "status_code", None) == 429 and call.attempts <= MAX_RATE_LIMITED_RETRIES and not self._stopped:
+            retry_after = float(response.headers.get("Retry-After", 1))
+            logger.warning("Slack rate limited %s, retrying in %.0fs", call.method, retry_after)
+            with self._cond:
+                self._metric(call.method)["rate_limited"] += 1
+                self._blocked_until[call.bucket_key] = time.monotonic() + retry_after
+                self._pending.append(call)
+                self._cond.notify()
+            return
+        with self._cond:
+            self._record(call.method, waited, error=True)
+        logger.error("Slack %s failed: %s", call.method, error)
+        call.future.set_exception(error)
+
+    def _succeeded(self, call, waited, response):
+        with self._cond:
+            self._record(call.method, waited)
+        call.future.set_result(response)
+
+    def _record(self, method, waited, error=False):
+        metric = self._metric(method)
+        metric["calls"] += 1
+        metric["errors"] += 1 if error else 0
+        metric["wait_seconds"] += waited
+        metric["max_wait_seconds"] = max(metric["max_wait_seconds"], waited)
+
+    def stats(self):
+        with self._cond:
+            depth = {}
+            for call in self._pending:
+                depth[call.method] = depth.get(call.method, 0) + 1
+            return {
+                "queue_depth": len(self._pending),
+                "queue_depth_by_method": depth,
+                "methods": {method: dict(metric) for method, metric in self._metrics.items()},
+            }
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and wait:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncSlackDispatcher(SlackDispatcher):
+    """``SlackDispatcher`` that sends calls with an ``AsyncWebClient`` on its own event loop.
+
+    Queueing, priorities, rate limits and deadlines work as in the parent,
+    but a call in flight is a coroutine rather than a blocked thread, so up
+    to ``max_in_flight`` calls wait on Slack at once from a single thread.
+    ``client_factory(session)`` builds the client around the loop's shared
+    aiohttp session, whose connection pool is sized to match. ``submit`` and
+    ``call`` still work from any thread and ``acall`` from any event loop.
+    """
+
+    def __init__(self, client_factory, max_in_flight=100, rates=None):
+        super().__init__(None, workers=max_in_flight, rates=rates)
+        self.client_factory = client_factory
+        self.max_in_flight = max_in_flight
+        self._loop = None
+        self._loop_thread = None
+        self._session = None
+        self._in_flight = set()
+
+    def _ensure_thread(self):
+        if self._loop_thread is None or not self._loop_thread.is_alive():
+            import aiohttp
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            loop.call_soon(ready.set)
+            self._loop_thread = threading.Thread(target=self._run_loop, args=(loop,), name="slack-io", daemon=True)
+            self._loop_thread.start()
+            ready.wait()
+
+            async def connect():
+                # The session must be created on the loop that uses it
+                return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_in_flight))
+            self._session = asyncio.run_coroutine_threadsafe(connect(), loop).result()
+            self.client = self.client_factory(self._session)
+            self._loop = loop
+        super()._ensure_thread()
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        loop.close()
+
+    def _start(self, call):
+        # Scheduled from the call's context so the task, and the timings it records, run in it
+        future = call.context.run(asyncio.run_coroutine_threadsafe, self._execute_async(call), self._loop)
+        with self._cond:
+            self._in_flight.add(future)
+        future.add_done_callback(self._task_done)
+
+    def _task_done(self, future):
+        with self._cond:
+            self._in_flight.discard(future)
+
+    async def _execute_async(self, call):
+        try:
+            if call.deadline is not None and call.deadline < time.monotonic():
+                self._expire(call)
+                return
+            waited = time.monotonic() - call.enqueued_at
+            call.attempts += 1
+            try:
+                response = await getattr(self.client, call.method)(**call.kwargs)
+            except Exception as e:
+                self._failed(call, waited, e)
+                return
+            self._succeeded(call, waited, response)
+        finally:
+            self._free_workers.release()
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait=wait)
+        loop = self._loop
+        if loop is None:
+            return
+        if wait:
+            with self._cond:
+                in_flight = list(self._in_flight)
+            wait_for_futures(in_flight)
+        asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        if wait:
+            self._loop_thread.join(timeout=5)
+        self._loop = None
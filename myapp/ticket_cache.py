@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from itertools import zip_longest
+
+from .tickets import LISTING_FIELDS, LISTING_RANGES, Ticket
+
+logger = logging.getLogger(__name__)
+
+
+def _listing_tickets(value_ranges):
+    # One value range per entry in LISTING_RANGES, each trimmed independently by the API
+    widths = [ord(last) - ord(first) + 1 for first, last in LISTING_RANGES]
+    for parts in zip_longest(*value_ranges, fillvalue=[]):
+        values = []
+        for part, width in zip(parts, widths):
+            values.extend(part)
+            values.extend([""] * (width - len(part)))
+        yield Ticket.from_fields(LISTING_FIELDS, values)
+
+
+class TicketCache:
+    """Process-local index of TicketLog rows keyed by ticket ID.
+
+    Only the columns in ``LISTING_RANGES`` are read, with one ``batch_get``;
+    Details and Comments are fetched a row at a time when a full ticket is
+    needed. The sheet is read in full once; afterwards only rows appended
+    since the last refresh are fetched. A full reload happens every
+    ``reload_interval`` seconds to pick up rows edited or removed by hand. A
+    secondary index maps each requester to their tickets.
+    """
+
+    def __init__(self, worksheet, reload_interval=900):
+        self.worksheet = worksheet
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._tickets = {}  # ticket_id -> Ticket holding LISTING_FIELDS
+        self._row_numbers = {}  # ticket_id -> 1-based sheet row, None until written
+        self._by_requester = {}  # user_id -> {ticket_id: None}, in creation order
+        self._last_row = 0  # last sheet row seen, header included
+        self._loaded_at = None
+
+    def _read(self, start):
+        return list(_listing_tickets(self.worksheet.batch_get([f"{first}{start}:{last}" for first, last in LISTING_RANGES])))
+
+    def _index(self, row_number, ticket):
+        ticket_id = ticket.ticket_id
+        if not ticket_id:
+            return
+        previous = self._tickets.get(ticket_id)
+        if previous is not None and previous.requester != ticket.requester:
+            self._by_requester.get(previous.requester, {}).pop(ticket_id, None)
+        self._tickets[ticket_id] = ticket.listing()
+        if row_number is not None or ticket_id not in self._row_numbers:
+            self._row_numbers[ticket_id] = row_number
+        self._by_requester.setdefault(ticket.requester, {})[ticket_id] = None
+
+    def load(self):
+        logger.info("Loading ticket cache from Google Sheets")
+        tickets = self._read(2)
+        with self._lock:
+            self._tickets.clear()
+            self._row_numbers.clear()
+            self._by_requester.clear()
+            for row_number, ticket in enumerate(tickets, start=2):
+                self._index(row_number, ticket)
+            self._last_row = len(tickets) + 1
+            self._loaded_at = time.monotonic()
+        logger.info("Ticket cache loaded with %d tickets", len(self._tickets))
+
+    def refresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_interval:
+            self.load()
+            return
+        with self._lock:
+            start = self._last_row + 1
+            new_tickets = self._read(start)
+            for offset, ticket in enumerate(new_tickets):
+                self._index(start + offset, ticket)
+            self._last_row = start + len(new_tickets) - 1
+        if new_tickets:
+            logger.debug("Ticket cache picked up %d new rows", len(new_tickets))
+
+    def find(self, ticket_id, fresh=False):
+        """Return ``(row_number, ticket)``, or ``(None, None)``.
+
+        The ticket only holds ``LISTING_FIELDS`` unless ``fresh=True``, in
+        which case the full row is re-read from the sheet so callers that
+        rewrite it see edits made by other workers.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                self.load()
+            if self._row_numbers.get(ticket_id) is None:
+                self.refresh()
+            row_number = self._row_numbers.get(ticket_id)
+            if row_number is None:
+                return None, None
+            if not fresh:
+                return row_number, self._tickets[ticket_id]
+
+        ticket = Ticket.from_row(self.worksheet.row_values(row_number))
+        if ticket.ticket_id != ticket_id:
+            # Rows were moved or deleted in the sheet; rebuild the index
+            logger.warning("Ticket %s no longer at row %s, reloading cache", ticket_id, row_number)
+            self.load()
+            return self.find(ticket_id, fresh=True)
+        with self._lock:
+            self._index(row_number, ticket)
+        return row_number, ticket
+
+    def record(self, row_number, ticket):
+        """Store a ticket this process has just written."""
+        with self._lock:
+            self._index(row_number, ticket)
+            self._last_row = max(self._last_row, row_number)
+
+    def add(self, ticket):
+        """Index a newly created ticket whose row may not be in the sheet yet."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._index(None, ticket)
+
+    def tickets_for_requester(self, user_id, status=None):
+        """Return the requester's tickets (``LISTING_FIELDS`` only), newest first, optionally filtered by status."""
+        with self._lock:
+            if self._loaded_at is None:
+                self.load()
+            ticket_ids = list(self._by_requester.get(user_id, ()))
+            tickets = [self._tickets[ticket_id] for ticket_id in reversed(ticket_ids)]
+        if status:
+            tickets = [ticket for ticket in tickets if ticket.status == status]
+        return tickets
+
+    def tickets(self):
+        """Return every ticket (``LISTING_FIELDS`` only) in sheet order."""
+        with self._lock:
+            if self._loaded_at is None:
+                self.load()
+            return list(self._tickets.values())
+
+    def __len__(self):
+        return len(self._tickets)
@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+# TicketEvents column order
+EVENT_FIELDS = ("ticket_id", "created_at", "user_id", "kind", "old_status", "new_status", "text")
+EVENT_HEADER = ("Ticket ID", "Created At", "User", "Kind", "Old Status", "New Status", "Text")
+
+
+class TicketEventLog:
+    """Append-only log of ticket comments and status changes, keyed by ticket ID.
+
+    Events are inserted into the ``ticket_events`` table of the local SQLite
+    file and never rewritten, so the ticket row itself stays a fixed size no
+    matter how long the ticket lives. Each event is also appended to
+    ``mirror`` (the TicketEvents worksheet, through a ``BatchedWorksheet``)
+    for people who read the spreadsheet.
+    """
+
+    def __init__(self, path, mirror=None):
+        self.db = LocalDatabase(path, schema=[
+            "CREATE TABLE IF NOT EXISTS ticket_events ("
+            "id INTEGER PRIMARY KEY, ticket_id TEXT NOT NULL, created_at TEXT NOT NULL, user_id TEXT NOT NULL, "
+            "kind TEXT NOT NULL, old_status TEXT NOT NULL, new_status TEXT NOT NULL, text TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS ticket_events_ticket ON ticket_events (ticket_id, kind, id)",
+        ])
+        self.mirror = mirror
+
+    def _append(self, ticket_id, kind, user_id=None, old_status="", new_status="", text=""):
+        row = (ticket_id, datetime.now().strftime("%m/%d/%Y %H:%M:%S"), user_id or "", kind, old_status, new_status, text)
+        with self.db.transaction() as conn:
+            conn.execute(f"INSERT INTO ticket_events ({', '.join(EVENT_FIELDS)}) VALUES ({', '.join('?' * len(EVENT_FIELDS))})", row)
+        if self.mirror is not None:
+            try:
+                self.mirror.append_row(list(row))
+            except Exception as e:
+                logger.error("Error mirroring %s event for ticket %s: %s", kind, ticket_id, e)
+
+    def comment(self, ticket_id, user_id, text):
+        self._append(ticket_id, "comment", user_id, text=text)
+
+    def status_changed(self, ticket_id, user_id, old_status, new_status):
+        self._append(ticket_id, "status", user_id, old_status=old_status, new_status=new_status)
+
+    def latest_comments(self, ticket_id, limit):
+        """Return the ticket's last ``limit`` comments as ``(created_at, user_id, text)``, oldest first."""
+        rows = self.db.connection().execute(
+            "SELECT created_at, user_id, text FROM ticket_events WHERE ticket_id = ? AND kind = 'comment' "
+            "ORDER BY id DESC LIMIT ?", (ticket_id, limit)).fetchall()
+        return rows[::-1]
+
+    def history(self, ticket_id):
+        """Return every event for the ticket as a dict per event, oldest first."""
+        rows = self.db.connection().execute(
+            f"SELECT {', '.join(EVENT_FIELDS)} FROM ticket_events WHERE ticket_id = ? ORDER BY id", (ticket_id,))
+        return [dict(zip(EVENT_FIELDS, row)) for row in rows]
+
+    def iter_events(self, chunk_size=1000):
+        """Yield every event as ``EVENT_FIELDS`` tuples, oldest first, in lists of at most ``chunk_size``."""
+        last_id = 0
+        while True:
+            rows = self.db.connection().execute(
+                f"SELECT id, {', '.join(EVENT_FIELDS)} FROM ticket_events WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield [row[1:] for row in rows]
+            last_id = rows[-1][0]
+
+    def last_event_id(self):
+        return self.db.connection().execute("SELECT COALESCE(MAX(id), 0) FROM ticket_events").fetchone()[0]
+
+    def events_since(self, after, up_to, limit=1000):
+        """Return ``(id, ticket_id, kind, new_status, text)`` of up to ``limit`` events with ``after < id <= up_to``, oldest first."""
+        return self.db.connection().execute(
+            "SELECT id, ticket_id, kind, new_status, text FROM ticket_events WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (after, up_to, limit)).fetchall()
+
+    def first_status_changes(self, statuses):
+        """Return ``(ticket_id, created_at)`` of each ticket's first move into one of ``statuses``."""
+        statuses = list(statuses)
+        return self.db.connection().execute(
+            "SELECT ticket_id, created_at FROM ticket_events WHERE id IN ("
+            f"SELECT MIN(id) FROM ticket_events WHERE kind = 'status' AND new_status IN ({', '.join('?' * len(statuses))}) "
+            "GROUP BY ticket_id)", statuses).fetchall()
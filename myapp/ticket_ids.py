@@ -0,0 +1,51 @@
+import logging
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class TicketIdAllocator:
+    """Hands out sequential ticket IDs from a counter in a local SQLite file.
+
+    Every gunicorn worker and thread on the host shares the same file, and each
+    increment runs inside a ``BEGIN IMMEDIATE`` transaction, so two concurrent
+    submissions can never receive the same ID. The counter is seeded once from
+    ``seed()``, which should return the highest ticket number already issued.
+    """
+
+    def __init__(self, path, seed=None, prefix="T", default_last_number=1000, name="ticket_id"):
+        self.db = LocalDatabase(path, schema=["CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"])
+        self.seed = seed
+        self.prefix = prefix
+        self.default_last_number = default_last_number
+        self.name = name
+        self._seeded = False
+
+    def _ensure_seeded(self):
+        if self._seeded:
+            return
+        conn = self.db.connection()
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (self.name,)).fetchone()
+        if row is None:
+            last_number = self.seed() if self.seed else self.default_last_number
+            logger.info("Seeding ticket ID counter at %s", last_number)
+            # Another worker may have seeded in the meantime; the first one wins
+            conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES (?, ?)", (self.name, last_number))
+        self._seeded = True
+
+    def next_number(self):
+        self._ensure_seeded()
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (self.name,))
+            return conn.execute("SELECT value FROM counters WHERE name = ?", (self.name,)).fetchone()[0]
+
+    def next_id(self):
+        return f"{self.prefix}{self.next_number()}"
+
+
+def last_ticket_number(ticket_ids, prefix="T", default=1000):
+    """Return the highest numeric ticket ID in ``ticket_ids``."""
+    numbers = [int(ticket_id[len(prefix):]) for ticket_id in ticket_ids
+               if ticket_id.startswith(prefix) and ticket_id[len(prefix):].isdigit()]
+    return max(numbers, default=default)
@@ -0,0 +1,141 @@
+import logging
+
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+DIMENSIONS = ("total", "status", "campaign", "priority")
+
+
+def count_rows(rows):
+    """Count ``(campaign, priority, status)`` tuples the way the counters do."""
+    counts = {dimension: {} for dimension in DIMENSIONS}
+    for campaign, priority, status in rows:
+        for dimension, key in (("total", ""), ("status", status), ("campaign", campaign), ("priority", priority)):
+            counts[dimension][key] = counts[dimension].get(key, 0) + 1
+    return counts
+
+
+class TicketCounters:
+    """Running ticket totals per status, campaign and priority.
+
+    Counts live in the local SQLite file so they survive restarts and are
+    shared by every worker. Each increment is a single UPSERT, which makes the
+    weekly summary an O(1) read. ``seed()`` should return
+    ``(campaign, priority, status)`` tuples for every ticket and is used once
+    to initialise an empty table; ``reconcile()`` corrects any drift.
+
+    ``record_created`` and ``record_status_change`` must be called after the
+    change is saved: when one of them seeds the table, the seed already
+    includes that change and it is not counted again. Each counter also
+    keeps the ``delta`` applied since the last recount started, so
+    increments made while the tickets are being read are kept.
+    """
+
+    def __init__(self, path, seed=None):
+        self.db = LocalDatabase(path, schema=[
+            "CREATE TABLE IF NOT EXISTS ticket_counters ("
+            "dimension TEXT NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL, delta INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (dimension, key))"
+        ])
+        self.seed = seed
+        self._seeded = False
+
+    def _ensure_seeded(self):
+        """Seed an empty table from ``seed()``; return whether this call did so."""
+        if self._seeded:
+            return False
+        if "delta" not in [row[1] for row in self.db.connection().execute("PRAGMA table_info(ticket_counters)")]:
+            # Tables created before recounts kept concurrent increments
+            with self.db.transaction() as conn:
+                if "delta" not in [row[1] for row in conn.execute("PRAGMA table_info(ticket_counters)")]:
+                    conn.execute("ALTER TABLE ticket_counters ADD COLUMN delta INTEGER NOT NULL DEFAULT 0")
+        seeding = False
+        if self.seed:
+            with self.db.transaction() as conn:
+                # The total row claims the seed, so other workers count on top of it instead of seeding again
+                if conn.execute("SELECT 1 FROM ticket_counters WHERE dimension = 'total'").fetchone() is None:
+                    conn.execute("UPDATE ticket_counters SET delta = 0")
+                    conn.execute("INSERT INTO ticket_counters (dimension, key, count) VALUES ('total', '', 0)")
+                    seeding = True
+        if seeding:
+            logger.info("Seeding ticket counters")
+            try:
+                self._replace(self.seed())
+            except BaseException:
+                with self.db.transaction() as conn:
+                    conn.execute("DELETE FROM ticket_counters WHERE dimension = 'total'")
+                raise
+        self._seeded = True
+        return seeding
+
+    def _increment(self, conn, dimension, key, delta):
+        conn.execute(
+            "INSERT INTO ticket_counters (dimension, key, count, delta) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (dimension, key) DO UPDATE SET count = count + excluded.count, delta = delta + excluded.delta",
+            (dimension, key, delta, delta),
+        )
+
+    def record_created(self, campaign, priority, status="Open"):
+        if self._ensure_seeded():
+            return
+        with self.db.transaction() as conn:
+            self._increment(conn, "total", "", 1)
+            self._increment(conn, "status", status, 1)
+            self._increment(conn, "campaign", campaign, 1)
+            self._increment(conn, "priority", priority, 1)
+
+    def record_status_change(self, old_status, new_status):
+        if old_status == new_status:
+            return
+        if self._ensure_seeded():
+            return
+        with self.db.transaction() as conn:
+            self._increment(conn, "status", old_status, -1)
+            self._increment(conn, "status", new_status, 1)
+
+    def counts(self):
+        """Return ``{dimension: {key: count}}`` for every dimension."""
+        self._ensure_seeded()
+        counts = {dimension: {} for dimension in DIMENSIONS}
+        for dimension, key, count in self.db.connection().execute("SELECT dimension, key, count FROM ticket_counters"):
+            counts.setdefault(dimension, {})[key] = count
+        return counts
+
+    def total(self):
+        return self.counts()["total"].get("", 0)
+
+    def reconcile(self, read_rows):
+        """Replace the counters with counts computed from ``read_rows()`` and return what changed.
+
+        Increments made while ``read_rows()`` runs are applied on top of the
+        new counts. The result maps ``(dimension, key)`` to
+        ``(counted, actual)`` for every counter that had drifted.
+        """
+        self._ensure_seeded()
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE ticket_counters SET delta = 0")
+        return self._replace(read_rows())
+
+    def _replace(self, rows):
+        actual = count_rows(rows)
+        drift = {}
+        with self.db.transaction() as conn:
+            current = {(dimension, key): (count, delta) for dimension, key, count, delta
+                       in conn.execute("SELECT dimension, key, count, delta FROM ticket_counters")}
+            conn.execute("DELETE FROM ticket_counters")
+            for dimension, values in actual.items():
+                for key, count in values.items():
+                    counted, delta = current.pop((dimension, key), (0, 0))
+                    conn.execute("INSERT INTO ticket_counters (dimension, key, count) VALUES (?, ?, ?)",
+                                 (dimension, key, count + delta))
+                    if counted - delta != count:
+                        drift[(dimension, key)] = (counted - delta, count)
+            for (dimension, key), (counted, delta) in current.items():
+                if delta:
+                    conn.execute("INSERT INTO ticket_counters (dimension, key, count) VALUES (?, ?, ?)", (dimension, key, delta))
+                if counted - delta:
+                    drift[(dimension, key)] = (counted - delta, 0)
+        self._seeded = True
+        return drift
@@ -0,0 +1,518 @@
+import logging
+import threading
+import time
+
+from .local_db import LocalDatabase
+from .ticket_cache import TicketCache
+from .tickets import LISTING_FIELDS, TICKET_COLUMN_LETTERS, TICKET_FIELDS, Ticket, _pad
+
+logger = logging.getLogger(__name__)
+
+
+class TicketConflict(Exception):
+    """The ticket was updated since the version the caller read."""
+
+    def __init__(self, ticket_id, expected_version, current):
+        super().__init__(f"Ticket {ticket_id} is at version {current.version}, not {expected_version}")
+        self.ticket_id = ticket_id
+        self.expected_version = expected_version
+        self.current = current
+
+
+class TicketStore:
+    """Where tickets are kept, as ``Ticket`` records."""
+
+    def get(self, ticket_id):
+        """Return the full ticket or ``None``."""
+        raise NotImplementedError
+
+    def create(self, ticket):
+        raise NotImplementedError
+
+    def update(self, ticket_id, changes, expected_version=None):
+        """Apply ``changes`` and bump the version; return ``(old, new)`` or ``(None, None)``.
+
+        If ``expected_version`` is given and the ticket is at another version,
+        nothing is written and ``TicketConflict`` is raised. Comments and
+        status history are kept in the ticket event log, not here.
+        """
+        raise NotImplementedError
+
+    def update_many(self, ticket_ids, changes_for):
+        """Update several tickets in one write; ``changes_for(ticket)`` returns the changes for each, or ``None`` to skip it.
+
+        ``changes_for`` sees the current full ticket. Returns ``(old, new)``
+        for every ticket updated; IDs not found are left out.
+        """
+        raise NotImplementedError
+
+    def tickets_for_requester(self, user_id, status=None):
+        """Return the requester's tickets, newest first, optionally filtered by status.
+
+        Only ``LISTING_FIELDS`` are filled in.
+        """
+        raise NotImplementedError
+
+    def tickets_with_status(self, statuses):
+        """Return every ticket whose status is in ``statuses``, with only ``LISTING_FIELDS`` filled in."""
+        raise NotImplementedError
+
+    def count_rows(self):
+        """Return ``(campaign, priority, status)`` for every ticket."""
+        raise NotImplementedError
+
+    def ticket_ids(self):
+        raise NotImplementedError
+
+    def iter_rows(self, chunk_size=1000, fields=TICKET_FIELDS):
+        """Yield ``fields`` of every ticket as tuples, in creation order, in lists of at most ``chunk_size``.
+
+        Each chunk is read when it is needed, so the whole log is never held
+        at once, and no ``Ticket`` records are built for bulk readers.
+        """
+        raise NotImplementedError
+
+    def rows_since(self, position, fields=TICKET_FIELDS, limit=1000):
+        """Return ``(rows, position)``: ``fields`` of up to ``limit`` tickets created after ``position``, oldest first.
+
+        Pass the returned position to the next call to read only newer
+        tickets; 0 starts from the first. The position stays put when there
+        is nothing new.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SheetsTicketStore(TicketStore):
+    """Tickets kept in the TicketLog worksheet, read through a ``TicketCache``.
+
+    The sheet has no version column and no conditional writes, so versions
+    count the updates made by this process and compare-and-swap only holds
+    between its threads; updates to one ticket are serialized by a striped
+    lock.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, worksheet, reload_interval=900):
+        self.worksheet = worksheet
+        self.cache = TicketCache(worksheet, reload_interval=reload_interval)
+        self._versions = {}  # ticket_id -> updates made by this process
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def get(self, ticket_id):
+        _, ticket = self.cache.find(ticket_id, fresh=True)
+        if ticket is not None:
+            ticket.version = self._versions.get(ticket_id, 0)
+        return ticket
+
+    def create(self, ticket):
+        self.worksheet.append_row(ticket.to_row())
+        self.cache.add(ticket)
+
+    def update(self, ticket_id, changes, expected_version=None):
+        with self._locks[hash(ticket_id) % self.LOCK_STRIPES]:
+            row_number, old = self.cache.find(ticket_id, fresh=True)
+            if old is None:
+                return None, None
+            old.version = self._versions.get(ticket_id, 0)
+            if expected_version is not None and old.version != expected_version:
+                raise TicketConflict(ticket_id, expected_version, old)
+            new = old.replace(**changes)
+            new.version = self._versions[ticket_id] = old.version + 1
+            self._write(row_number, new, new.changed_fields(old))
+        return old, new
+
+    def update_many(self, ticket_ids, changes_for):
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        locks = sorted({hash(ticket_id) % self.LOCK_STRIPES for ticket_id in ticket_ids})
+        for stripe in locks:
+            self._locks[stripe].acquire()
+        try:
+            rows = [(ticket_id, self.cache.find(ticket_id)[0]) for ticket_id in ticket_ids]
+            rows = [(ticket_id, row_number) for ticket_id, row_number in rows if row_number is not None]
+            # Full rows in one read; any row that moved is looked up again on its own
+            values = self.worksheet.batch_get([f"A{row_number}:M{row_number}" for _, row_number in rows]) if rows else []
+            cells, updated = [], []
+            for (ticket_id, row_number), value_range in zip(rows, values):
+                old = Ticket.from_row(value_range[0] if value_range else [])
+                if old.ticket_id != ticket_id:
+                    row_number, old = self.cache.find(ticket_id, fresh=True)
+                    if old is None:
+                        continue
+                old.version = self._versions.get(ticket_id, 0)
+                changes = changes_for(old)
+                if not changes:
+                    continue
+                new = old.replace(**changes)
+                new.version = self._versions[ticket_id] = old.version + 1
+                cells.extend(self._cells(row_number, new, new.changed_fields(old)))
+                self.cache.record(row_number, new)
+                updated.append((old, new))
+            if cells:
+                self.worksheet.batch_update(cells)
+        finally:
+            for stripe in locks:
+                self._locks[stripe].release()
+        return updated
+
+    @staticmethod
+    def _cells(row_number, ticket, fields):
+        # One single-cell range per changed column
+        return [{"range": f"{TICKET_COLUMN_LETTERS[field]}{row_number}", "values": [[getattr(ticket, field)]]} for field in fields]
+
+    def _write(self, row_number, ticket, fields):
+        if fields:
+            self.worksheet.batch_update(self._cells(row_number, ticket, fields))
+        self.cache.record(row_number, ticket)
+
+    def put_many(self, items):
+        """Write the ``fields`` of each ``(ticket, fields)`` pair to the ticket's row, changed cells in one ``batch_update``.
+
+        Returns the tickets whose row is not in the sheet; they are left for
+        the caller, which may still have their ``create`` queued.
+        """
+        cells, missing = [], []
+        for ticket, fields in items:
+            row_number, _ = self.cache.find(ticket.ticket_id)
+            if row_number is None:
+                missing.append(ticket)
+                continue
+            cells.extend(self._cells(row_number, ticket, fields))
+            self.cache.record(row_number, ticket)
+        if cells:
+            self.worksheet.batch_update(cells)
+        return missing
+
+    def tickets_for_requester(self, user_id, status=None):
+        return self.cache.tickets_for_requester(user_id, status)
+
+    def tickets_with_status(self, statuses):
+        return [ticket for ticket in self.cache.tickets() if ticket.status in statuses]
+
+    def count_rows(self):
+        rows = []
+        for row in self.worksheet.get("C2:F"):
+            if row:
+                row = row + [""] * (4 - len(row))
+                rows.append((row[0], row[2], row[3]))
+        return rows
+
+    def ticket_ids(self):
+        return self.worksheet.col_values(1)[1:]
+
+    def iter_rows(self, chunk_size=1000, fields=TICKET_FIELDS):
+        columns = [TICKET_FIELDS.index(field) for field in fields]
+        start = 2
+        while True:
+            rows = self.worksheet.get(f"A{start}:M{start + chunk_size - 1}")
+            chunk = [tuple(row[column] for column in columns) for row in map(_pad, rows) if row[0]]
+            if chunk:
+                yield chunk
+            # The values API drops trailing empty rows, so a short range is the end of the sheet
+            if len(rows) < chunk_size:
+                return
+            start += chunk_size
+
+    def rows_since(self, position, fields=TICKET_FIELDS, limit=1000):
+        # Positions are sheet row numbers; row 1 is the header
+        columns = [TICKET_FIELDS.index(field) for field in fields]
+        start = max(position, 1) + 1
+        rows = self.worksheet.get(f"A{start}:M{start + limit - 1}")
+        return [tuple(row[column] for column in columns) for row in map(_pad, rows) if row[0]], start - 1 + len(rows)
+
+    def all_tickets(self):
+        return [Ticket.from_row(row) for row in self.worksheet.get_all_values()[1:] if row and row[0]]
+
+
+class SqliteTicketStore(TicketStore):
+    """Tickets kept in the local SQLite file, optionally mirrored to Google Sheets.
+
+    Reads and writes never wait on the Sheets API. Every create or update
+    also records the ticket in ``ticket_mirror_queue``, in the same
+    transaction, and a background thread copies queued tickets to ``mirror``
+    (a ``SheetsTicketStore``): new tickets are appended whole, updated ones
+    have their changed columns rewritten from the current row. Entries stay
+    queued until the mirror accepts them, so a Sheets outage delays the
+    sheet rather than losing changes; failed entries are retried with
+    exponential backoff, up to ``max_backoff`` seconds, by whichever worker
+    polls next, and survive restarts. Edits made in the sheet by hand are
+    not read back. An empty table is filled once from ``seed()``, which
+    should return every existing ticket.
+    """
+
+    MIRROR_BATCH = 200
+    MIRROR_LEASE = 300  # seconds an entry stays claimed by a worker that may have died mid-write
+
+    def __init__(self, path, mirror=None, seed=None, mirror_interval=2.0, max_backoff=60.0):
+        columns = ", ".join(f"{field} TEXT NOT NULL DEFAULT ''" for field in TICKET_FIELDS[1:])
+        self.db = LocalDatabase(path, schema=[
+            f"CREATE TABLE IF NOT EXISTS tickets (ticket_id TEXT PRIMARY KEY, {columns}, version INTEGER NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS tickets_requester ON tickets (requester)",
+            "CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status)",
+            "CREATE INDEX IF NOT EXISTS tickets_assigned_to ON tickets (assigned_to)",
+            # fields is a bitmask over TICKET_FIELDS; seq changes whenever the entry does
+            "CREATE TABLE IF NOT EXISTS ticket_mirror_queue ("
+            "ticket_id TEXT PRIMARY KEY, created INTEGER NOT NULL, fields INTEGER NOT NULL, seq INTEGER NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, retry_at REAL NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS ticket_mirror_queue_retry_at ON ticket_mirror_queue (retry_at)",
+        ])
+        self.mirror = mirror
+        self.seed = seed
+        self.mirror_interval = mirror_interval
+        self.max_backoff = max_backoff
+        self._seeded = False
+        self._mirror_wakeup = threading.Event()
+        self._mirror_stopped = threading.Event()
+        self._mirror_thread = None
+
+    def _ensure_seeded(self):
+        if self.mirror is not None:
+            self._ensure_mirror_thread()
+        if self._seeded:
+            return
+        conn = self.db.connection()
+        if "version" not in [row[1] for row in conn.execute("PRAGMA table_info(tickets)")]:
+            # Tables created before tickets were versioned
+            with self.db.transaction() as conn:
+                if "version" not in [row[1] for row in conn.execute("PRAGMA table_info(tickets)")]:
+                    conn.execute("ALTER TABLE tickets ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if self.seed and conn.execute("SELECT 1 FROM tickets LIMIT 1").fetchone() is None:
+            tickets = self.seed()
+            with self.db.transaction() as conn:
+                # Another worker may have seeded in the meantime
+                if conn.execute("SELECT 1 FROM tickets LIMIT 1").fetchone() is None:
+                    logger.info("Seeding ticket store with %d tickets", len(tickets))
+                    conn.executemany(self._insert_sql("INSERT OR IGNORE"), [ticket.to_row() for ticket in tickets])
+        self._seeded = True
+
+    @staticmethod
+    def _insert_sql(verb="INSERT"):
+        return f"{verb} INTO tickets ({', '.join(TICKET_FIELDS)}) VALUES ({', '.join('?' * len(TICKET_FIELDS))})"
+
+    def _select(self, conn, where, params, fields=TICKET_FIELDS):
+        tickets = []
+        for row in conn.execute(f"SELECT {', '.join(fields)}, version FROM tickets WHERE {where}", params):
+            ticket = Ticket.from_fields(fields, row)
+            ticket.version = row[-1]
+            tickets.append(ticket)
+        return tickets
+
+    # Sheets mirror
+
+    def _queue_mirror(self, conn, ticket_id, fields=None):
+        """Queue ``ticket_id`` for the mirror inside the caller's transaction; ``fields=None`` marks a new ticket."""
+        if self.mirror is None:
+            return
+        mask = sum(1 << TICKET_FIELDS.index(field) for field in fields or ())
+        conn.execute(
+            "INSERT INTO ticket_mirror_queue (ticket_id, created, fields, seq) VALUES (?, ?, ?, 1) "
+            "ON CONFLICT (ticket_id) DO UPDATE SET created = created | excluded.created, "
+            "fields = fields | excluded.fields, seq = seq + 1",
+            (ticket_id, int(fields is None), mask),
+        )
+
+    def _ensure_mirror_thread(self):
+        # Started on first use so forked workers each get their own
+        if self._mirror_thread is None or not self._mirror_thread.is_alive():
+            self._mirror_thread = threading.Thread(target=self._run_mirror, name="ticket-mirror", daemon=True)
+            self._mirror_thread.start()
+
+    def _run_mirror(self):
+        # Polls as well as waking on this worker's writes, to retry failures and pick up other workers' leftovers
+        while not self._mirror_stopped.is_set():
+            self._mirror_wakeup.wait(self.mirror_interval)
+            self._mirror_wakeup.clear()
+            if self._mirror_stopped.is_set():
+                break
+            try:
+                while self.mirror_pending() == self.MIRROR_BATCH:
+                    pass
+            except Exception as e:
+                logger.error("Error mirroring tickets to Google Sheets: %s", e)
+
+    def mirror_pending(self):
+        """Copy up to ``MIRROR_BATCH`` queued tickets to the mirror and return how many were tried.
+
+        Entries are claimed for ``MIRROR_LEASE`` seconds so two workers never
+        write the same ticket at once. Written entries are removed unless the
+        ticket changed again meanwhile; failed ones are retried later.
+        """
+        now = time.time()
+        conn = self.db.connection()
+        if conn.execute("SELECT 1 FROM ticket_mirror_queue WHERE retry_at <= ? LIMIT 1", (now,)).fetchone() is None:
+            return 0
+        with self.db.transaction() as conn:
+            entries = conn.execute(
+                "SELECT ticket_id, created, fields, seq, attempts FROM ticket_mirror_queue WHERE retry_at <= ? "
+                "ORDER BY rowid LIMIT ?", (now, self.MIRROR_BATCH)).fetchall()
+            if not entries:
+                return 0
+            conn.executemany("UPDATE ticket_mirror_queue SET retry_at = ? WHERE ticket_id = ?",
+                             [(now + self.MIRROR_LEASE, ticket_id) for ticket_id, *_ in entries])
+            ticket_ids = [ticket_id for ticket_id, *_ in entries]
+            tickets = {ticket.ticket_id: ticket for ticket in
+                       self._select(conn, f"ticket_id IN ({', '.join('?' * len(ticket_ids))})", ticket_ids)}
+
+        written, failed, updates, error = [], [], [], None
+        for ticket_id, created, mask, seq, attempts in entries:
+            ticket = tickets.get(ticket_id)
+            if ticket is None:
+                written.append((ticket_id, seq))
+            elif created:
+                # Appended whole without reading the sheet first
+                try:
+                    self.mirror.create(ticket)
+                    written.append((ticket_id, seq))
+                except Exception as e:
+                    failed.append((ticket_id, attempts))
+                    error = e
+            else:
+                fields = [field for index, field in enumerate(TICKET_FIELDS) if mask & (1 << index)]
+                updates.append(((ticket, fields), (ticket_id, seq, attempts)))
+        if updates:
+            try:
+                missing = {ticket.ticket_id for ticket in self.mirror.put_many([item for item, _ in updates])}
+            except Exception as e:
+                missing = {ticket_id for _, (ticket_id, _, _) in updates}
+                error = e
+            for _, (ticket_id, seq, attempts) in updates:
+                if ticket_id in missing:
+                    # Its row may still be on its way from another worker
+                    failed.append((ticket_id, attempts))
+                else:
+                    written.append((ticket_id, seq))
+
+        with self.db.transaction() as conn:
+            conn.executemany("DELETE FROM ticket_mirror_queue WHERE ticket_id = ? AND seq = ?", written)
+            # Tickets changed since they were claimed stay queued; their row now exists, so only columns are rewritten
+            conn.executemany("UPDATE ticket_mirror_queue SET created = 0, attempts = 0, retry_at = 0 WHERE ticket_id = ?",
+                             [(ticket_id,) for ticket_id, _ in written])
+            conn.executemany("UPDATE ticket_mirror_queue SET attempts = ?, retry_at = ? WHERE ticket_id = ?",
+                             [(attempts + 1, now + self._mirror_backoff(attempts + 1), ticket_id) for ticket_id, attempts in failed])
+        if failed:
+            logger.error("Could not mirror %d tickets to Google Sheets, will retry: %s",
+                         len(failed), error or "row not in the sheet yet")
+        return len(entries)
+
+    def _mirror_backoff(self, attempts):
+        return min(self.mirror_interval * 2 ** min(attempts, 16), self.max_backoff)
+
+    def _mirror_written(self):
+        if self.mirror is not None:
+            self._ensure_mirror_thread()
+            self._mirror_wakeup.set()
+
+    def get(self, ticket_id):
+        self._ensure_seeded()
+        tickets = self._select(self.db.connection(), "ticket_id = ?", (ticket_id,))
+        return tickets[0] if tickets else None
+
+    def create(self, ticket):
+        self._ensure_seeded()
+        with self.db.transaction() as conn:
+            conn.execute(self._insert_sql(), ticket.to_row())
+            self._queue_mirror(conn, ticket.ticket_id)
+        self._mirror_written()
+
+    def update(self, ticket_id, changes, expected_version=None):
+        self._ensure_seeded()
+        with self.db.transaction() as conn:
+            tickets = self._select(conn, "ticket_id = ?", (ticket_id,))
+            if not tickets:
+                return None, None
+            old = tickets[0]
+            if expected_version is not None and old.version != expected_version:
+                raise TicketConflict(ticket_id, expected_version, old)
+            new = old.replace(**changes)
+            new.version = old.version + 1
+            fields = new.changed_fields(old)
+            conn.execute(f"UPDATE tickets SET {''.join(f'{field} = ?, ' for field in fields)}version = ? WHERE ticket_id = ?",
+                         [getattr(new, field) for field in fields] + [new.version, ticket_id])
+            if fields:
+                self._queue_mirror(conn, ticket_id, fields)
+        if fields:
+            self._mirror_written()
+        return old, new
+
+    def update_many(self, ticket_ids, changes_for):
+        self._ensure_seeded()
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        updated = []
+        if not ticket_ids:
+            return updated
+        with self.db.transaction() as conn:
+            for old in self._select(conn, f"ticket_id IN ({', '.join('?' * len(ticket_ids))})", ticket_ids):
+                changes = changes_for(old)
+                if not changes:
+                    continue
+                new = old.replace(**changes)
+                new.version = old.version + 1
+                fields = new.changed_fields(old)
+                conn.execute(f"UPDATE tickets SET {''.join(f'{field} = ?, ' for field in fields)}version = ? WHERE ticket_id = ?",
+                             [getattr(new, field) for field in fields] + [new.version, old.ticket_id])
+                if fields:
+                    self._queue_mirror(conn, old.ticket_id, fields)
+                updated.append((old, new))
+        if updated:
+            self._mirror_written()
+        return updated
+
+    def tickets_for_requester(self, user_id, status=None):
+        self._ensure_seeded()
+        if status:
+            return self._select(self.db.connection(), "requester = ? AND status = ? ORDER BY rowid DESC", (user_id, status), LISTING_FIELDS)
+        return self._select(self.db.connection(), "requester = ? ORDER BY rowid DESC", (user_id,), LISTING_FIELDS)
+
+    def tickets_with_status(self, statuses):
+        self._ensure_seeded()
+        statuses = list(statuses)
+        return self._select(self.db.connection(), f"status IN ({', '.join('?' * len(statuses))})", statuses, LISTING_FIELDS)
+
+    def count_rows(self):
+        self._ensure_seeded()
+        return self.db.connection().execute("SELECT campaign, priority, status FROM tickets").fetchall()
+
+    def ticket_ids(self):
+        self._ensure_seeded()
+        return [row[0] for row in self.db.connection().execute("SELECT ticket_id FROM tickets")]
+
+    def iter_rows(self, chunk_size=1000, fields=TICKET_FIELDS):
+        self._ensure_seeded()
+        last_rowid = 0
+        while True:
+            # Keyset pages rather than one open cursor, so writers are never held up by a slow reader
+            rows = self.db.connection().execute(
+                f"SELECT rowid, {', '.join(fields)} FROM tickets WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield [row[1:] for row in rows]
+            last_rowid = rows[-1][0]
+
+    def rows_since(self, position, fields=TICKET_FIELDS, limit=1000):
+        # Positions are rowids, which only grow as tickets are created
+        self._ensure_seeded()
+        rows = self.db.connection().execute(
+            f"SELECT rowid, {', '.join(fields)} FROM tickets WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (position, limit)).fetchall()
+        return [row[1:] for row in rows], rows[-1][0] if rows else position
+
+    def close(self):
+        """Stop the mirror thread and hand anything still queued to the worksheet once more."""
+        if self.mirror is None:
+            return
+        self._mirror_stopped.set()
+        self._mirror_wakeup.set()
+        if self._mirror_thread is not None:
+            self._mirror_thread.join(timeout=30)
+        try:
+            while self.mirror_pending() == self.MIRROR_BATCH:
+                pass
+        except Exception as e:
+            logger.error("Error mirroring tickets to Google Sheets: %s", e)
+        remaining = self.db.connection().execute("SELECT COUNT(*) FROM ticket_mirror_queue").fetchone()[0]
+        if remaining:
+            logger.warning("%d tickets still queued for Google Sheets; they are mirrored after the next start", remaining)
@@ -0,0 +1,107 @@
+import sys
+
+# TicketLog column order, A:M
+TICKET_FIELDS = (
+    "ticket_id", "assigned_to", "campaign", "issue_type", "priority", "status", "details",
+    "salesforce_link", "attachment", "created_date", "requester", "last_updated", "comments",
+)
+TICKET_COLUMNS = len(TICKET_FIELDS)
+TICKET_COLUMN_LETTERS = {field: chr(ord("A") + index) for index, field in enumerate(TICKET_FIELDS)}
+
+# What listings, lookups and counts need: columns A:F and J:K. Details, Salesforce
+# Link, File Attachment, Last Updated and Comments are only read with the full row.
+LISTING_RANGES = (("A", "F"), ("J", "K"))
+LISTING_FIELDS = TICKET_FIELDS[0:6] + TICKET_FIELDS[9:11]
+
+# Statuses each status may move to. Reopening is a move from Resolved or Closed back to Open.
+STATUS_TRANSITIONS = {
+    "Open": ("In Progress", "Resolved", "Closed"),
+    "In Progress": ("Resolved", "Closed"),
+    "Resolved": ("Open", "Closed"),
+    "Closed": ("Open",),
+}
+
+# Values drawn from a handful of options or users; one shared string each
+_INTERNED_FIELDS = frozenset(("assigned_to", "campaign", "issue_type", "priority", "status",
+                              "created_date", "requester", "last_updated"))
+
+
+def _pad(row):
+    # The values API trims trailing empty cells; keep rows the same shape as get_all_values()
+    if len(row) < TICKET_COLUMNS:
+        return list(row) + [""] * (TICKET_COLUMNS - len(row))
+    return list(row)
+
+
+class InvalidTransition(ValueError):
+    """A ticket cannot move from its current status to the requested one."""
+
+    def __init__(self, ticket_id, old_status, new_status):
+        super().__init__(f"Ticket {ticket_id} cannot move from {old_status} to {new_status}")
+        self.ticket_id = ticket_id
+        self.old_status = old_status
+        self.new_status = new_status
+
+
+def check_transition(ticket, status):
+    if status not in STATUS_TRANSITIONS.get(ticket.status, ()):
+        raise InvalidTransition(ticket.ticket_id, ticket.status, status)
+
+
+class Ticket:
+    """One TicketLog row. Fields not read (see ``LISTING_FIELDS``) are empty strings.
+
+    ``version`` counts the updates applied to the ticket; stores use it to
+    reject writes based on a stale read. It is not a TicketLog column.
+    """
+
+    __slots__ = TICKET_FIELDS + ("version",)
+
+    def __init__(self, version=0, **fields):
+        unknown = set(fields) - set(TICKET_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown ticket fields: {', '.join(sorted(unknown))}")
+        for field in TICKET_FIELDS:
+            self._set(field, fields.get(field, ""))
+        self.version = version
+
+    def _set(self, field, value):
+        value = "" if value is None else str(value)
+        setattr(self, field, sys.intern(value) if field in _INTERNED_FIELDS else value)
+
+    @classmethod
+    def from_fields(cls, fields, values):
+        ticket = cls.__new__(cls)
+        ticket.version = 0
+        for field in TICKET_FIELDS:
+            setattr(ticket, field, "")
+        for field, value in zip(fields, values):
+            ticket._set(field, value)
+        return ticket
+
+    @classmethod
+    def from_row(cls, row):
+        return cls.from_fields(TICKET_FIELDS, _pad(row))
+
+    def to_row(self):
+        return [getattr(self, field) for field in TICKET_FIELDS]
+
+    def replace(self, **changes):
+        """Return a copy with ``changes`` applied, at the same version."""
+        return Ticket(self.version, **dict(zip(TICKET_FIELDS, self.to_row()), **changes))
+
+    def changed_fields(self, other):
+        """Return the fields whose values differ from ``other``, in column order."""
+        return [field for field in TICKET_FIELDS if getattr(self, field) != getattr(other, field)]
+
+    def listing(self):
+        """Return a copy holding only ``LISTING_FIELDS``, for long-lived indexes."""
+        listing = Ticket.from_fields(LISTING_FIELDS, [getattr(self, field) for field in LISTING_FIELDS])
+        listing.version = self.version
+        return listing
+
+    def __eq__(self, other):
+        return isinstance(other, Ticket) and self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"Ticket({self.ticket_id!r}, status={self.status!r}, priority={self.priority!r}, requester={self.requester!r})"